@@ -0,0 +1,177 @@
+"""
+自适应提前停止的模拟
+
+与固定局数的run_sweep不同，按批次(逐批增大)模拟，每批之后检查各查询：
+  - estimate: 指标的置信区间宽度不超过目标宽度即停止
+  - compare:  两个指标之差(同一局内配对)的置信区间不含0时判定"有差异"，
+              宽度不超过目标宽度时判定"差异小于宽度的一半"
+全部查询都有结论或达到max_games时停止，报告实际局数与相对固定局数节省的局数。
+
+每次查看使用 alpha / (k(k+1)) 的置信水平(k为第几次查看)，各次查看的犯错概率之和不超过alpha，
+所以反复查看不会让结论的可信度变差；批次按growth倍增大，查看次数只随局数对数增长。
+
+    result = run_adaptive(RuleConfig(), 12, [compare(survival("黑桃K"), survival("红桃K"), 0.02)])
+    result["games"], result["saved"], result["queries"][0]["decision"]
+
+种子从seed_start起连续使用，结果与run_sweep相同的种子一致，给出cache_path时共用sqlite缓存。
+
+用法: python adaptive.py --players 12 --compare 黑桃K 红桃K --width 0.02
+"""
+import math
+import time
+from statistics import NormalDist
+from typing import Callable, List, Optional, Sequence
+
+from forest import RuleConfig
+from sweep import run_sweep
+
+Value = Callable[[dict], float]  # simulate_game的结果 -> 该局的取值
+
+
+class Metric:
+    """按局取值的指标，均值即估计量(比例类指标取值为0/1)"""
+    def __init__(self, name: str, value: Value):
+        self.name = name
+        self.value = value
+
+
+def survival(identity: str) -> Metric:
+    """某身份存活到结束的比例"""
+    return Metric(f"{identity}存活率", lambda result: identity in result["survivors"])
+
+
+def win_rate(identity: str) -> Metric:
+    """某身份单独获胜的比例"""
+    return Metric(f"{identity}胜率", lambda result: result["winner"] == identity)
+
+
+def finished_rate() -> Metric:
+    return Metric("完局率", lambda result: result["finished"])
+
+
+def mean_steps() -> Metric:
+    return Metric("平均步数", lambda result: result["steps"])
+
+
+class Query:
+    """一个需要得出结论的问题，逐局累计均值与方差(Welford)；每个Query只用于一次run_adaptive"""
+    def __init__(self, name: str, value: Value, width: float, test: bool):
+        self.name = name
+        self.value = value
+        self.width = width
+        self.test = test  # 区间不含0时即可停止
+        self.n = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.half_width = math.inf
+        self.decision: Optional[str] = None
+
+    def add(self, result: dict):
+        x = float(self.value(result))
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self._m2 += delta * (x - self.mean)
+
+    def check(self, z: float) -> Optional[str]:
+        """按临界值z更新置信区间，有结论时返回结论"""
+        if self.n > 1:
+            self.half_width = z * math.sqrt(self._m2 / (self.n - 1) / self.n)
+        if self.decision is None:
+            if self.test and abs(self.mean) > self.half_width:
+                self.decision = "different"
+            elif 2 * self.half_width <= self.width:
+                self.decision = "precise"
+        return self.decision
+
+    def report(self) -> dict:
+        return {
+            "name": self.name,
+            "games": self.n,
+            "mean": self.mean,
+            "low": self.mean - self.half_width,
+            "high": self.mean + self.half_width,
+            "decision": self.decision or "undecided",
+        }
+
+
+def estimate(metric: Metric, width: float) -> Query:
+    """估计指标，置信区间宽度不超过width即停止"""
+    return Query(metric.name, metric.value, width, test=False)
+
+
+def compare(a: Metric, b: Metric, width: float) -> Query:
+    """比较两个指标，判定有差异或区间宽度不超过width即停止"""
+    return Query(f"{a.name} - {b.name}", lambda result: float(a.value(result)) - float(b.value(result)),
+                 width, test=True)
+
+
+def run_adaptive(rules: RuleConfig, player_count: int, queries: Sequence[Query],
+                 max_games: int = 100000, first_batch: int = 500, growth: float = 1.5,
+                 alpha: float = 0.05, seed_start: int = 0, cache_path: str = ":memory:",
+                 workers: Optional[int] = None, max_steps: int = 500) -> dict:
+    """
+    逐批模拟直到所有查询都有结论或达到max_games
+    返回: {"games", "max_games", "saved", "batches", "seconds", "estimated_fixed_seconds", "queries"}
+    """
+    if first_batch < 1:
+        raise ValueError(f"first_batch须不小于1: {first_batch}")
+    if growth < 1:
+        raise ValueError(f"growth须不小于1: {growth}")
+    start = time.perf_counter()
+    games = looks = 0
+    batch = first_batch
+    while games < max_games:
+        size = min(batch, max_games - games)
+        seeds = range(seed_start + games, seed_start + games + size)
+        for cell in run_sweep([rules], [player_count], seeds, cache_path=cache_path,
+                              workers=workers, max_steps=max_steps):
+            for query in queries:
+                query.add(cell["result"])
+        games += size
+        looks += 1
+        z = NormalDist().inv_cdf(1 - alpha / (looks * (looks + 1)) / 2)
+        if all([query.check(z) for query in queries]):
+            break
+        batch = int(batch * growth)
+    seconds = time.perf_counter() - start
+    return {
+        "games": games,
+        "max_games": max_games,
+        "saved": max_games - games,
+        "batches": looks,
+        "seconds": seconds,
+        "estimated_fixed_seconds": seconds / games * max_games if games else 0.0,
+        "queries": [query.report() for query in queries],
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="森林进化论自适应提前停止模拟")
+    parser.add_argument("--players", type=int, required=True)
+    parser.add_argument("--compare", nargs=2, action="append", default=[], metavar=("A", "B"),
+                        help="比较两个身份的存活率，可重复给出")
+    parser.add_argument("--survival", nargs="+", default=[], help="估计这些身份的存活率")
+    parser.add_argument("--win", nargs="+", default=[], help="估计这些身份的胜率")
+    parser.add_argument("--width", type=float, default=0.02, help="置信区间的目标宽度")
+    parser.add_argument("--alpha", type=float, default=0.05)
+    parser.add_argument("--max-games", type=int, default=100000)
+    parser.add_argument("--workers", type=int, help="进程数，1为单进程")
+    parser.add_argument("--cache", default=":memory:", help="sqlite结果缓存路径")
+    args = parser.parse_args()
+
+    queries: List[Query] = [compare(survival(a), survival(b), args.width) for a, b in args.compare]
+    queries += [estimate(survival(name), args.width) for name in args.survival]
+    queries += [estimate(win_rate(name), args.width) for name in args.win]
+    if not queries:
+        parser.error("至少给出一个 --compare/--survival/--win")
+    result = run_adaptive(RuleConfig(), args.players, queries, args.max_games, alpha=args.alpha,
+                          cache_path=args.cache, workers=args.workers)
+    labels = {"different": "有差异", "precise": "已达到目标精度", "undecided": "未得出结论"}
+    for query in result["queries"]:
+        print(f"{query['name']}: {query['mean']:.4f} [{query['low']:.4f}, {query['high']:.4f}] "
+              f"{labels[query['decision']]}")
+    print(f"模拟{result['games']}局({result['batches']}批，{result['seconds']:.1f}秒)，"
+          f"比固定{result['max_games']}局少{result['saved']}局，"
+          f"预计节省{result['estimated_fixed_seconds'] - result['seconds']:.1f}秒")
@@ -0,0 +1,156 @@
+"""
+捕食目标建议
+
+根据当前局面(或对身份的推测)为某名玩家给出捕食目标与捕食血量，
+按期望血量收益排序。收益计算遵循hunt的规则：
+  - 克制对方：对方血量 <= k 时对方死亡，自己获得击杀奖励(k + 额外奖励)，否则获得k
+  - 被对方克制：自己血量 <= k 时自己死亡，损失全部血量，否则损失k
+  - 打平：无变化
+
+克制关系取自restraint_table的预计算结果；同一局面的查询结果会被缓存。
+"""
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from forest import CardRank, CardSuit, Game, build_deck, restraint_table
+
+Card = Tuple[CardSuit, CardRank]
+Beliefs = Dict[int, Dict[Card, float]]  # 玩家编号 -> {身份牌: 概率}
+
+
+class HuntOption(NamedTuple):
+    """一个捕食选项"""
+    target: int
+    amount: int
+    expected_gain: float
+    p_win: float
+    p_lose: float
+    p_tie: float
+
+
+class RestraintGraph:
+    """某人数局的克制关系图：身份牌之间的捕食结果查询"""
+    _cache: Dict[Tuple[int, int], "RestraintGraph"] = {}
+
+    def __init__(self, player_count: int, joker_count: int):
+        self.player_count = player_count
+        self.joker_count = joker_count
+        self.cards, self.table = restraint_table(player_count, joker_count)
+        self.index = {card: i for i, card in enumerate(self.cards)}
+
+    @classmethod
+    def for_game(cls, game: Game) -> "RestraintGraph":
+        key = (game.player_count, game.rules.joker_count_for(game.player_count))
+        graph = cls._cache.get(key)
+        if graph is None:
+            graph = cls._cache[key] = cls(*key)
+        return graph
+
+    def outcome(self, attacker: Card, defender: Card) -> int:
+        return self.table[self.index[attacker]][self.index[defender]]
+
+
+def card_of(player) -> Card:
+    return (player.suit, player.rank)
+
+
+def uniform_beliefs(game: Game, viewer_no: int, revealed: Optional[Dict[int, Card]] = None) -> Beliefs:
+    """
+    从viewer_no的视角推测其他存活玩家的身份：
+    已公开的身份为确定值，其余玩家在剩余牌中均匀分布
+    """
+    revealed = dict(revealed or {})
+    revealed[viewer_no] = card_of(game.players[viewer_no-1])
+    remaining = build_deck(game.player_count, game.rules.joker_count_for(game.player_count))
+    for card in revealed.values():
+        remaining.remove(card)
+    counts: Dict[Card, int] = {}
+    for card in remaining:
+        counts[card] = counts.get(card, 0) + 1
+    # 牌堆可能多于人数(Joker变体)，未发出的牌同样按均匀处理
+    total = len(remaining)
+    unknown = {card: count / total for card, count in counts.items()} if total else {}
+
+    beliefs: Beliefs = {}
+    for player in game.players:
+        if player.no == viewer_no or not player.is_alive:
+            continue
+        if player.no in revealed:
+            beliefs[player.no] = {revealed[player.no]: 1.0}
+        else:
+            beliefs[player.no] = unknown
+    return beliefs
+
+
+class HuntAdvisor:
+    """捕食建议器，结果按局面签名缓存"""
+    def __init__(self, max_cache: int = 100000):
+        self.max_cache = max_cache
+        self._memo: "OrderedDict[tuple, List[HuntOption]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _signature(self, game: Game, hunter_no: int, beliefs: Optional[Beliefs], max_amount: int) -> tuple:
+        graph_key = (game.player_count, game.rules.joker_count_for(game.player_count), game.rules.kill_bonus)
+        state = tuple((p.blood, p.is_alive) for p in game.players)
+        if beliefs is None:
+            identities = tuple(card_of(p) for p in game.players)
+        else:
+            identities = tuple(sorted((no, tuple(sorted(dist.items(), key=lambda kv: (kv[0][0].value, kv[0][1].value))))
+                                      for no, dist in beliefs.items()))
+        return (graph_key, hunter_no, card_of(game.players[hunter_no-1]), state, identities, max_amount)
+
+    def evaluate(self, game: Game, hunter_no: int, beliefs: Optional[Beliefs] = None,
+                 max_amount: Optional[int] = None) -> List[HuntOption]:
+        """
+        所有(目标, 血量)组合按期望收益从高到低排序
+        beliefs为None时使用真实身份(用于赛后分析)
+        max_amount默认为捕食者当前血量
+        """
+        hunter = game.players[hunter_no-1]
+        if not hunter.is_alive:
+            return []
+        if max_amount is None:
+            max_amount = max(hunter.blood, 1)
+        key = self._signature(game, hunter_no, beliefs, max_amount)
+        cached = self._memo.get(key)
+        if cached is not None:
+            self.hits += 1
+            self._memo.move_to_end(key)
+            return cached
+        self.misses += 1
+
+        graph = RestraintGraph.for_game(game)
+        my_card = card_of(hunter)
+        options: List[HuntOption] = []
+        for target in game.players:
+            if target.no == hunter_no or not target.is_alive:
+                continue
+            dist = {card_of(target): 1.0} if beliefs is None else beliefs.get(target.no, {})
+            p_win = p_lose = p_tie = 0.0
+            for card, prob in dist.items():
+                result = graph.outcome(my_card, card)
+                if result == 1:
+                    p_win += prob
+                elif result == -1:
+                    p_lose += prob
+                else:
+                    p_tie += prob
+            for k in range(1, max_amount + 1):
+                gain = game.kill_reward(k) if target.blood <= k else k
+                loss = hunter.blood if hunter.blood <= k else k
+                options.append(HuntOption(target.no, k, p_win * gain - p_lose * loss, p_win, p_lose, p_tie))
+        options.sort(key=lambda o: (-o.expected_gain, o.amount, o.target))
+
+        self._memo[key] = options
+        if len(self._memo) > self.max_cache:
+            self._memo.popitem(last=False)
+        return options
+
+    def rank_targets(self, game: Game, hunter_no: int, beliefs: Optional[Beliefs] = None,
+                     max_amount: Optional[int] = None) -> List[HuntOption]:
+        """每个目标只保留期望收益最高的血量，按期望收益排序"""
+        best: Dict[int, HuntOption] = {}
+        for option in self.evaluate(game, hunter_no, beliefs, max_amount):
+            best.setdefault(option.target, option)
+        return list(best.values())
@@ -0,0 +1,295 @@
+"""
+报告压缩归档
+
+把导出的报告以流式方式写入按大小轮换的压缩包(xz或gzip)。
+每个压缩包由若干独立的压缩帧依次拼接而成(拼接结果仍是合法的.xz/.gz文件)，
+每帧包含若干份连续的报告；索引文件记录每帧的偏移和每份报告在帧内的位置，
+取出单份报告时只解压它所在的一帧，不必解压整个压缩包。
+
+    reports-0001.txt.xz   压缩包
+    reports-0001.idx      索引(JSON Lines)：
+        {"name": "2026-01-01_120000_full.txt", "frame": 0, "start": 0, "size": 4096}
+        {"frame": 0, "offset": 0, "length": 812}
+
+写入和读取都按块进行，内存占用与帧大小无关。帧内的多份报告共享压缩上下文，
+相邻对局的报告高度相似，压缩率通常在10倍以上。
+
+用法:
+    python archive.py DIR add FILE... [--remove]
+    python archive.py DIR list
+    python archive.py DIR extract NAME [-o OUTPUT]
+"""
+import glob
+import json
+import lzma
+import os
+import re
+import sys
+import threading
+import zlib
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple, Union
+
+CHUNK = 64 * 1024
+SUFFIXES = {"xz": ".txt.xz", "gz": ".txt.gz"}
+
+
+def _compressor(fmt: str):
+    if fmt == "xz":
+        return lzma.LZMACompressor(format=lzma.FORMAT_XZ, preset=6)
+    return zlib.compressobj(9, zlib.DEFLATED, 31)  # wbits=31: gzip格式
+
+
+def _decompress(fmt: str, f: BinaryIO, length: int) -> Iterator[bytes]:
+    """从f当前位置解压length字节的一帧，每次产出不超过CHUNK字节"""
+    remaining = length
+    if fmt == "xz":
+        decompressor = lzma.LZMADecompressor()
+        while not decompressor.eof:
+            data = b""
+            if decompressor.needs_input:
+                if remaining <= 0:
+                    break
+                data = f.read(min(CHUNK, remaining))
+                remaining -= len(data)
+            chunk = decompressor.decompress(data, CHUNK)
+            if chunk:
+                yield chunk
+        return
+    decompressor = zlib.decompressobj(31)
+    while not decompressor.eof:
+        data = decompressor.unconsumed_tail
+        if not data:
+            if remaining <= 0:
+                break
+            data = f.read(min(CHUNK, remaining))
+            remaining -= len(data)
+        chunk = decompressor.decompress(data, CHUNK)
+        if chunk:
+            yield chunk
+
+
+class ReportArchive:
+    """
+    报告归档
+    fmt: "xz" 或 "gz"
+    frame_bytes: 每帧的未压缩大小上限，越大压缩率越高，取出单份报告要解压的也越多
+    bundle_bytes: 单个压缩包的大小上限，超过后轮换到新的压缩包
+    """
+    def __init__(self, directory: str, prefix: str = "reports", fmt: str = "xz",
+                 frame_bytes: int = 1 << 20, bundle_bytes: int = 64 << 20):
+        if fmt not in SUFFIXES:
+            raise ValueError(f"不支持的压缩格式: {fmt}")
+        self.directory = directory
+        self.prefix = prefix
+        self.fmt = fmt
+        self.frame_bytes = frame_bytes
+        self.bundle_bytes = bundle_bytes
+        self._lock = threading.Lock()
+        self._bundle: Optional[BinaryIO] = None
+        self._index: Optional[BinaryIO] = None
+        self._bundle_no = 0
+        self._compressor = None
+        self._frame_no = 0
+        self._frame_offset = 0
+        self._frame_raw = 0
+        os.makedirs(directory, exist_ok=True)
+
+    # ---------- 写入 ----------
+
+    def bundle_path(self, bundle_no: int) -> str:
+        return os.path.join(self.directory, f"{self.prefix}-{bundle_no:04d}{SUFFIXES[self.fmt]}")
+
+    def index_path(self, bundle_no: int) -> str:
+        return os.path.join(self.directory, f"{self.prefix}-{bundle_no:04d}.idx")
+
+    def _bundle_numbers(self) -> List[int]:
+        pattern = re.compile(re.escape(self.prefix) + r"-(\d+)\.idx$")
+        numbers = []
+        for path in glob.glob(os.path.join(glob.escape(self.directory), f"{glob.escape(self.prefix)}-*.idx")):
+            match = pattern.search(os.path.basename(path))
+            if match:
+                numbers.append(int(match.group(1)))
+        return sorted(numbers)
+
+    def _open_bundle(self):
+        """打开新的压缩包；已有压缩包不再追加，重新打开归档时总是从新包开始"""
+        numbers = self._bundle_numbers()
+        self._bundle_no = max(numbers[-1] if numbers else 0, self._bundle_no) + 1
+        self._bundle = open(self.bundle_path(self._bundle_no), "wb")
+        self._index = open(self.index_path(self._bundle_no), "w", encoding="utf-8")
+        self._frame_no = 0
+
+    def _write_index(self, entry: dict):
+        self._index.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def _finish_frame(self):
+        if self._compressor is None:
+            return
+        self._bundle.write(self._compressor.flush())
+        length = self._bundle.tell() - self._frame_offset
+        self._write_index({"frame": self._frame_no, "offset": self._frame_offset, "length": length})
+        self._bundle.flush()
+        self._index.flush()
+        self._compressor = None
+        self._frame_no += 1
+
+    def add(self, name: str, source: Union[str, bytes, BinaryIO]) -> str:
+        """
+        追加一份报告，source可以是文本、字节或二进制文件对象(按块读取)
+        返回写入的压缩包路径
+        """
+        with self._lock:
+            if self._bundle is None:
+                self._open_bundle()
+            elif self._compressor is None and self._bundle.tell() >= self.bundle_bytes:
+                self._close_bundle()
+                self._open_bundle()
+            if self._compressor is None:
+                self._compressor = _compressor(self.fmt)
+                self._frame_offset = self._bundle.tell()
+                self._frame_raw = 0
+
+            start = self._frame_raw
+            if isinstance(source, str):
+                source = source.encode("utf-8")
+            if isinstance(source, bytes):
+                chunks = (source[i:i+CHUNK] for i in range(0, len(source), CHUNK))
+            else:
+                chunks = iter(lambda: source.read(CHUNK), b"")
+            for chunk in chunks:
+                self._bundle.write(self._compressor.compress(chunk))
+                self._frame_raw += len(chunk)
+            self._write_index({"name": name, "frame": self._frame_no,
+                               "start": start, "size": self._frame_raw - start})
+            if self._frame_raw >= self.frame_bytes:
+                self._finish_frame()
+            return self.bundle_path(self._bundle_no)
+
+    def flush(self):
+        """结束当前帧，使已写入的报告都可以读取"""
+        with self._lock:
+            if self._bundle is not None:
+                self._finish_frame()
+
+    def _close_bundle(self):
+        self._finish_frame()
+        self._bundle.close()
+        self._index.close()
+        self._bundle = self._index = None
+
+    def close(self):
+        with self._lock:
+            if self._bundle is not None:
+                self._close_bundle()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---------- 读取 ----------
+
+    def _load_index(self, bundle_no: int) -> Tuple[List[dict], Dict[int, dict]]:
+        entries, frames = [], {}
+        with open(self.index_path(bundle_no), encoding="utf-8") as f:
+            for line in f:
+                item = json.loads(line)
+                if "name" in item:
+                    entries.append(item)
+                else:
+                    frames[item["frame"]] = item
+        return entries, frames
+
+    def entries(self) -> List[dict]:
+        """所有可读取的报告(所在帧已结束)，按写入顺序，每项附带bundle编号"""
+        result = []
+        for bundle_no in self._bundle_numbers():
+            entries, frames = self._load_index(bundle_no)
+            for entry in entries:
+                if entry["frame"] in frames:
+                    result.append(dict(entry, bundle=bundle_no))
+        return result
+
+    def names(self) -> List[str]:
+        return [entry["name"] for entry in self.entries()]
+
+    def iter_report(self, name: str) -> Iterator[bytes]:
+        """按块产出报告内容；同名报告有多份时取最后写入的一份"""
+        matches = [entry for entry in self.entries() if entry["name"] == name]
+        if not matches:
+            raise KeyError(name)
+        entry = matches[-1]
+        _, frames = self._load_index(entry["bundle"])
+        frame = frames[entry["frame"]]
+        skip, left = entry["start"], entry["size"]
+        with open(self.bundle_path(entry["bundle"]), "rb") as f:
+            f.seek(frame["offset"])
+            for chunk in _decompress(self.fmt, f, frame["length"]):
+                if skip >= len(chunk):
+                    skip -= len(chunk)
+                    continue
+                chunk = chunk[skip:skip+left]
+                skip = 0
+                left -= len(chunk)
+                yield chunk
+                if left <= 0:
+                    return
+
+    def extract(self, name: str, out: Optional[BinaryIO] = None) -> Optional[bytes]:
+        """取出一份报告；给出out时流式写入并返回None，否则返回字节"""
+        if out is None:
+            return b"".join(self.iter_report(name))
+        for chunk in self.iter_report(name):
+            out.write(chunk)
+        return None
+
+
+def archive_files(paths: List[str], archive: ReportArchive, remove: bool = False) -> int:
+    """把已有的txt报告逐个写入归档，返回写入的文件数"""
+    count = 0
+    for path in paths:
+        with open(path, "rb") as f:
+            archive.add(os.path.basename(path), f)
+        count += 1
+    archive.flush()
+    if remove:
+        for path in paths:
+            os.remove(path)
+    return count
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="森林进化论报告归档")
+    parser.add_argument("directory")
+    parser.add_argument("--format", choices=sorted(SUFFIXES), default="xz")
+    sub = parser.add_subparsers(dest="command", required=True)
+    add_parser = sub.add_parser("add", help="归档报告文件")
+    add_parser.add_argument("files", nargs="+")
+    add_parser.add_argument("--remove", action="store_true", help="归档后删除原文件")
+    sub.add_parser("list", help="列出已归档的报告")
+    extract_parser = sub.add_parser("extract", help="取出一份报告")
+    extract_parser.add_argument("name")
+    extract_parser.add_argument("-o", "--output")
+    args = parser.parse_args()
+
+    with ReportArchive(args.directory, fmt=args.format) as archive:
+        if args.command == "add":
+            before = sum(os.path.getsize(p) for p in args.files)
+            count = archive_files(args.files, archive, args.remove)
+            after = os.path.getsize(archive.bundle_path(archive._bundle_no))
+            print(f"已归档{count}份报告，{before}字节 -> 压缩包{after}字节")
+        elif args.command == "list":
+            for entry in archive.entries():
+                print(f"{entry['name']}\t{entry['size']}")
+        else:
+            try:
+                if args.output:
+                    with open(args.output, "wb") as out:
+                        archive.extract(args.name, out)
+                else:
+                    archive.extract(args.name, sys.stdout.buffer)
+            except KeyError:
+                print(f"归档中没有{args.name}")
+                sys.exit(1)
@@ -0,0 +1,77 @@
+"""
+多局内存占用基准
+
+用tracemalloc测量同一进程内保留大量Game对象时的内存：
+  - 每局字节数：只初始化、不操作的对局
+  - 每条记录字节数：随机操作若干步后增加的内存除以增加的记录条数
+
+用法: python bench_memory.py [--games 200] [--players 10] [--actions 300]
+"""
+import gc
+import random
+import tracemalloc
+from typing import List
+
+from forest import Game, discard_output
+
+
+def build_games(count: int, player_count: int, actions: int) -> List[Game]:
+    games = []
+    for seed in range(count):
+        game = Game(output=discard_output, seed=seed)
+        game.auto_export = False
+        game.setup_game(player_count)
+        rng = random.Random(seed)
+        for _ in range(actions):
+            alive = [p.no for p in game.players if p.is_alive]
+            if len(alive) < 2:
+                break
+            p1, p2 = rng.sample(alive, 2)
+            roll = rng.random()
+            if roll < 0.3:
+                game.trade(p1, p2, rng.randint(1, 3))
+            elif roll < 0.8:
+                game.hunt(p1, p2, rng.randint(1, 3))
+            elif roll < 0.95:
+                game.modify_blood(p1, rng.choice((-2, -1, 1, 2)))
+            else:
+                game.next_round()
+        games.append(game)
+    return games
+
+
+def measure(count: int, player_count: int, actions: int):
+    """返回 (对局列表, 占用字节数)"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    games = build_games(count, player_count, actions)
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return games, used
+
+
+def run(count: int = 200, player_count: int = 10, actions: int = 300) -> dict:
+    empty, empty_bytes = measure(count, player_count, 0)
+    empty_records = sum(len(g.records) for g in empty)
+    del empty
+    played, played_bytes = measure(count, player_count, actions)
+    extra_records = sum(len(g.records) for g in played) - empty_records
+    return {
+        "bytes_per_game": empty_bytes / count,
+        "bytes_per_record": (played_bytes - empty_bytes) / max(extra_records, 1),
+        "records_per_game": extra_records / count,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="森林进化论多局内存基准")
+    parser.add_argument("--games", type=int, default=200)
+    parser.add_argument("--players", type=int, default=10)
+    parser.add_argument("--actions", type=int, default=300)
+    args = parser.parse_args()
+    result = run(args.games, args.players, args.actions)
+    print(f"每局(未操作): {result['bytes_per_game']:.0f} 字节")
+    print(f"每条记录: {result['bytes_per_record']:.1f} 字节 (每局约{result['records_per_game']:.0f}条)")
@@ -0,0 +1,286 @@
+"""
+命令行入口
+
+    python cli.py play     [--players N] [--seed S]                交互主持
+    python cli.py batch    --players N [--seed S] [SCRIPT]           按脚本执行操作(默认读标准输入)
+    python cli.py simulate --players N [N ...] [--seeds 100]         随机策略批量模拟并汇总
+    python cli.py replay   EVENTS.jsonl --seed S                     按事件日志重放并核对
+    python cli.py analyze  EVENTS.jsonl [--seed S --advise N]        统计事件日志，可给出捕食建议
+    python cli.py bench    [--repeat 5]                              各子命令冷启动耗时与预算
+
+各子命令只在执行时导入自己需要的模块，play/batch不会加载多进程、sqlite等较重的模块。
+batch脚本每行一条命令，#开头为注释：
+    trade 1 2 3 / hunt 1 2 5 / modify 3 -2 备注 / round / view / export / end
+"""
+import argparse
+import sys
+import time
+from typing import List, Optional
+
+# 冷启动预算(秒)，bench子命令按中位数检查
+STARTUP_BUDGETS = {
+    "play": 0.3,
+    "batch": 0.3,
+    "simulate": 1.0,
+    "replay": 0.5,
+    "analyze": 0.5,
+}
+
+
+def _new_game(args):
+    from forest import Game
+    game = Game(seed=args.seed)
+    if args.no_export:
+        game.auto_export = False
+    return game
+
+
+def cmd_play(args) -> int:
+    game = _new_game(args)
+    if args.players is None:
+        game.run()
+    else:
+        game.setup_game(args.players)
+        game.menu()
+    return 0
+
+
+def run_script(game, lines) -> int:
+    """执行batch脚本，返回失败的命令数"""
+    failures = 0
+    for line_no, line in enumerate(lines, 1):
+        parts = line.split()
+        if not parts or parts[0].startswith("#"):
+            continue
+        command, rest = parts[0].lower(), parts[1:]
+        try:
+            if command in ("trade", "hunt") and len(rest) == 3:
+                action = game.trade if command == "trade" else game.hunt
+                ok = action(int(rest[0]), int(rest[1]), int(rest[2]))
+            elif command == "modify" and len(rest) >= 2:
+                ok = game.modify_blood(int(rest[0]), int(rest[1]), " ".join(rest[2:]))
+            elif command == "round" and not rest:
+                game.next_round()
+                ok = True
+            elif command == "view" and not rest:
+                game.view_blood()
+                ok = True
+            elif command == "export" and not rest:
+                game.export_data()
+                ok = True
+            elif command == "end" and not rest:
+                game.end_game()
+                break
+            else:
+                game.output(f"第{line_no}行命令格式错误: {line.strip()}")
+                ok = False
+        except ValueError:
+            game.output(f"第{line_no}行请输入有效的数字: {line.strip()}")
+            ok = False
+        failures += not ok
+    return failures
+
+
+def cmd_batch(args) -> int:
+    game = _new_game(args)
+    game.setup_game(args.players)
+    writer = None
+    if args.events:
+        from event_writer import EventWriter
+        writer = EventWriter(args.events)
+        writer.attach(game)
+    try:
+        if args.script in (None, "-"):
+            failures = run_script(game, sys.stdin)
+        else:
+            with open(args.script, encoding="utf-8") as f:
+                failures = run_script(game, f)
+    finally:
+        if writer is not None:
+            writer.close()
+    if failures:
+        print(f"共{failures}条命令失败")
+    return 1 if failures and args.strict else 0
+
+
+def cmd_simulate(args) -> int:
+    import json
+    from sweep import grid, run_sweep, summarize
+    configs = grid(kill_bonus=args.kill_bonus, trade_cap=args.trade_cap, start_blood=args.start_blood)
+    cells = run_sweep(configs, args.players, range(args.seeds), cache_path=args.cache, workers=args.workers)
+    for row in summarize(cells):
+        print(json.dumps(row, ensure_ascii=False))
+    return 0
+
+
+def _read_events(path: str) -> List[dict]:
+    import json
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _replay(path: str, seed: Optional[int]):
+    """按事件日志重放，返回 (对局, 事件列表, 第一个不一致的事件序号或None)"""
+    from forest import Game, discard_output
+    from replication import apply_event
+    lines = _read_events(path)
+    snapshots = [line for line in lines if line["line"] == "snapshot"]
+    if not snapshots:
+        raise ValueError(f"{path}中没有快照，无法确定人数")
+    game = Game(output=discard_output, seed=seed)
+    game.auto_export = False
+    game.setup_game(len(snapshots[0]["players"]))
+    events = [line for line in lines if line["line"] == "event"]
+    diverged = None
+    for event in events:
+        if not apply_event(game, event, event.get("players", ())) and diverged is None:
+            diverged = event["seq"]
+    final = snapshots[-1]["players"]
+    if diverged is None and [list(p) for p in game.snapshot()["players"]] != \
+            [[no, blood, trade, bool(alive)] for no, blood, trade, alive in final]:
+        diverged = snapshots[-1]["seq"]
+    return game, events, diverged
+
+
+def cmd_replay(args) -> int:
+    game, events, diverged = _replay(args.events, args.seed)
+    game.output = print
+    print(f"重放{len(events)}个事件")
+    if diverged is not None:
+        print(f"第{diverged}行起与日志不一致(发牌种子是否正确？)")
+    game.view_blood()
+    if args.export:
+        game.export_full_report()
+    return 1 if diverged is not None else 0
+
+
+def cmd_analyze(args) -> int:
+    lines = _read_events(args.events)
+    events = [line for line in lines if line["line"] == "event"]
+    counts = {}
+    kills = 0
+    for event in events:
+        counts[event["type"]] = counts.get(event["type"], 0) + 1
+        kills += sum(1 for p in event.get("players", ()) if not p[3])
+    print(f"事件数: {len(events)}")
+    for kind, count in sorted(counts.items()):
+        print(f"  {kind}: {count}")
+    print(f"死亡人数: {kills}")
+    snapshots = [line for line in lines if line["line"] == "snapshot"]
+    if snapshots:
+        print("最终状态:")
+        for no, blood, trade, alive in snapshots[-1]["players"]:
+            print(f"  玩家{no} | 血量: {blood} | 交易血量: {trade} | 状态: {'存活' if alive else '死亡'}")
+    if args.advise is not None:
+        from advisor import HuntAdvisor, uniform_beliefs
+        game, _, diverged = _replay(args.events, args.seed)
+        if diverged is not None:
+            print(f"第{diverged}行起与日志不一致(发牌种子是否正确？)，无法给出捕食建议")
+            return 1
+        beliefs = uniform_beliefs(game, args.advise)
+        print(f"玩家{args.advise}的捕食建议(按期望收益):")
+        for option in HuntAdvisor().rank_targets(game, args.advise, beliefs)[:5]:
+            print(f"  捕食玩家{option.target} {option.amount}点血: 期望{option.expected_gain:+.2f} "
+                  f"(胜{option.p_win:.0%} 负{option.p_lose:.0%} 平{option.p_tie:.0%})")
+    return 0
+
+
+def measure_startup(repeat: int = 5) -> dict:
+    """在临时目录中以子进程冷启动每个子命令，返回 {子命令: 耗时中位数}"""
+    import os
+    import statistics
+    import subprocess
+    import tempfile
+    script = os.path.abspath(__file__)
+    with tempfile.TemporaryDirectory() as tmp:
+        events = os.path.join(tmp, "events.jsonl")
+        runs = {
+            "play": (["play", "--players", "6", "--seed", "1", "--no-export"], "d\nf\n"),
+            "batch": (["batch", "--players", "6", "--seed", "1", "--no-export", "--events", events], "trade 1 2 1\nround\n"),
+            "simulate": (["simulate", "--players", "6", "--seeds", "1", "--workers", "1"], ""),
+            "replay": (["replay", events, "--seed", "1"], ""),
+            "analyze": (["analyze", events], ""),
+        }
+        timings = {}
+        for name, (argv, stdin) in runs.items():
+            samples = []
+            for _ in range(repeat):
+                if name == "batch" and os.path.exists(events):
+                    os.remove(events)
+                start = time.perf_counter()
+                subprocess.run([sys.executable, script, *argv], input=stdin.encode("utf-8"), cwd=tmp,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+                samples.append(time.perf_counter() - start)
+            timings[name] = statistics.median(samples)
+    return timings
+
+
+def cmd_bench(args) -> int:
+    timings = measure_startup(args.repeat)
+    over = 0
+    for name, seconds in timings.items():
+        budget = STARTUP_BUDGETS[name] * args.budget_scale
+        flag = "超出预算" if seconds > budget else "正常"
+        over += seconds > budget
+        print(f"{name:9s} {seconds * 1000:7.1f} 毫秒 (预算{budget * 1000:.0f}毫秒) {flag}")
+    return 1 if over else 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="森林进化论主持辅助程序")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("play", help="交互主持")
+    p.add_argument("--players", type=int, help="人数，不给出时交互输入")
+    p.add_argument("--seed", type=int)
+    p.add_argument("--no-export", action="store_true", help="操作后不自动导出")
+    p.set_defaults(func=cmd_play)
+
+    p = sub.add_parser("batch", help="按脚本执行操作")
+    p.add_argument("script", nargs="?", help="脚本文件，缺省或-为标准输入")
+    p.add_argument("--players", type=int, required=True)
+    p.add_argument("--seed", type=int)
+    p.add_argument("--no-export", action="store_true", help="操作后不自动导出")
+    p.add_argument("--events", help="同时写出JSON Lines事件日志")
+    p.add_argument("--strict", action="store_true", help="有命令失败时以非零状态退出")
+    p.set_defaults(func=cmd_batch)
+
+    p = sub.add_parser("simulate", help="随机策略批量模拟")
+    p.add_argument("--players", type=int, nargs="+", required=True)
+    p.add_argument("--seeds", type=int, default=100, help="每种配置模拟的局数")
+    p.add_argument("--workers", type=int, help="进程数，1为单进程")
+    p.add_argument("--cache", default=":memory:", help="sqlite结果缓存路径")
+    p.add_argument("--kill-bonus", type=int, nargs="+", default=[3])
+    p.add_argument("--trade-cap", type=int, nargs="+", default=[10])
+    p.add_argument("--start-blood", type=int, nargs="+", default=[20])
+    p.set_defaults(func=cmd_simulate)
+
+    p = sub.add_parser("replay", help="按事件日志重放并核对")
+    p.add_argument("events")
+    p.add_argument("--seed", type=int, required=True, help="原对局的发牌种子")
+    p.add_argument("--export", action="store_true", help="重放后导出完整报告")
+    p.set_defaults(func=cmd_replay)
+
+    p = sub.add_parser("analyze", help="统计事件日志")
+    p.add_argument("events")
+    p.add_argument("--seed", type=int, help="原对局的发牌种子(给出捕食建议时需要)")
+    p.add_argument("--advise", type=int, help="为该玩家给出捕食建议")
+    p.set_defaults(func=cmd_analyze)
+
+    p = sub.add_parser("bench", help="各子命令冷启动耗时")
+    p.add_argument("--repeat", type=int, default=5)
+    p.add_argument("--budget-scale", type=float, default=1.0, help="预算倍数，慢速机器上可放宽")
+    p.set_defaults(func=cmd_bench)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command == "analyze" and args.advise is not None and args.seed is None:
+        parser.error("给出--advise时必须同时给出原对局的--seed，否则无法还原身份")
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,371 @@
+"""
+多机分布式模拟
+
+协调者把 (规则, 人数, 种子区间) 切成小块，工作进程通过TCP向协调者领取任务块，
+用sweep.simulate_game逐局模拟，把汇总结果以紧凑的二进制格式交回。
+
+  - 工作进程主动领取(拉取式)，快的进程自然多做，吞吐量随进程数近似线性增长
+  - 工作窃取：队列空了而仍有任务块迟迟未交回时，空闲进程会重复领取最久未完成的块，
+    先交回的结果生效，后到的重复结果丢弃
+  - 工作进程断开时，它手上没有其他进程在做的任务块重新排队；本机运行时退出的工作进程会被补启
+
+帧格式：1字节类型 + 4字节长度(小端) + 内容
+    G  工作进程 -> 协调者  领取任务
+    J  协调者 -> 工作进程  任务块(JSON)
+    W  协调者 -> 工作进程  暂无任务，等待若干秒后再领(JSON数字)
+    D  协调者 -> 工作进程  全部完成
+    R  工作进程 -> 协调者  结果(二进制，见encode_result)
+
+用法:
+    python distributed.py worker --host 127.0.0.1 --port 6200      启动工作进程
+    python distributed.py run --players 8 10 --seeds 1000 --workers 4   在本机启动协调者与工作进程
+"""
+import asyncio
+import json
+import socket
+import struct
+import subprocess
+import sys
+import time
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from forest import CardRank, CardSuit, RuleConfig
+
+FRAME = struct.Struct("<cI")
+RESULT_HEADER = struct.Struct("<IIIQH")  # 块编号, 局数, 完局数, 总步数, 胜者种类数
+RESULT_WIN = struct.Struct("<BI")  # 身份编号, 胜局数
+
+# 身份编号：四种花色的K/Q/J，最后是Joker
+IDENTITIES: Tuple[str, ...] = tuple(
+    f"{suit.value}{rank.value}"
+    for suit in (CardSuit.SPADE, CardSuit.HEART, CardSuit.CLUB, CardSuit.DIAMOND)
+    for rank in (CardRank.K, CardRank.Q, CardRank.J)
+) + ("Joker",)
+IDENTITY_INDEX = {name: i for i, name in enumerate(IDENTITIES)}
+
+
+# ---------- 结果编码 ----------
+
+def encode_result(chunk_id: int, games: int, finished: int, steps: int, wins: Dict[str, int]) -> bytes:
+    parts = [RESULT_HEADER.pack(chunk_id, games, finished, steps, len(wins))]
+    parts.extend(RESULT_WIN.pack(IDENTITY_INDEX[name], count) for name, count in sorted(wins.items()))
+    return b"".join(parts)
+
+
+def decode_result(data: bytes) -> Tuple[int, int, int, int, Dict[str, int]]:
+    chunk_id, games, finished, steps, count = RESULT_HEADER.unpack_from(data)
+    wins = {}
+    for i in range(count):
+        identity, n = RESULT_WIN.unpack_from(data, RESULT_HEADER.size + i * RESULT_WIN.size)
+        wins[IDENTITIES[identity]] = n
+    return chunk_id, games, finished, steps, wins
+
+
+def simulate_chunk(job: dict) -> bytes:
+    """模拟一个任务块，返回编码后的结果"""
+    from sweep import simulate_game
+    rules = RuleConfig.from_dict(job["rules"])
+    games = finished = steps = 0
+    wins: Dict[str, int] = {}
+    for seed in range(job["start"], job["stop"]):
+        result = simulate_game(rules, job["players"], seed, job["max_steps"])
+        games += 1
+        finished += result["finished"]
+        steps += result["steps"]
+        if result["winner"]:
+            wins[result["winner"]] = wins.get(result["winner"], 0) + 1
+    return encode_result(job["id"], games, finished, steps, wins)
+
+
+# ---------- 协调者 ----------
+
+class _Chunk:
+    __slots__ = ("id", "group", "start", "stop", "holders", "issued_at", "done")
+
+    def __init__(self, chunk_id: int, group: int, start: int, stop: int):
+        self.id = chunk_id
+        self.group = group  # (规则, 人数) 组合的下标
+        self.start = start
+        self.stop = stop
+        self.holders: set = set()  # 正在做这一块的工作进程
+        self.issued_at = 0.0
+        self.done = False
+
+
+def _seed_runs(seeds: Iterable[int]) -> List[Tuple[int, int]]:
+    """把种子排序后拆成连续区间 [(start, stop), ...]；重复的种子另起一段，与run_sweep一样重复计算"""
+    runs: List[List[int]] = []
+    for seed in sorted(seeds):
+        if runs and seed == runs[-1][1]:
+            runs[-1][1] += 1
+        else:
+            runs.append([seed, seed + 1])
+    return [(start, stop) for start, stop in runs]
+
+
+class Coordinator:
+    """
+    分布式模拟协调者
+    seeds可为任意种子序列：排序后拆成若干段连续区间，每段再按chunk_size切块
+    steal_after: 任务块领出多少秒仍未交回时允许空闲进程重复领取，
+                 None表示按已完成块耗时中位数的两倍自动估计
+    """
+    def __init__(self, configs: Sequence[RuleConfig], player_counts: Sequence[int], seeds: Iterable[int],
+                 chunk_size: int = 25, max_steps: int = 500, steal_after: Optional[float] = None):
+        self.groups: List[Tuple[RuleConfig, int]] = [(rules, n) for rules in configs for n in player_counts]
+        self.max_steps = max_steps
+        self.steal_after = steal_after
+        self.chunks: List[_Chunk] = []
+        runs = _seed_runs(seeds)
+        for group in range(len(self.groups)):
+            for run_start, run_stop in runs:
+                for start in range(run_start, run_stop, chunk_size):
+                    self.chunks.append(_Chunk(len(self.chunks), group, start, min(start + chunk_size, run_stop)))
+        self.pending = deque(self.chunks)
+        self.totals = [[0, 0, 0, {}] for _ in self.groups]  # 局数, 完局数, 总步数, 胜局数
+        self.remaining = len(self.chunks)
+        self.durations: List[float] = []
+        self.duplicates = 0  # 重复领取的次数
+        self.reissued = 0  # 因断开而重新排队的次数
+        self.respawned = 0  # 本机运行时补启工作进程的次数
+        self._next_worker = 0
+        self._done = asyncio.Event()
+        self._server: Optional[asyncio.AbstractServer] = None
+        if not self.remaining:
+            self._done.set()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        """开始监听，返回端口"""
+        self._server = await asyncio.start_server(self._handle, host, port)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def wait(self, timeout: Optional[float] = None):
+        await asyncio.wait_for(self._done.wait(), timeout)
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    def _steal_threshold(self) -> float:
+        if self.steal_after is not None:
+            return self.steal_after
+        if not self.durations:
+            return float("inf")
+        ordered = sorted(self.durations)
+        return max(0.05, 2 * ordered[len(ordered) // 2])
+
+    def _next_chunk(self, worker: int) -> Optional[_Chunk]:
+        while self.pending:
+            chunk = self.pending.popleft()
+            if not chunk.done:
+                return chunk
+        # 队列已空：窃取最久未交回的块
+        now = time.monotonic()
+        threshold = self._steal_threshold()
+        candidates = [c for c in self.chunks
+                      if not c.done and c.holders and worker not in c.holders and now - c.issued_at >= threshold]
+        if not candidates:
+            return None
+        self.duplicates += 1
+        return min(candidates, key=lambda c: c.issued_at)
+
+    def _job(self, chunk: _Chunk) -> dict:
+        rules, players = self.groups[chunk.group]
+        return {"id": chunk.id, "rules": rules.to_dict(), "players": players,
+                "start": chunk.start, "stop": chunk.stop, "max_steps": self.max_steps}
+
+    def _merge(self, data: bytes, worker: int):
+        chunk_id, games, finished, steps, wins = decode_result(data)
+        chunk = self.chunks[chunk_id]
+        chunk.holders.discard(worker)
+        if chunk.done:
+            return  # 重复领取的块，先交回的已生效
+        chunk.done = True
+        self.durations.append(time.monotonic() - chunk.issued_at)
+        total = self.totals[chunk.group]
+        total[0] += games
+        total[1] += finished
+        total[2] += steps
+        for name, count in wins.items():
+            total[3][name] = total[3].get(name, 0) + count
+        self.remaining -= 1
+        if not self.remaining:
+            self._done.set()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        worker = self._next_worker
+        self._next_worker += 1
+        try:
+            while True:
+                kind, payload = await read_frame(reader)
+                if kind == b"R":
+                    self._merge(payload, worker)
+                    continue
+                if kind != b"G":
+                    break
+                if not self.remaining:
+                    writer.write(frame(b"D"))
+                    await writer.drain()
+                    break
+                chunk = self._next_chunk(worker)
+                if chunk is None:
+                    writer.write(frame(b"W", json.dumps(0.05).encode()))
+                else:
+                    chunk.holders.add(worker)
+                    if len(chunk.holders) == 1:
+                        chunk.issued_at = time.monotonic()
+                    writer.write(frame(b"J", json.dumps(self._job(chunk)).encode()))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            # 断开的工作进程手上没有他人在做的块重新排队
+            for chunk in self.chunks:
+                if worker in chunk.holders:
+                    chunk.holders.discard(worker)
+                    if not chunk.done and not chunk.holders:
+                        self.pending.appendleft(chunk)
+                        self.reissued += 1
+            writer.close()
+
+    def summary(self) -> List[dict]:
+        """与sweep.summarize相同格式的汇总"""
+        rows = []
+        for (rules, players), (games, finished, steps, wins) in zip(self.groups, self.totals):
+            rows.append({
+                "rules": rules.to_dict(),
+                "player_count": players,
+                "games": games,
+                "finished_rate": finished / games if games else 0.0,
+                "mean_steps": steps / games if games else 0.0,
+                "win_rate": {name: count / games for name, count in sorted(wins.items())},
+            })
+        return rows
+
+
+# ---------- 帧 ----------
+
+def frame(kind: bytes, payload: bytes = b"") -> bytes:
+    return FRAME.pack(kind, len(payload)) + payload
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Tuple[bytes, bytes]:
+    kind, length = FRAME.unpack(await reader.readexactly(FRAME.size))
+    return kind, await reader.readexactly(length) if length else b""
+
+
+def _recv_exactly(sock: socket.socket, n: int) -> bytes:
+    data = bytearray()
+    while len(data) < n:
+        chunk = sock.recv(n - len(data))
+        if not chunk:
+            raise ConnectionError("协调者已断开")
+        data.extend(chunk)
+    return bytes(data)
+
+
+def _recv_frame(sock: socket.socket) -> Tuple[bytes, bytes]:
+    kind, length = FRAME.unpack(_recv_exactly(sock, FRAME.size))
+    return kind, _recv_exactly(sock, length) if length else b""
+
+
+# ---------- 工作进程 ----------
+
+def run_worker(host: str, port: int) -> int:
+    """连接协调者并持续领取任务直到全部完成，返回完成的任务块数"""
+    done = 0
+    with socket.create_connection((host, port)) as sock:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        while True:
+            sock.sendall(frame(b"G"))
+            kind, payload = _recv_frame(sock)
+            if kind == b"D":
+                return done
+            if kind == b"W":
+                time.sleep(json.loads(payload))
+                continue
+            sock.sendall(frame(b"R", simulate_chunk(json.loads(payload))))
+            done += 1
+
+
+def launch_local_workers(count: int, host: str, port: int) -> List[subprocess.Popen]:
+    """在本机启动count个工作进程"""
+    return [subprocess.Popen([sys.executable, __file__, "worker", "--host", host, "--port", str(port)])
+            for _ in range(count)]
+
+
+async def _run_local(coordinator: Coordinator, workers: int, timeout: Optional[float],
+                     max_restarts: Optional[int] = None) -> List[dict]:
+    """
+    启动本机工作进程直到协调者完成
+    工作进程在完成前退出时(崩溃或被杀)，其任务块由协调者重新排队，并补启一个进程；
+    补启次数超过max_restarts(默认为workers)时放弃，而不是一直等待不会再来的结果
+    """
+    loop = asyncio.get_running_loop()
+    port = await coordinator.start()
+    processes = launch_local_workers(workers, "127.0.0.1", port)
+    limit = workers if max_restarts is None else max_restarts
+    deadline = None if timeout is None else loop.time() + timeout
+    try:
+        while coordinator.remaining:
+            if deadline is not None and loop.time() >= deadline:
+                raise asyncio.TimeoutError(f"{timeout}秒内未完成，剩余{coordinator.remaining}个任务块")
+            for i, process in enumerate(processes):
+                if process.poll() is None or not coordinator.remaining:
+                    continue
+                if coordinator.respawned >= limit:
+                    raise RuntimeError(f"工作进程反复退出(退出码{process.returncode})，"
+                                       f"已补启{coordinator.respawned}次，剩余{coordinator.remaining}个任务块")
+                coordinator.respawned += 1
+                processes[i] = launch_local_workers(1, "127.0.0.1", port)[0]
+            await asyncio.sleep(0.05)
+        for process in processes:
+            await loop.run_in_executor(None, process.wait)
+    finally:
+        for process in processes:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+        await coordinator.stop()
+    return coordinator.summary()
+
+
+def run_distributed(configs: Sequence[RuleConfig], player_counts: Sequence[int], seeds: Iterable[int],
+                    workers: int = 4, chunk_size: int = 25, max_steps: int = 500,
+                    timeout: Optional[float] = None) -> List[dict]:
+    """在本机启动协调者与workers个工作进程完成模拟，返回汇总"""
+    async def main():
+        coordinator = Coordinator(configs, player_counts, seeds, chunk_size, max_steps)
+        return await _run_local(coordinator, workers, timeout)
+    return asyncio.run(main())
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="森林进化论分布式模拟")
+    sub = parser.add_subparsers(dest="command", required=True)
+    worker_parser = sub.add_parser("worker", help="启动工作进程")
+    worker_parser.add_argument("--host", default="127.0.0.1")
+    worker_parser.add_argument("--port", type=int, required=True)
+    run_parser = sub.add_parser("run", help="在本机启动协调者与工作进程")
+    run_parser.add_argument("--players", type=int, nargs="+", required=True)
+    run_parser.add_argument("--seeds", type=int, default=1000)
+    run_parser.add_argument("--workers", type=int, default=4)
+    run_parser.add_argument("--chunk-size", type=int, default=25)
+    args = parser.parse_args()
+
+    if args.command == "worker":
+        try:
+            run_worker(args.host, args.port)
+        except ConnectionError:
+            pass
+    else:
+        start = time.perf_counter()
+        rows = run_distributed([RuleConfig()], args.players, range(args.seeds), args.workers, args.chunk_size)
+        elapsed = time.perf_counter() - start
+        for row in rows:
+            print(json.dumps(row, ensure_ascii=False))
+        games = sum(row["games"] for row in rows)
+        print(f"{args.workers}个工作进程，{games}局，用时{elapsed:.2f}秒({games / elapsed:.0f}局/秒)")
@@ -0,0 +1,154 @@
+"""
+结构化事件导出
+
+挂在Game的监听器上，每次操作追加一行JSON Lines或CSV，不再需要从txt报告里
+用正则解析中文记录。文件以追加方式打开并带写缓冲，已有内容不会重新生成。
+
+行类型:
+    event     一次操作(trade/hunt/modify/batch/round)及变化玩家的最新状态
+    snapshot  全部玩家的状态，挂上时、每隔snapshot_interval个事件以及关闭时各写一次
+
+JSON Lines:
+    {"seq":3,"time":1767225600.123,"line":"event","type":"hunt","round":1,"p1":1,"p2":2,"k":5,"result":1,
+     "players":[[1,25,0,1],[2,15,0,1]]}
+    {"seq":4,"time":1767225600.2,"line":"snapshot","round":1,"players":[[1,25,0,1],...]}
+players中每项为 [编号, 血量, 交易血量, 是否存活]。
+
+CSV的列见CSV_COLUMNS，players与actions列用分号分隔各项、冒号分隔字段，例如 1:25:0:1;2:15:0:1。
+
+追加到已有文件时seq接着文件最后一行继续编号，同一文件中的seq不会重复。
+"""
+import csv
+import json
+import os
+import time
+from typing import Optional
+
+from forest import Game
+
+CSV_COLUMNS = ("seq", "time", "line", "type", "round", "p1", "p2", "k", "result", "note", "actions", "players")
+
+
+def _players(players) -> list:
+    return [[no, blood, trade, int(alive)] for no, blood, trade, alive in players]
+
+
+def _join(items) -> str:
+    return ";".join(":".join(str(x) for x in item) for item in items)
+
+
+def _ends_with_newline(path: str) -> bool:
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+def _last_seq(path: str, fmt: str) -> int:
+    """已有文件最后一行的seq，文件不存在或还没有数据行时为0"""
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return 0
+    with f:
+        size = f.seek(0, os.SEEK_END)
+        chunk = 4096
+        while True:
+            start = max(0, size - chunk)
+            f.seek(start)
+            lines = f.read(size - start).splitlines()
+            if start > 0:
+                lines = lines[1:]  # 第一行可能不完整
+            for line in reversed(lines):
+                line = line.decode("utf-8").strip()
+                if not line:
+                    continue
+                try:
+                    return int(json.loads(line)["seq"] if fmt == "jsonl" else line.split(",", 1)[0])
+                except (ValueError, KeyError, TypeError):
+                    if fmt == "csv" and line.startswith("seq,"):
+                        return 0  # 只有表头
+                    continue  # 写到一半的行
+            if start == 0:
+                return 0
+            chunk *= 4
+
+
+class EventWriter:
+    """结构化事件写入器，fmt为"jsonl"或"csv"""
+    def __init__(self, path: str, fmt: str = "jsonl", snapshot_interval: int = 100,
+                 buffer_size: int = 64 * 1024):
+        if fmt not in ("jsonl", "csv"):
+            raise ValueError(f"不支持的格式: {fmt}")
+        self.path = path
+        self.fmt = fmt
+        self.snapshot_interval = snapshot_interval
+        self.game: Optional[Game] = None
+        self.seq = _last_seq(path, fmt)
+        self._since_snapshot = 0
+        self._file = open(path, "a", encoding="utf-8", newline="", buffering=buffer_size)
+        if self._file.tell() and not _ends_with_newline(path):
+            self._file.write("\n")  # 上次中断时写到一半的行单独成行
+        self._csv = None
+        if fmt == "csv":
+            self._csv = csv.writer(self._file)
+            if self._file.tell() == 0:
+                self._csv.writerow(CSV_COLUMNS)
+
+    def attach(self, game: Game):
+        """挂到游戏上并先写一条快照"""
+        self.game = game
+        game.listeners.append(self.on_event)
+        self.write_snapshot()
+
+    def detach(self):
+        if self.game is not None:
+            self.game.listeners.remove(self.on_event)
+            self.game = None
+
+    def _write(self, row: dict):
+        self.seq += 1
+        row = {"seq": self.seq, "time": round(time.time(), 3), **row}
+        if self._csv is None:
+            self._file.write(json.dumps(row, ensure_ascii=False, separators=(",", ":")) + "\n")
+            return
+        if "players" in row:
+            row["players"] = _join(row["players"])
+        if "actions" in row:
+            row["actions"] = _join(row["actions"])
+        if "player" in row:
+            row["p1"] = row.pop("player")  # 修改血量的玩家记在p1列
+        self._csv.writerow([row.get(column, "") for column in CSV_COLUMNS])
+
+    def write_snapshot(self):
+        """写一条全部玩家状态的快照"""
+        snapshot = self.game.snapshot()
+        self._write({"line": "snapshot", "round": snapshot["round"], "players": _players(snapshot["players"])})
+        self._since_snapshot = 0
+
+    def on_event(self, event: dict):
+        row = {"line": "event", "round": self.game.round_no}
+        row.update(event)
+        if "players" in row:
+            row["players"] = _players(row["players"])
+        self._write(row)
+        self._since_snapshot += 1
+        if self.snapshot_interval and self._since_snapshot >= self.snapshot_interval:
+            self.write_snapshot()
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        """写最后一条快照并关闭文件"""
+        if self._file.closed:
+            return
+        if self.game is not None:
+            self.write_snapshot()
+            self.detach()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,7 +1,18 @@
 import random
 import datetime
+import hashlib
+import json
+import string
+import sys
+import threading
+from array import array
+from collections.abc import Sequence
+from contextlib import contextmanager, nullcontext
 from enum import Enum
-from typing import List, Dict, Optional, Tuple
+from functools import lru_cache
+from operator import attrgetter
+from types import MappingProxyType
+from typing import Callable, Iterator, List, Dict, Optional, Tuple, Union
 
 class CardRank(Enum):
     """卡牌点数"""
@@ -18,157 +29,465 @@ class CardSuit(Enum):
     DIAMOND = "方片"
     JOKER = "Joker"
 
+# 各人数局使用的花色(每种花色各一张K/Q/J)
+SUITS_BY_PLAYER_COUNT: Dict[int, Tuple[CardSuit, ...]] = {
+    13: (CardSuit.SPADE, CardSuit.HEART, CardSuit.CLUB, CardSuit.DIAMOND),
+    12: (CardSuit.SPADE, CardSuit.HEART, CardSuit.CLUB, CardSuit.DIAMOND),
+    11: (CardSuit.SPADE, CardSuit.HEART, CardSuit.CLUB),
+    10: (CardSuit.SPADE, CardSuit.HEART, CardSuit.CLUB),
+    9: (CardSuit.SPADE, CardSuit.HEART, CardSuit.CLUB),
+    8: (CardSuit.SPADE, CardSuit.HEART),
+    7: (CardSuit.SPADE, CardSuit.HEART),
+    6: (CardSuit.SPADE, CardSuit.HEART),
+}
+
+# 各人数局的Joker数量
+DEFAULT_JOKER_COUNTS: Dict[int, int] = {13: 1, 12: 0, 11: 2, 10: 1, 9: 0, 8: 2, 7: 1, 6: 0}
+# 未自定义Joker数量的规则共享这份只读表
+_SHARED_JOKER_COUNTS = MappingProxyType(dict(DEFAULT_JOKER_COUNTS))
+
+
+def discard_output(message: str):
+    """丢弃游戏输出，用于模拟、服务端等不需要打印的场合"""
+
+
+def build_deck(player_count: int, joker_count: int) -> List[Tuple[CardSuit, CardRank]]:
+    """生成某人数局的身份牌(未洗牌)"""
+    deck = [(suit, rank) for suit in SUITS_BY_PLAYER_COUNT[player_count]
+            for rank in (CardRank.K, CardRank.Q, CardRank.J)]
+    deck.extend([(CardSuit.JOKER, CardRank.JOKER)] * joker_count)
+    return deck
+
+
+class RuleConfig:
+    """可调整的规则参数，默认值即标准规则"""
+    def __init__(self, start_blood: int = 20, trade_cap: int = 10, kill_bonus: int = 3,
+                 joker_counts: Optional[Dict[int, int]] = None):
+        self.start_blood = start_blood  # 初始血量
+        self.trade_cap = trade_cap  # 交易血量上限
+        self.kill_bonus = kill_bonus  # 击杀额外奖励
+        self.joker_counts = _SHARED_JOKER_COUNTS  # 各人数局的Joker数量(只读)
+        if joker_counts:
+            self.joker_counts = MappingProxyType({**DEFAULT_JOKER_COUNTS, **joker_counts})
+            
+    def joker_count_for(self, player_count: int) -> int:
+        return self.joker_counts.get(player_count, 0)
+        
+    def to_dict(self) -> dict:
+        return {
+            "start_blood": self.start_blood,
+            "trade_cap": self.trade_cap,
+            "kill_bonus": self.kill_bonus,
+            "joker_counts": {str(n): c for n, c in sorted(self.joker_counts.items())},
+        }
+        
+    @classmethod
+    def from_dict(cls, data: dict) -> "RuleConfig":
+        joker_counts = {int(n): c for n, c in data.get("joker_counts", {}).items()}
+        return cls(data.get("start_blood", 20), data.get("trade_cap", 10),
+                   data.get("kill_bonus", 3), joker_counts)
+        
+    def config_hash(self) -> str:
+        """规则参数的稳定哈希"""
+        payload = json.dumps(self.to_dict(), sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+        
+    def __eq__(self, other) -> bool:
+        return isinstance(other, RuleConfig) and self.to_dict() == other.to_dict()
+        
+    def __hash__(self) -> int:
+        return hash(self.config_hash())
+        
+    def __repr__(self) -> str:
+        return f"RuleConfig({self.to_dict()})"
+
+
+def _player_field(name: str, affects_identity: bool = False) -> property:
+    """玩家字段：修改时使缓存的显示文本失效"""
+    slot = "_" + name
+    
+    def setter(self, value):
+        setattr(self, slot, value)
+        self._info = None
+        if affects_identity:
+            self._str = None
+            
+    return property(attrgetter(slot), setter)
+
+
 class Player:
-    """玩家类"""
-    def __init__(self, no: int):
+    """玩家类，显示文本按字段缓存，血量/交易血量/存活状态变化时才重新生成"""
+    __slots__ = ("_no", "_blood", "_trade", "_rank", "_suit", "_is_alive", "_str", "_info")
+    
+    no = _player_field("no", True)
+    blood = _player_field("blood")
+    trade = _player_field("trade")
+    rank = _player_field("rank", True)
+    suit = _player_field("suit", True)
+    is_alive = _player_field("is_alive")
+    
+    def __init__(self, no: int, blood: int = 20):
+        self._str: Optional[str] = None
         self.no = no  # 玩家编号
-        self.blood = 20  # 当前血量
+        self.blood = blood  # 当前血量
         self.trade = 0  # 交易血量
         self.rank: Optional[CardRank] = None  # 身份牌点数
         self.suit: Optional[CardSuit] = None  # 身份牌花色
         self.is_alive = True
         
     def __str__(self) -> str:
-        if self.suit == CardSuit.JOKER or self.rank == CardRank.JOKER:
-            return f"玩家{self.no}: Joker"
-        return f"玩家{self.no}: {self.suit.value}{self.rank.value}"
+        if self._str is None:
+            if self._suit == CardSuit.JOKER or self._rank == CardRank.JOKER:
+                self._str = f"玩家{self._no}: Joker"
+            else:
+                self._str = f"玩家{self._no}: {self._suit.value}{self._rank.value}"
+        return self._str
     
     def get_info(self) -> str:
         """获取玩家完整信息"""
-        return f"{str(self)} | 血量: {self.blood} | 交易血量: {self.trade} | 状态: {'存活' if self.is_alive else '死亡'}"
+        if self._info is None:
+            self._info = f"{str(self)} | 血量: {self._blood} | 交易血量: {self._trade} | 状态: {'存活' if self._is_alive else '死亡'}"
+        return self._info
+
+# 操作记录模板，记录存为 (模板编号, 整数参数...)，读取时才格式化
+RECORD_TRADE = 0
+RECORD_HUNT_KILL = 1
+RECORD_HUNT_WIN = 2
+RECORD_HUNT_DIE = 3
+RECORD_HUNT_LOSE = 4
+RECORD_HUNT_TIE = 5
+RECORD_MODIFY_ADD = 6
+RECORD_MODIFY_SUB = 7
+RECORD_ROUND = 8
+RECORD_BATCH = 9
+RECORD_PLAYER_COUNT = 10
+RECORD_TEMPLATES: Tuple[str, ...] = (
+    "交易 - 玩家{0} -> 玩家{1}: {2}点血",
+    "捕食 - 玩家{0}捕食玩家{1}成功，玩家{1}死亡，玩家{0}获得{2}点血",
+    "捕食 - 玩家{0}捕食玩家{1}成功: {2}点血",
+    "捕食 - 玩家{0}捕食玩家{1}失败，玩家{0}死亡，玩家{1}获得{2}点血",
+    "捕食 - 玩家{0}捕食玩家{1}失败: 玩家{1}获得{2}点血",
+    "捕食 - 玩家{0}与玩家{1}打平",
+    "修改血量 - 玩家{0} 增加{1}点血",
+    "修改血量 - 玩家{0} 减少{1}点血",
+    "第{0}回合开始",
+    "同时行动 - 共{0}项",
+    "玩家数量: {0}",
+)
+RECORD_ARITY: Tuple[int, ...] = tuple(
+    max(int(field) for _, field, _, _ in string.Formatter().parse(template) if field is not None) + 1
+    for template in RECORD_TEMPLATES
+)
+_RECORD_TEXT = -1  # 自由文本记录，参数为文本表中的下标
+
+Record = Union[str, Tuple[int, ...]]
+
+
+def render_record(record: Record) -> str:
+    """把 (模板编号, 参数...) 格式化为记录文本，文本原样返回"""
+    if isinstance(record, str):
+        return record
+    return RECORD_TEMPLATES[record[0]].format(*record[1:])
+
+
+class RecordLog(Sequence):
+    """
+    操作记录
+    模板记录连同参数压缩存放在int数组里，自由文本记录驻留(intern)后存放，
+    读取、遍历、比较时与字符串列表一致。
+    """
+    __slots__ = ("_codes", "_starts", "_texts")
+    
+    def __init__(self, records=()):
+        self._codes = array("i")  # 模板编号后跟参数
+        self._starts = array("I")  # 每条记录在_codes中的起点
+        self._texts: List[str] = []
+        self.extend(records)
+        
+    def append(self, record: Record):
+        if not isinstance(record, str):
+            try:
+                codes = array("i", record)
+            except (OverflowError, TypeError):
+                # 参数超出int范围或不是整数(例如小数血量)时按文本存放，追加记录本身不会失败
+                record = render_record(record)
+        if isinstance(record, str):
+            codes = array("i", (_RECORD_TEXT, len(self._texts)))
+            self._texts.append(sys.intern(record))
+        # 先写入记录内容，再登记起点
+        start = len(self._codes)
+        self._codes.extend(codes)
+        self._starts.append(start)
+            
+    def extend(self, records):
+        for record in records:
+            self.append(record)
+            
+    def clear(self):
+        self.__init__()
+        
+    def __len__(self) -> int:
+        return len(self._starts)
+        
+    def _render(self, i: int) -> str:
+        start = self._starts[i]
+        template = self._codes[start]
+        if template == _RECORD_TEXT:
+            return self._texts[self._codes[start + 1]]
+        return RECORD_TEMPLATES[template].format(*self._codes[start + 1:start + 1 + RECORD_ARITY[template]])
+        
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._render(j) for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("记录下标越界")
+        return self._render(i)
+        
+    def __iter__(self) -> Iterator[str]:
+        for i in range(len(self._starts)):
+            yield self._render(i)
+            
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (RecordLog, list, tuple)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+        
+    def __repr__(self) -> str:
+        return f"RecordLog({list(self)!r})"
+
+
+class EndConditions:
+    """游戏结束条件配置"""
+    __slots__ = ("single_survivor", "no_restraint", "max_rounds")
+    
+    def __init__(self, single_survivor: bool = True, no_restraint: bool = False,
+                 max_rounds: Optional[int] = None):
+        self.single_survivor = single_survivor  # 仅剩一名(或零名)存活玩家
+        self.no_restraint = no_restraint  # 存活玩家之间互不克制
+        self.max_rounds = max_rounds  # 回合上限，None表示不限
+
+
+class Transaction:
+    """
+    同时行动事务：一批交易/捕食先在同一份状态视图上整体校验，
+    全部合法才一次性提交(一段记录、一次导出)，否则整批拒绝。
+    
+    冲突时的结算顺序固定为：先结算全部交易，再结算全部捕食，
+    同类操作按声明顺序依次结算，后面的操作看到前面操作的结果。
+    """
+    def __init__(self, game: "Game"):
+        self.game = game
+        self.actions: List[Tuple[str, int, int, int]] = []  # (类型, 编号1, 编号2, 数值)
+        
+    def trade(self, player1_no: int, player2_no: int, k: int) -> "Transaction":
+        """声明一次交易"""
+        self.actions.append(("trade", player1_no, player2_no, k))
+        return self
+        
+    def hunt(self, player1_no: int, player2_no: int, k: int) -> "Transaction":
+        """声明一次捕食"""
+        self.actions.append(("hunt", player1_no, player2_no, k))
+        return self
+        
+    def ordered_actions(self) -> List[Tuple[str, int, int, int]]:
+        """按结算顺序排列的操作"""
+        return [a for a in self.actions if a[0] == "trade"] + [a for a in self.actions if a[0] == "hunt"]
+        
+    def validate(self) -> Tuple[Optional[str], Dict[int, List], List[str]]:
+        """
+        在状态视图上模拟整批操作
+        返回: (错误信息, 模拟后的状态{编号: [血量, 交易血量, 存活]}, 记录)
+        """
+        game = self.game
+        view: Dict[int, List] = {}
+        records: List[Record] = []
+        
+        def get(no: int) -> Optional[List]:
+            if no < 1 or no > len(game.players):
+                return None
+            if no not in view:
+                p = game.players[no-1]
+                view[no] = [p.blood, p.trade, p.is_alive]
+            return view[no]
+            
+        for i, (kind, no1, no2, k) in enumerate(self.ordered_actions(), 1):
+            s1, s2 = get(no1), get(no2)
+            if s1 is None or s2 is None:
+                return f"第{i}项：玩家编号不存在！", view, records
+            if no1 == no2:
+                return f"第{i}项：不能对自己操作！", view, records
+            if k <= 0:
+                return f"第{i}项：血量必须为正数！", view, records
+            if not s1[2] or not s2[2]:
+                return f"第{i}项：有玩家已死亡！", view, records
+                
+            if kind == "trade":
+                if s2[1] + k > game.trade_cap:
+                    return f"第{i}项：玩家{no2}的交易血量将超过{game.trade_cap}！", view, records
+                if s1[0] < k:
+                    return f"第{i}项：玩家{no1}血量不足！", view, records
+                s1[0] -= k
+                s2[0] += k
+                s1[1] -= k
+                s2[1] += k
+                records.append((RECORD_TRADE, no1, no2, k))
+                continue
+                
+            result = game._check_restraint(game.players[no1-1], game.players[no2-1])
+            if result == 0:
+                records.append((RECORD_HUNT_TIE, no1, no2))
+                continue
+            winner, loser = (s1, s2) if result == 1 else (s2, s1)
+            if loser[0] <= k:
+                reward = game.kill_reward(k)
+                winner[0] += reward
+                loser[0] = 0
+                loser[2] = False
+                records.append((RECORD_HUNT_KILL if result == 1 else RECORD_HUNT_DIE, no1, no2, reward))
+            else:
+                winner[0] += k
+                loser[0] -= k
+                records.append((RECORD_HUNT_WIN if result == 1 else RECORD_HUNT_LOSE, no1, no2, k))
+        return None, view, records
+        
+    def commit(self) -> bool:
+        """校验并原子提交，返回是否提交成功"""
+        game = self.game
+        involved = [no for action in self.actions for no in action[1:3]]
+        with game._locked(*involved):
+            error, view, records = self.validate()
+            if error:
+                game.output(f"同时行动失败，整批撤销：{error}")
+                return False
+            if not self.actions:
+                return True
+                
+            changed = []
+            for no in sorted(view):
+                p = game.players[no-1]
+                blood, trade, alive = view[no]
+                was_alive = p.is_alive
+                p.blood, p.trade, p.is_alive = blood, trade, alive
+                if was_alive and not alive:
+                    game._on_player_death(p)
+                changed.append(p)
+                
+            with game._state_lock:
+                game.records.append((RECORD_BATCH, len(records)))
+                game.records.extend(records)
+                game._emit({"type": "batch", "actions": [list(a) for a in self.ordered_actions()]}, *changed)
+        game.output(f"同时行动成功！共{len(records)}项")
+        for record in records:
+            game.output(f"  {render_record(record)}")
+        
+        if game.auto_export:
+            if any(a[0] == "hunt" for a in self.actions):
+                game.export_full_report()
+            else:
+                game.export_data()
+        return True
+
 
 class Game:
     """游戏主类"""
-    def __init__(self):
+    def __init__(self, output: Callable[[str], None] = print, seed: Optional[int] = None,
+                 thread_safe: bool = False, rules: Optional[RuleConfig] = None):
         self.players: List[Player] = []
-        self.records: List[str] = []
+        self.records = RecordLog()  # 赋值时总是转换为RecordLog，见records属性
         self.player_count = 0
         self.joker_count = 0
+        self.round_no = 0
+        self.rules = rules or RuleConfig()
+        self.end_conditions = EndConditions()
+        # 结束判定计数器，在hunt/modify_blood中增量更新
+        self._tracked_players: Optional[List[Player]] = None
+        self.alive_count = 0
+        self._alive_cards: Dict[Tuple[CardSuit, CardRank], int] = {}
+        self._card_reps: Dict[Tuple[CardSuit, CardRank], Player] = {}
+        self._restraint_pairs = 0
+        # 输出与导出设置，服务端/模拟时可替换输出函数并关闭自动导出
+        self.output = output
+        self.auto_export = True
+        self.export_prefix = ""  # 导出文件名前缀，可包含目录
+        self.archive = None  # 设置为archive.ReportArchive后完整报告写入压缩归档而不是txt文件
+        self.rng = random.Random(seed)  # 发牌用随机数，指定seed可复现
+        # 状态变化监听器，每次操作后以事件字典调用
+        self.listeners: List[Callable[[dict], None]] = []
+        # 查看/导出用的玩家文本块缓存，见_player_block
+        self._block_cache: Dict[str, tuple] = {}
+        # 线程安全模式：每名玩家一把锁，按编号升序加锁；记录、计数器与监听器由状态锁保护
+        # 加锁顺序固定为 玩家锁(升序) -> 状态锁，持有状态锁时不得再申请玩家锁
+        self.thread_safe = thread_safe
+        self._player_locks: Dict[int, threading.Lock] = {}
+        self._player_locks_guard = threading.Lock()
+        self._state_lock = threading.RLock() if thread_safe else nullcontext()
+        
+    @property
+    def records(self) -> RecordLog:
+        """操作记录"""
+        return self._records
         
-    def setup_game(self):
-        """初始化游戏"""
-        print("=== 游戏初始化 ===")
+    @records.setter
+    def records(self, records):
+        # 替换为普通列表等序列时同样转换为RecordLog，模板记录不会以元组形式混入
+        self._records = records if isinstance(records, RecordLog) else RecordLog(records)
+        
+    def setup_game(self, player_count: Optional[int] = None):
+        """初始化游戏，指定player_count时不再交互输入"""
+        self.output("=== 游戏初始化 ===")
         
         # 1. 设置游玩人数
-        while True:
+        if player_count is not None:
+            if not 6 <= player_count <= 13:
+                raise ValueError("人数必须在6-13人之间！")
+            self.player_count = player_count
+        while player_count is None:
             try:
                 self.player_count = int(input("请输入游玩人数(6-13人): "))
                 if 6 <= self.player_count <= 13:
                     break
-                print("人数必须在6-13人之间！")
+                self.output("人数必须在6-13人之间！")
             except ValueError:
-                print("请输入有效的数字！")
+                self.output("请输入有效的数字！")
         
         # 创建玩家
-        self.players = [Player(i+1) for i in range(self.player_count)]
+        start_blood = self.rules.start_blood
+        self.players = [Player(i+1, start_blood) for i in range(self.player_count)]
         
         # 2. 分配身份
         self._assign_identities()
         
         # 打印所有玩家身份
-        print("\n=== 玩家身份分配 ===")
+        self.output("\n=== 玩家身份分配 ===")
         for player in self.players:
-            print(str(player))
+            self.output(str(player))
         
         # 3. 初始化血量
         for player in self.players:
-            player.blood = 20
+            player.blood = start_blood
             player.trade = 0
             player.is_alive = True
             
         # 添加初始化记录
         self.records.append(f"游戏初始化 - {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        self.records.append(f"玩家数量: {self.player_count}")
+        self.records.append((RECORD_PLAYER_COUNT, self.player_count))
         for player in self.players:
-            self.records.append(f"玩家{player.no}: {str(player)} 初始血量20")
-            
-        print("\n游戏初始化完成！")
+            self.records.append(f"玩家{player.no}: {str(player)} 初始血量{start_blood}")
+        
+        self._init_counters()
+        self.output("\n游戏初始化完成！")
         
     def _assign_identities(self):
         """根据人数分配身份"""
-        all_cards = []
-        
-        if self.player_count == 13:
-            # 4种花色的kqj + joker
-            suits = [CardSuit.SPADE, CardSuit.HEART, CardSuit.CLUB, CardSuit.DIAMOND]
-            ranks = [CardRank.K, CardRank.Q, CardRank.J]
-            for suit in suits:
-                for rank in ranks:
-                    all_cards.append((suit, rank))
-            all_cards.append((CardSuit.JOKER, CardRank.JOKER))
-            self.joker_count = 1
-            
-        elif self.player_count == 12:
-            # 4种花色的kqj
-            suits = [CardSuit.SPADE, CardSuit.HEART, CardSuit.CLUB, CardSuit.DIAMOND]
-            ranks = [CardRank.K, CardRank.Q, CardRank.J]
-            for suit in suits:
-                for rank in ranks:
-                    all_cards.append((suit, rank))
-            self.joker_count = 0
-            
-        elif self.player_count == 11:
-            # 黑桃、红桃、梅花的kqj + 2个joker
-            suits = [CardSuit.SPADE, CardSuit.HEART, CardSuit.CLUB]
-            ranks = [CardRank.K, CardRank.Q, CardRank.J]
-            for suit in suits:
-                for rank in ranks:
-                    all_cards.append((suit, rank))
-            all_cards.append((CardSuit.JOKER, CardRank.JOKER))
-            all_cards.append((CardSuit.JOKER, CardRank.JOKER))
-            self.joker_count = 2
-            
-        elif self.player_count == 10:
-            # 黑桃、红桃、梅花的kqj + 1个joker
-            suits = [CardSuit.SPADE, CardSuit.HEART, CardSuit.CLUB]
-            ranks = [CardRank.K, CardRank.Q, CardRank.J]
-            for suit in suits:
-                for rank in ranks:
-                    all_cards.append((suit, rank))
-            all_cards.append((CardSuit.JOKER, CardRank.JOKER))
-            self.joker_count = 1
-            
-        elif self.player_count == 9:
-            # 黑桃、红桃、梅花的kqj
-            suits = [CardSuit.SPADE, CardSuit.HEART, CardSuit.CLUB]
-            ranks = [CardRank.K, CardRank.Q, CardRank.J]
-            for suit in suits:
-                for rank in ranks:
-                    all_cards.append((suit, rank))
-            self.joker_count = 0
-            
-        elif self.player_count == 8:
-            # 黑桃、红桃的kqj + 2个joker
-            suits = [CardSuit.SPADE, CardSuit.HEART]
-            ranks = [CardRank.K, CardRank.Q, CardRank.J]
-            for suit in suits:
-                for rank in ranks:
-                    all_cards.append((suit, rank))
-            all_cards.append((CardSuit.JOKER, CardRank.JOKER))
-            all_cards.append((CardSuit.JOKER, CardRank.JOKER))
-            self.joker_count = 2
-            
-        elif self.player_count == 7:
-            # 黑桃、红桃的kqj + 1个joker
-            suits = [CardSuit.SPADE, CardSuit.HEART]
-            ranks = [CardRank.K, CardRank.Q, CardRank.J]
-            for suit in suits:
-                for rank in ranks:
-                    all_cards.append((suit, rank))
-            all_cards.append((CardSuit.JOKER, CardRank.JOKER))
-            self.joker_count = 1
-            
-        elif self.player_count == 6:
-            # 黑桃、红桃的kqj
-            suits = [CardSuit.SPADE, CardSuit.HEART]
-            ranks = [CardRank.K, CardRank.Q, CardRank.J]
-            for suit in suits:
-                for rank in ranks:
-                    all_cards.append((suit, rank))
-            self.joker_count = 0
+        self.joker_count = self.rules.joker_count_for(self.player_count)
+        all_cards = build_deck(self.player_count, self.joker_count)
+        if len(all_cards) < len(self.players):
+            raise ValueError(f"{self.player_count}人局的身份牌不足：只有{len(all_cards)}张")
             
         # 洗牌并分配
-        random.shuffle(all_cards)
+        self.rng.shuffle(all_cards)
         for i, player in enumerate(self.players):
             suit, rank = all_cards[i]
             player.suit = suit
@@ -181,7 +500,7 @@ class Game:
         """
         # 处理Joker的特殊情况
         if player1.rank == CardRank.JOKER and player2.rank == CardRank.JOKER:
-            if self.player_count in [11, 8]:  # 11人局和8人局有多个joker
+            if self.rules.joker_count_for(self.player_count) > 1:  # 有多个joker的局(标准规则为11人局和8人局)
                 return 0  # joker之间打平
             return 1  # joker > 任意牌
         
@@ -253,25 +572,172 @@ class Game:
         
         return 0  # 默认平局
     
-    def trade(self, player1_no: int, player2_no: int, k: int):
-        """交易功能"""
+    def _init_counters(self):
+        """根据当前玩家状态重建结束判定计数器"""
+        self._tracked_players = self.players
+        self._alive_cards = {}
+        self._card_reps = {}
+        alive = [p for p in self.players if p.is_alive]
+        self.alive_count = len(alive)
+        for p in alive:
+            key = (p.suit, p.rank)
+            self._alive_cards[key] = self._alive_cards.get(key, 0) + 1
+            self._card_reps.setdefault(key, p)
+        
+        # 统计存活玩家中存在克制关系的玩家对数
+        self._restraint_pairs = 0
+        for i, p in enumerate(alive):
+            for q in alive[i+1:]:
+                if self._restrains_either(p, q):
+                    self._restraint_pairs += 1
+                    
+    def _ensure_counters(self):
+        """玩家列表被整体替换后重建计数器"""
+        if self._tracked_players is not self.players:
+            self._init_counters()
+            
+    def _restrains_either(self, p1: Player, p2: Player) -> bool:
+        """两名玩家之间是否存在克制关系(任一方向)"""
+        return self._check_restraint(p1, p2) != 0 or self._check_restraint(p2, p1) != 0
+        
+    def _on_player_death(self, player: Player):
+        """玩家死亡时增量更新计数器，代价只与身份种类数有关"""
+        with self._state_lock:
+            if self._tracked_players is not self.players:
+                return  # 尚未建立计数器，下次判定时整体重建
+            key = (player.suit, player.rank)
+            self.alive_count -= 1
+            self._alive_cards[key] -= 1
+            for other_key, count in self._alive_cards.items():
+                if count and self._restrains_either(player, self._card_reps[other_key]):
+                    self._restraint_pairs -= count
+                
+    def get_player(self, no: int) -> Player:
+        """按编号(从1开始)取玩家，编号越界时抛出IndexError，0与负数不会被当作倒数索引"""
+        if not 1 <= no <= len(self.players):
+            raise IndexError(f"玩家编号{no}不存在")
+        return self.players[no-1]
+        
+    def _player_lock(self, no: int) -> threading.Lock:
+        lock = self._player_locks.get(no)
+        if lock is None:
+            with self._player_locks_guard:
+                lock = self._player_locks.setdefault(no, threading.Lock())
+        return lock
+        
+    @contextmanager
+    def _locked(self, *player_nos: int):
+        """线程安全模式下按编号升序锁住相关玩家，非法编号不加锁"""
+        if not self.thread_safe:
+            yield
+            return
+        count = len(self.players)
+        locks = [self._player_lock(no) for no in sorted(set(player_nos)) if 1 <= no <= count]
+        for lock in locks:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+                
+    def _locked_all(self):
+        """锁住全部玩家，用于导出等需要一致视图的操作"""
+        return self._locked(*range(1, len(self.players) + 1))
+        
+    def _log_action(self, record: Record, event: dict, *changed: Player):
+        """追加记录并通知监听器，两者在状态锁内保持同一顺序"""
+        with self._state_lock:
+            self.records.append(record)
+            self._emit(event, *changed)
+            
+    @property
+    def trade_cap(self) -> int:
+        """交易血量上限"""
+        return self.rules.trade_cap
+        
+    def kill_reward(self, k: int) -> int:
+        """击杀奖励：全部捕食血量加额外奖励"""
+        return k + self.rules.kill_bonus
+        
+    def _emit(self, event: dict, *changed: Player):
+        """通知监听器，event["players"]为本次变化的玩家(编号, 血量, 交易血量, 存活)"""
+        if not self.listeners:
+            return
+        event["players"] = [(p.no, p.blood, p.trade, p.is_alive) for p in changed]
+        for listener in self.listeners:
+            listener(event)
+            
+    def snapshot(self) -> dict:
+        """当前公开状态快照(不含身份)，不加锁，可在监听器中调用"""
+        return {
+            "player_count": self.player_count,
+            "round": self.round_no,
+            "players": [(p.no, p.blood, p.trade, p.is_alive) for p in self.players],
+        }
+        
+    def next_round(self):
+        """进入下一回合"""
+        with self._state_lock:
+            self.round_no += 1
+            round_no = self.round_no
+            self.records.append((RECORD_ROUND, round_no))
+            self._emit({"type": "round", "round": round_no})
+        self.output(f"进入第{round_no}回合")
+        
+    def check_game_over(self) -> Optional[str]:
+        """
+        检查游戏是否已分出结果
+        返回: 结束原因，未结束时返回None
+        """
+        with self._state_lock:
+            return self._game_over_reason()
+            
+    def _game_over_reason(self) -> Optional[str]:
+        self._ensure_counters()
+        conditions = self.end_conditions
+        if conditions.single_survivor and self.alive_count <= 1:
+            return "仅剩一名存活玩家" if self.alive_count == 1 else "没有存活玩家"
+        if conditions.no_restraint and self._restraint_pairs == 0:
+            return "存活玩家之间互不克制"
+        if conditions.max_rounds is not None and self.round_no >= conditions.max_rounds:
+            return f"已达到回合上限{conditions.max_rounds}"
+        return None
+        
+    def trade(self, player1_no: int, player2_no: int, k: int) -> bool:
+        """交易功能，返回交易是否生效"""
+        with self._locked(player1_no, player2_no):
+            ok = self._trade(player1_no, player2_no, k)
+        # 自动执行导出
+        if ok and self.auto_export:
+            self.export_data()
+        return ok
+        
+    def _trade(self, player1_no: int, player2_no: int, k: int) -> bool:
+        """交易结算，调用方需持有双方的锁"""
         try:
-            p1 = self.players[player1_no-1]
-            p2 = self.players[player2_no-1]
+            p1 = self.get_player(player1_no)
+            p2 = self.get_player(player2_no)
             
+            if p1 is p2:
+                self.output("交易失败：不能与自己交易！")
+                return False
+            if k <= 0:
+                self.output("交易失败：交易血量必须为正数！")
+                return False
             if not p1.is_alive or not p2.is_alive:
-                print("交易失败：有玩家已死亡！")
-                return
+                self.output("交易失败：有玩家已死亡！")
+                return False
                 
-            # 检查交易血量是否超过10
-            if p2.trade + k > 10:
-                print("交易失败：玩家{}的交易血量将超过10！".format(player2_no))
-                return
+            # 检查交易血量是否超过上限
+            if p2.trade + k > self.trade_cap:
+                self.output("交易失败：玩家{}的交易血量将超过{}！".format(player2_no, self.trade_cap))
+                return False
                 
             # 检查玩家1是否有足够血量
             if p1.blood < k:
-                print("交易失败：玩家{}血量不足！".format(player1_no))
-                return
+                self.output("交易失败：玩家{}血量不足！".format(player1_no))
+                return False
                 
             # 执行交易
             p1.blood -= k
@@ -279,180 +745,266 @@ class Game:
             p1.trade -= k
             p2.trade += k
             
-            record = f"交易 - 玩家{player1_no} -> 玩家{player2_no}: {k}点血"
-            self.records.append(record)
-            print(f"交易成功！{record}")
-            print(f"玩家{player1_no}血量: {p1.blood}, 交易血量: {p1.trade}")
-            print(f"玩家{player2_no}血量: {p2.blood}, 交易血量: {p2.trade}")
-            
-            # 自动执行导出
-            self.export_data()
+            record = (RECORD_TRADE, player1_no, player2_no, k)
+            self._log_action(record, {"type": "trade", "p1": player1_no, "p2": player2_no, "k": k}, p1, p2)
+            self.output(f"交易成功！{render_record(record)}")
+            self.output(f"玩家{player1_no}血量: {p1.blood}, 交易血量: {p1.trade}")
+            self.output(f"玩家{player2_no}血量: {p2.blood}, 交易血量: {p2.trade}")
+            return True
             
         except IndexError:
-            print("玩家编号不存在！")
+            self.output("玩家编号不存在！")
+            return False
             
-    def hunt(self, player1_no: int, player2_no: int, k: int):
-        """捕食功能"""
+    def hunt(self, player1_no: int, player2_no: int, k: int) -> bool:
+        """捕食功能，返回捕食是否生效(打平也算生效)"""
+        with self._locked(player1_no, player2_no):
+            ok = self._hunt(player1_no, player2_no, k)
+        # 自动执行f.导出功能
+        if ok and self.auto_export:
+            self.export_full_report()
+        return ok
+        
+    def _hunt(self, player1_no: int, player2_no: int, k: int) -> bool:
+        """捕食结算，调用方需持有双方的锁"""
         try:
-            p1 = self.players[player1_no-1]
-            p2 = self.players[player2_no-1]
+            p1 = self.get_player(player1_no)
+            p2 = self.get_player(player2_no)
             
+            if p1 is p2:
+                self.output("捕食失败：不能捕食自己！")
+                return False
+            if k <= 0:
+                self.output("捕食失败：捕食血量必须为正数！")
+                return False
             if not p1.is_alive or not p2.is_alive:
-                print("捕食失败：有玩家已死亡！")
-                return
+                self.output("捕食失败：有玩家已死亡！")
+                return False
                 
             # 检查克制关系
             result = self._check_restraint(p1, p2)
             
             if result == 1:  # player1克制player2
-                print(f"捕食成功！玩家{player1_no}克制玩家{player2_no}")
+                self.output(f"捕食成功！玩家{player1_no}克制玩家{player2_no}")
                 
                 if p2.blood <= k:  # player2死亡
                     # bugfix 击杀玩家获得全部捕食血量，而不是玩家剩余血量
-                    reward = k + 3
+                    reward = self.kill_reward(k)
                     p1.blood += reward
                     p2.blood = 0
                     p2.is_alive = False
+                    self._on_player_death(p2)
                     
-                    record = f"捕食 - 玩家{player1_no}捕食玩家{player2_no}成功，玩家{player2_no}死亡，玩家{player1_no}获得{reward}点血"
-                    self.records.append(record)
-                    print(f"玩家{player2_no}死亡！玩家{player1_no}获得{reward}点血奖励")
+                    record = (RECORD_HUNT_KILL, player1_no, player2_no, reward)
+                    self.output(f"玩家{player2_no}死亡！玩家{player1_no}获得{reward}点血奖励")
                     
                 else:  # player2存活
                     p1.blood += k
                     p2.blood -= k
-                    record = f"捕食 - 玩家{player1_no}捕食玩家{player2_no}成功: {k}点血"
-                    self.records.append(record)
-                    print(f"玩家{player1_no}获得{k}点血，玩家{player2_no}损失{k}点血")
+                    record = (RECORD_HUNT_WIN, player1_no, player2_no, k)
+                    self.output(f"玩家{player1_no}获得{k}点血，玩家{player2_no}损失{k}点血")
                     
             elif result == -1:  # player2克制player1
-                print(f"捕食失败！玩家{player2_no}克制玩家{player1_no}")
+                self.output(f"捕食失败！玩家{player2_no}克制玩家{player1_no}")
                 
                 if p1.blood <= k:  # player1死亡
                     # bugfix 击杀玩家获得全部捕食血量，而不是玩家剩余血量
-                    reward = k + 3
+                    reward = self.kill_reward(k)
                     p2.blood += reward
                     p1.blood = 0
                     p1.is_alive = False
+                    self._on_player_death(p1)
                     
-                    record = f"捕食 - 玩家{player1_no}捕食玩家{player2_no}失败，玩家{player1_no}死亡，玩家{player2_no}获得{reward}点血"
-                    self.records.append(record)
-                    print(f"玩家{player1_no}死亡！玩家{player2_no}获得{reward}点血奖励")
+                    record = (RECORD_HUNT_DIE, player1_no, player2_no, reward)
+                    self.output(f"玩家{player1_no}死亡！玩家{player2_no}获得{reward}点血奖励")
                     
                 else:  # player1存活
                     p2.blood += k
                     p1.blood -= k
-                    record = f"捕食 - 玩家{player1_no}捕食玩家{player2_no}失败: 玩家{player2_no}获得{k}点血"
-                    self.records.append(record)
-                    print(f"玩家{player2_no}获得{k}点血，玩家{player1_no}损失{k}点血")
+                    record = (RECORD_HUNT_LOSE, player1_no, player2_no, k)
+                    self.output(f"玩家{player2_no}获得{k}点血，玩家{player1_no}损失{k}点血")
                     
             else:  # 平局
-                print("捕食无效：双方身份打平！")
-                record = f"捕食 - 玩家{player1_no}与玩家{player2_no}打平"
-                self.records.append(record)
+                self.output("捕食无效：双方身份打平！")
+                record = (RECORD_HUNT_TIE, player1_no, player2_no)
                 
-            # 打印当前血量
-            print(f"玩家{player1_no}当前血量: {p1.blood}")
-            print(f"玩家{player2_no}当前血量: {p2.blood}")
+            self._log_action(record, {"type": "hunt", "p1": player1_no, "p2": player2_no, "k": k, "result": result}, p1, p2)
             
-            # 自动执行f.导出功能
-            self.export_full_report()
+            # 打印当前血量
+            self.output(f"玩家{player1_no}当前血量: {p1.blood}")
+            self.output(f"玩家{player2_no}当前血量: {p2.blood}")
+            return True
             
         except IndexError:
-            print("玩家编号不存在！")
+            self.output("玩家编号不存在！")
+            return False
             
-    def modify_blood(self, player_no: int, k: int, note: str = ""):
-        """修改血量"""
+    def modify_blood(self, player_no: int, k: int, note: str = "") -> bool:
+        """修改血量，返回修改是否生效"""
+        with self._locked(player_no):
+            ok = self._modify_blood(player_no, k, note)
+        # 自动执行导出
+        if ok and self.auto_export:
+            self.export_data()
+        return ok
+        
+    def _modify_blood(self, player_no: int, k: int, note: str = "") -> bool:
+        """修改血量结算，调用方需持有该玩家的锁"""
         try:
-            player = self.players[player_no-1]
+            player = self.get_player(player_no)
             
             if not player.is_alive:
-                print("操作失败：该玩家已死亡！")
-                return
+                self.output("操作失败：该玩家已死亡！")
+                return False
                 
             player.blood += k
             
             if player.blood <= 0:
                 player.blood = 0
                 player.is_alive = False
-                print(f"玩家{player_no}死亡！")
+                self._on_player_death(player)
+                self.output(f"玩家{player_no}死亡！")
                 
-            record = f"修改血量 - 玩家{player_no} {'增加' if k > 0 else '减少'}{abs(k)}点血"
+            record = (RECORD_MODIFY_ADD if k > 0 else RECORD_MODIFY_SUB, player_no, abs(k))
             if note:
-                record += f" ({note})"
-            self.records.append(record)
+                record = f"{render_record(record)} ({note})"
+            self._log_action(record, {"type": "modify", "player": player_no, "k": k, "note": note}, player)
             
-            print(f"操作成功！玩家{player_no}当前血量: {player.blood}")
-            
-            # 自动执行导出
-            self.export_data()
+            self.output(f"操作成功！玩家{player_no}当前血量: {player.blood}")
+            return True
             
         except IndexError:
-            print("玩家编号不存在！")
+            self.output("玩家编号不存在！")
+            return False
             
+    def transaction(self) -> Transaction:
+        """开始一批同时行动"""
+        return Transaction(self)
+        
     def view_blood(self):
         """查看血量"""
-        print("\n=== 玩家状态 ===")
-        for player in self.players:
-            print(player.get_info())
+        self.output("\n=== 玩家状态 ===")
+        if self.players:
+            # 线程安全模式下与修改玩家的操作互斥，避免把过期的玩家文本写回缓存
+            with self._locked_all(), self._state_lock:
+                block = self._player_block()
+            self.output(block)
+            
+    def _player_block(self, identity: bool = False) -> str:
+        """
+        全部玩家的状态(identity为True时为身份)文本，每行一名玩家
+        各玩家的文本自带缓存；都没有变化时直接复用上次拼好的整块
+        """
+        parts = [str(p) if identity else p.get_info() for p in self.players]
+        key = "identity" if identity else "status"
+        cached = self._block_cache.get(key)
+        if cached is not None and len(cached[0]) == len(parts) and all(a is b for a, b in zip(cached[0], parts)):
+            return cached[1]
+        text = "\n".join(parts)
+        self._block_cache[key] = (parts, text)
+        return text
+        
+    def _record_block(self, numbered: bool = False) -> str:
+        """
+        操作记录文本(numbered为True时带序号)
+        不缓存：导出本身就要写出全部记录，缓存整块文本只会让每局常驻一份记录全文
+        """
+        if numbered:
+            return "\n".join(f"{i:3d}. {record}" for i, record in enumerate(self.records, 1))
+        return "\n".join(self.records)
+            
+    def data_report_filename(self) -> str:
+        """数据导出文件名"""
+        return f"{self.export_prefix}{datetime.datetime.now().strftime('%Y-%m-%d')}.txt"
+        
+    def full_report_filename(self) -> str:
+        """完整报告文件名"""
+        return f"{self.export_prefix}{datetime.datetime.now().strftime('%Y-%m-%d_%H%M%S')}_full.txt"
+        
+    def render_data_report(self) -> str:
+        """生成数据导出文本"""
+        lines = [
+            f"游戏数据导出 - {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+            f"玩家人数: {self.player_count}",
+            "=" * 50,
+            "",
+            "=== 操作记录 ===",
+        ]
+        if self.records:
+            lines.append(self._record_block())
+        lines.append("")
+        lines.append("=== 当前玩家状态 ===")
+        if self.players:
+            lines.append(self._player_block())
+        return "\n".join(lines) + "\n"
+        
+    def render_full_report(self) -> str:
+        """生成完整报告文本"""
+        lines = [
+            f"游戏完整报告 - {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+            f"玩家人数: {self.player_count}",
+            "=" * 60,
+            "",
+            "=== 身份分配 ===",
+        ]
+        if self.players:
+            lines.append(self._player_block(identity=True))
+        lines.append("")
+        lines.append("=== 详细操作记录 ===")
+        if self.records:
+            lines.append(self._record_block(numbered=True))
+        lines.append("")
+        lines.append("=== 最终玩家状态 ===")
+        if self.players:
+            lines.append(self._player_block())
+        return "\n".join(lines) + "\n"
+        
+    @staticmethod
+    def write_report(filename: str, text: str):
+        """将报告文本写入文件"""
+        with open(filename, 'w', encoding='utf-8') as f:
+            f.write(text)
             
     def export_data(self):
         """导出数据到txt文件"""
-        filename = f"{datetime.datetime.now().strftime('%Y-%m-%d')}.txt"
+        filename = self.data_report_filename()
         try:
-            with open(filename, 'w', encoding='utf-8') as f:
-                f.write(f"游戏数据导出 - {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                f.write(f"玩家人数: {self.player_count}\n")
-                f.write("=" * 50 + "\n")
-                
-                f.write("\n=== 操作记录 ===\n")
-                for record in self.records:
-                    f.write(record + "\n")
-                    
-                f.write("\n=== 当前玩家状态 ===\n")
-                for player in self.players:
-                    f.write(player.get_info() + "\n")
-                    
-            print(f"数据已导出到 {filename}")
+            with self._locked_all(), self._state_lock:
+                text = self.render_data_report()
+            self.write_report(filename, text)
+            self.output(f"数据已导出到 {filename}")
         except Exception as e:
-            print(f"导出失败: {e}")
+            self.output(f"导出失败: {e}")
             
     def export_full_report(self):
         """导出完整报告"""
-        filename = f"{datetime.datetime.now().strftime('%Y-%m-%d_%H%M%S')}_full.txt"
+        filename = self.full_report_filename()
         try:
-            with open(filename, 'w', encoding='utf-8') as f:
-                f.write(f"游戏完整报告 - {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                f.write(f"玩家人数: {self.player_count}\n")
-                f.write("=" * 60 + "\n")
-                
-                f.write("\n=== 身份分配 ===\n")
-                for player in self.players:
-                    f.write(str(player) + "\n")
-                    
-                f.write("\n=== 详细操作记录 ===\n")
-                for i, record in enumerate(self.records, 1):
-                    f.write(f"{i:3d}. {record}\n")
-                    
-                f.write("\n=== 最终玩家状态 ===\n")
-                for player in self.players:
-                    f.write(player.get_info() + "\n")
-                    
-            print(f"完整报告已导出到 {filename}")
+            with self._locked_all(), self._state_lock:
+                text = self.render_full_report()
+            if self.archive is not None:
+                bundle = self.archive.add(filename, text)
+                self.output(f"完整报告已归档到 {bundle}")
+                return
+            self.write_report(filename, text)
+            self.output(f"完整报告已导出到 {filename}")
         except Exception as e:
-            print(f"导出失败: {e}")
+            self.output(f"导出失败: {e}")
             
     def end_game(self):
         """结束游戏"""
-        print("\n=== 游戏结束 ===")
+        self.output("\n=== 游戏结束 ===")
         self.view_blood()
         self.export_full_report()
-        print("游戏已结束，感谢游玩！")
+        self.output("游戏已结束，感谢游玩！")
         
     def run(self):
         """运行游戏"""
         self.setup_game()
+        self.menu()
         
+    def menu(self):
+        """主菜单循环，已初始化的游戏(例如接管的备机)可直接进入"""
         while True:
             print("\n=== 主菜单 ===")
             print("a. 交易")
@@ -461,6 +1013,7 @@ class Game:
             print("d. 查看血量")
             print("e. 导出数据")
             print("f. 结束游戏")
+            print("g. 下一回合")
             
             choice = input("请输入选项: ").strip().lower()
             
@@ -505,8 +1058,40 @@ class Game:
                 self.end_game()
                 break
                 
+            elif choice == 'g':
+                self.next_round()
+                
             else:
                 print("无效选项，请重新选择！")
+                continue
+                
+            reason = self.check_game_over()
+            if reason:
+                print(f"\n游戏已分出结果：{reason}")
+                self.end_game()
+                break
+
+@lru_cache(maxsize=None)
+def restraint_table(player_count: int, joker_count: Optional[int] = None
+                    ) -> Tuple[Tuple[Tuple[CardSuit, CardRank], ...], Tuple[Tuple[int, ...], ...]]:
+    """
+    某人数局所有不同身份牌两两之间的克制结果(按参数缓存)
+    返回: (身份牌列表, 结果矩阵)，矩阵[i][j]即身份i捕食身份j时_check_restraint的结果
+    """
+    if joker_count is None:
+        joker_count = DEFAULT_JOKER_COUNTS[player_count]
+    cards = tuple(dict.fromkeys(build_deck(player_count, joker_count)))
+    game = Game(rules=RuleConfig(joker_counts={player_count: joker_count}))
+    game.player_count = player_count
+    reps = []
+    for i, (suit, rank) in enumerate(cards):
+        player = Player(i+1)
+        player.suit = suit
+        player.rank = rank
+        reps.append(player)
+    table = tuple(tuple(game._check_restraint(p1, p2) for p2 in reps) for p1 in reps)
+    return cards, table
+
 
 if __name__ == "__main__":
     game = Game()
@@ -0,0 +1,179 @@
+"""
+随机压力测试
+
+生成很长的随机操作序列(交易/捕食/修改血量/下一回合)，其中刻意混入非法操作：
+越界编号(包括0和负数)、已死亡玩家、对自己操作、非正数血量、超过交易上限等。
+每步之后检查不变量：
+  - 血量不为负，死亡玩家血量为0
+  - 所有玩家交易血量之和为0，且不超过交易上限
+  - 含非法编号的操作必须失败，失败的操作不改变任何状态、不追加记录
+  - 成功的操作恰好追加一条记录，存活计数器与实际一致
+发现违规后把操作序列收缩成最小复现。
+
+用法: python fuzz.py [--ops 1000000] [--seed 0]
+"""
+import random
+import time
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from forest import Game, discard_output
+
+Op = Tuple  # ("trade", p1, p2, k) / ("hunt", p1, p2, k) / ("modify", p, k) / ("round",)
+
+
+def new_game(player_count: int, seed: int) -> Game:
+    """创建关闭输出与导出的游戏"""
+    game = Game(output=discard_output, seed=seed)
+    game.auto_export = False
+    game.setup_game(player_count)
+    return game
+
+
+def generate_ops(rng: random.Random, player_count: int, length: int) -> List[Op]:
+    """生成随机操作序列，约两成操作带非法参数"""
+    ops: List[Op] = []
+    low, high = -1, player_count + 2
+    for _ in range(length):
+        roll = rng.random()
+        if roll < 0.8:
+            a = rng.randint(1, player_count)
+            b = rng.randint(1, player_count)
+        else:
+            a = rng.randint(low, high)
+            b = rng.randint(low, high)
+        kind = rng.random()
+        if kind < 0.4:
+            ops.append(("trade", a, b, rng.randint(-2, 12)))
+        elif kind < 0.8:
+            ops.append(("hunt", a, b, rng.randint(-2, 25)))
+        elif kind < 0.98:
+            ops.append(("modify", a, rng.randint(-25, 15)))
+        else:
+            ops.append(("round",))
+    return ops
+
+
+def apply_op(game: Game, op: Op) -> bool:
+    kind = op[0]
+    if kind == "trade":
+        return game.trade(op[1], op[2], op[3])
+    if kind == "hunt":
+        return game.hunt(op[1], op[2], op[3])
+    if kind == "modify":
+        return game.modify_blood(op[1], op[2])
+    game.next_round()
+    return True
+
+
+def _state(game: Game) -> Tuple:
+    return tuple((p.blood, p.trade, p.is_alive) for p in game.players)
+
+
+def check_step(game: Game, op: Op, ok: bool, before: Tuple, records_before: int) -> Optional[str]:
+    """检查一步操作后的不变量，返回违规描述"""
+    count = len(game.players)
+    indices = op[1:3] if op[0] in ("trade", "hunt") else op[1:2]
+    if not ok and _state(game) != before:
+        return "失败的操作改变了状态"
+    if any(not 1 <= no <= count for no in indices) and ok:
+        return "含非法编号的操作被执行"
+    if len(game.records) != records_before + (1 if ok else 0):
+        return "记录条数与操作结果不符"
+
+    trade_sum = 0
+    alive = 0
+    cap = game.trade_cap
+    for p in game.players:
+        if p.blood < 0:
+            return f"玩家{p.no}血量为负"
+        if not p.is_alive and p.blood != 0:
+            return f"死亡玩家{p.no}血量不为0"
+        if p.trade > cap:
+            return f"玩家{p.no}交易血量超过上限"
+        trade_sum += p.trade
+        alive += p.is_alive
+    if trade_sum != 0:
+        return "交易血量之和不为0"
+    if game.alive_count != alive:
+        return "存活计数器与实际不符"
+    return None
+
+
+def run_ops(ops: Sequence[Op], player_count: int, seed: int) -> Optional[Tuple[int, str]]:
+    """执行操作序列，返回 (第一个违规的操作序号, 描述)，没有违规时返回None"""
+    game = new_game(player_count, seed)
+    game.check_game_over()  # 建立结束判定计数器
+    for i, op in enumerate(ops):
+        before = _state(game)
+        records_before = len(game.records)
+        try:
+            ok = apply_op(game, op)
+        except Exception as e:  # 任何异常都算违规
+            return i, f"抛出异常: {e!r}"
+        problem = check_step(game, op, ok, before, records_before)
+        if problem:
+            return i, problem
+    return None
+
+
+def shrink(ops: List[Op], fails: Callable[[List[Op]], bool]) -> List[Op]:
+    """删减操作序列直到不能再删(仍然失败)，得到最小复现"""
+    ops = list(ops)
+    chunk = max(1, len(ops) // 2)
+    while chunk >= 1:
+        i = 0
+        removed = False
+        while i < len(ops):
+            candidate = ops[:i] + ops[i+chunk:]
+            if candidate and fails(candidate):
+                ops = candidate
+                removed = True
+            else:
+                i += chunk
+        if not removed:
+            chunk //= 2
+    return ops
+
+
+def fuzz(total_ops: int, seed: int = 0, sequence_length: int = 2000,
+         player_counts: Sequence[int] = tuple(range(6, 14))) -> dict:
+    """
+    运行total_ops个随机操作
+    返回: {"ops", "seconds", "failure"}，failure为None或最小复现
+    """
+    rng = random.Random(seed)
+    done = 0
+    start = time.perf_counter()
+    while done < total_ops:
+        player_count = rng.choice(player_counts)
+        game_seed = rng.randrange(1 << 30)
+        ops = generate_ops(rng, player_count, min(sequence_length, total_ops - done))
+        failure = run_ops(ops, player_count, game_seed)
+        done += len(ops)
+        if failure:
+            index, _ = failure
+            minimal = shrink(ops[:index+1], lambda c: run_ops(c, player_count, game_seed) is not None)
+            _, message = run_ops(minimal, player_count, game_seed)
+            return {"ops": done, "seconds": time.perf_counter() - start, "failure": {
+                "player_count": player_count, "seed": game_seed, "ops": minimal, "problem": message,
+            }}
+    return {"ops": done, "seconds": time.perf_counter() - start, "failure": None}
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="森林进化论随机压力测试")
+    parser.add_argument("--ops", type=int, default=1000000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    report = fuzz(args.ops, args.seed)
+    rate = report["ops"] / report["seconds"] * 60
+    print(f"执行{report['ops']}个操作，用时{report['seconds']:.1f}秒(约{rate:,.0f}次/分钟)")
+    if report["failure"]:
+        failure = report["failure"]
+        print(f"发现违规：{failure['problem']}")
+        print(f"最小复现({failure['player_count']}人局, seed={failure['seed']}):")
+        for op in failure["ops"]:
+            print(f"  {op}")
+    else:
+        print("未发现违规")
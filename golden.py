@@ -0,0 +1,263 @@
+"""
+黄金轨迹回归
+
+golden/目录下每个人数局有若干份固定种子的轨迹：操作序列、每步结果、最终状态、
+全部记录以及两种导出报告的摘要。回放时用同一种子发牌，依次执行操作，
+要求每步结果、最终状态、记录和报告都与轨迹完全一致，同时计时，
+一套轨迹同时覆盖trade/hunt/_check_restraint与导出路径的正确性和速度。
+
+每份轨迹都包含：击杀、交易超过上限被拒、修改血量致死；有两张Joker的人数局还包含Joker之间打平。
+
+计时基准golden/timings.json随轨迹一起提交，test_golden按它检查速度回归；
+换了明显更慢的机器时可设置环境变量GOLDEN_MAX_SLOWDOWN放宽允许的倍数，或重新记录基准。
+
+用法:
+    python golden.py check [--baseline golden/timings.json] [--max-slowdown 3]
+    python golden.py generate        重新生成轨迹(规则有意改变时)
+    python golden.py baseline        在本机记录计时基准(写入golden/timings.json)
+"""
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+from forest import DEFAULT_JOKER_COUNTS, CardRank, Game, RuleConfig, discard_output
+
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden")
+BASELINE_PATH = os.path.join(GOLDEN_DIR, "timings.json")
+FEATURES = ("kill", "trade_cap_reject", "modify_death", "joker_tie")
+_TIMESTAMP = re.compile(r"\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}")
+
+
+def _new_game(trace: dict) -> Game:
+    game = Game(output=discard_output, seed=trace["seed"], rules=RuleConfig.from_dict(trace["rules"]))
+    game.auto_export = False
+    game.setup_game(trace["player_count"])
+    return game
+
+
+def apply_op(game: Game, op: list) -> bool:
+    kind = op[0]
+    if kind == "trade":
+        return game.trade(op[1], op[2], op[3])
+    if kind == "hunt":
+        return game.hunt(op[1], op[2], op[3])
+    if kind == "modify":
+        return game.modify_blood(op[1], op[2], op[3])
+    if kind == "round":
+        game.next_round()
+        return True
+    tx = game.transaction()
+    for action, no1, no2, k in op[1]:
+        getattr(tx, action)(no1, no2, k)
+    return tx.commit()
+
+
+def _report_digest(text: str) -> str:
+    """报告摘要，忽略导出与初始化时间"""
+    return hashlib.sha256(_TIMESTAMP.sub("", text).encode("utf-8")).hexdigest()
+
+
+def final_state(game: Game) -> dict:
+    return {
+        "players": [[p.no, str(p), p.blood, p.trade, p.is_alive] for p in game.players],
+        "records": list(game.records)[1:],  # 首条记录含初始化时间
+        "data_report": _report_digest(game.render_data_report()),
+        "full_report": _report_digest(game.render_full_report()),
+    }
+
+
+# ---------- 生成 ----------
+
+def _scripted_ops(game: Game, rng: random.Random) -> List[list]:
+    """根据发到的身份构造必须覆盖的情形"""
+    players = game.players
+    ops: List[list] = []
+    # 交易超过上限被拒：连续向同一人交易到超过上限
+    cap = game.trade_cap
+    ops += [["trade", 1, 2, cap // 2], ["trade", 3, 2, cap // 2], ["trade", 4, 2, 1]]
+    # Joker之间打平
+    jokers = [p.no for p in players if p.rank == CardRank.JOKER]
+    if len(jokers) >= 2:
+        ops.append(["hunt", jokers[0], jokers[1], 5])
+    # 击杀：找一对克制关系，捕食血量不少于对方血量
+    pairs = [(a.no, b.no) for a in players for b in players
+             if a.no != b.no and a.rank != CardRank.JOKER and b.rank != CardRank.JOKER
+             and game._check_restraint(a, b) == 1]
+    winner, loser = rng.choice(pairs)
+    ops.append(["hunt", winner, loser, 30])
+    # 修改血量致死
+    victim = rng.choice([p.no for p in players if p.no not in (winner, loser)])
+    ops.append(["modify", victim, -100, "违规出局"])
+    ops.append(["round"])
+    return ops
+
+
+def _random_ops(rng: random.Random, player_count: int, count: int) -> List[list]:
+    ops: List[list] = []
+    for _ in range(count):
+        a, b = rng.randint(1, player_count), rng.randint(1, player_count)
+        roll = rng.random()
+        if roll < 0.35:
+            ops.append(["trade", a, b, rng.randint(1, 6)])
+        elif roll < 0.75:
+            ops.append(["hunt", a, b, rng.randint(1, 8)])
+        elif roll < 0.85:
+            ops.append(["modify", a, rng.choice((-3, -1, 2)), rng.choice(("", "奖励"))])
+        elif roll < 0.93:
+            c = rng.randint(1, player_count)
+            ops.append(["batch", [["trade", a, b, 1], ["hunt", c, a, rng.randint(1, 4)]]])
+        else:
+            ops.append(["round"])
+    return ops
+
+
+def features_of(game: Game, ops: List[list], results: List[bool]) -> List[str]:
+    found = set()
+    for op, ok in zip(ops, results):
+        if op[0] == "trade" and not ok:
+            found.add("trade_cap_reject")
+    for record in game.records:
+        if "死亡" in record and record.startswith("捕食"):
+            found.add("kill")
+        if record.startswith("修改血量") and "违规出局" in record:
+            found.add("modify_death")
+    jokers = {p.no for p in game.players if p.rank == CardRank.JOKER}
+    for op, ok in zip(ops, results):
+        if op[0] == "hunt" and ok and op[1] in jokers and op[2] in jokers:
+            found.add("joker_tie")
+    return sorted(found)
+
+
+def build_trace(player_count: int, seed: int, random_ops: int = 100) -> dict:
+    trace = {"player_count": player_count, "seed": seed, "rules": RuleConfig().to_dict()}
+    game = _new_game(trace)
+    rng = random.Random(seed * 31 + player_count)
+    ops = _scripted_ops(game, rng) + _random_ops(rng, player_count, random_ops)
+    results = [apply_op(game, op) for op in ops]
+    trace.update(ops=ops, results=results, features=features_of(game, ops, results), expected=final_state(game))
+    return trace
+
+
+def trace_path(directory: str, player_count: int, seed: int) -> str:
+    return os.path.join(directory, f"trace_{player_count:02d}_{seed}.json")
+
+
+def generate(directory: str = GOLDEN_DIR, seeds: Tuple[int, ...] = (1, 2)) -> List[str]:
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for player_count in sorted(DEFAULT_JOKER_COUNTS):
+        for seed in seeds:
+            trace = build_trace(player_count, seed)
+            path = trace_path(directory, player_count, seed)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(trace, f, ensure_ascii=False, separators=(",", ":"))
+                f.write("\n")
+            paths.append(path)
+    return paths
+
+
+# ---------- 回放 ----------
+
+def load_traces(directory: str = GOLDEN_DIR) -> Dict[str, dict]:
+    traces = {}
+    for name in sorted(os.listdir(directory)):
+        if name.startswith("trace_") and name.endswith(".json"):
+            with open(os.path.join(directory, name), encoding="utf-8") as f:
+                traces[name[:-5]] = json.load(f)
+    return traces
+
+
+def replay_trace(trace: dict, repeat: int = 1) -> Tuple[List[str], float]:
+    """
+    回放一份轨迹repeat次
+    返回: (不一致之处, 单次回放的最短耗时秒数)
+    """
+    best = float("inf")
+    problems: List[str] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        game = _new_game(trace)
+        results = [apply_op(game, op) for op in trace["ops"]]
+        state = final_state(game)
+        best = min(best, time.perf_counter() - start)
+
+    for i, (actual, expected) in enumerate(zip(results, trace["results"])):
+        if actual != expected:
+            problems.append(f"第{i+1}个操作{trace['ops'][i]}结果为{actual}，应为{expected}")
+            break
+    expected = trace["expected"]
+    if state["players"] != expected["players"]:
+        problems.append(f"最终玩家状态不一致: {state['players']} != {expected['players']}")
+    if state["records"] != expected["records"]:
+        for i, (a, b) in enumerate(zip(state["records"], expected["records"])):
+            if a != b:
+                problems.append(f"第{i+2}条记录不一致: {a!r} != {b!r}")
+                break
+        else:
+            problems.append(f"记录条数不一致: {len(state['records'])} != {len(expected['records'])}")
+    for key in ("data_report", "full_report"):
+        if state[key] != expected[key]:
+            problems.append(f"{key}内容不一致")
+    return problems, best
+
+
+def load_baseline(path: str = BASELINE_PATH) -> Dict[str, float]:
+    """读取计时基准 {轨迹名: 秒数}"""
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def check(directory: str = GOLDEN_DIR, baseline: Optional[Dict[str, float]] = None,
+          max_slowdown: float = 3.0, repeat: int = 3) -> Tuple[Dict[str, List[str]], Dict[str, float]]:
+    """
+    回放全部轨迹
+    返回: ({轨迹名: 问题列表}, {轨迹名: 耗时})；给出baseline时耗时超过基准max_slowdown倍也算问题
+    """
+    failures: Dict[str, List[str]] = {}
+    timings: Dict[str, float] = {}
+    for name, trace in load_traces(directory).items():
+        problems, seconds = replay_trace(trace, repeat)
+        timings[name] = seconds
+        if baseline and name in baseline and seconds > baseline[name] * max_slowdown:
+            problems.append(f"耗时{seconds * 1000:.2f}毫秒，超过基准{baseline[name] * 1000:.2f}毫秒的{max_slowdown}倍")
+        if problems:
+            failures[name] = problems
+    return failures, timings
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="森林进化论黄金轨迹回归")
+    parser.add_argument("command", choices=("check", "generate", "baseline"))
+    parser.add_argument("--dir", default=GOLDEN_DIR)
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="计时基准文件")
+    parser.add_argument("--max-slowdown", type=float, default=3.0)
+    args = parser.parse_args()
+
+    if args.command == "generate":
+        for path in generate(args.dir):
+            print(f"已生成 {path}")
+        sys.exit(0)
+
+    baseline = None
+    if args.command == "check" and os.path.exists(args.baseline):
+        baseline = load_baseline(args.baseline)
+    failures, timings = check(args.dir, baseline, args.max_slowdown,
+                              repeat=5 if args.command == "baseline" else 3)
+    for name, seconds in timings.items():
+        status = "不一致" if name in failures else "通过"
+        print(f"{name}: {seconds * 1000:.2f}毫秒 {status}")
+        for problem in failures.get(name, []):
+            print(f"  {problem}")
+    if args.command == "baseline":
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({name: round(seconds, 6) for name, seconds in timings.items()}, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"计时基准已写入 {args.baseline}")
+    print(f"共{len(timings)}份轨迹，{len(failures)}份不一致")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,263 @@
+"""
+操作记录哈希链
+
+对局的每条操作记录依次计算：
+    叶子   leaf_i = sha256(0x00 + 记录)
+    链     head_i = sha256(head_{i-1} + leaf_i)      head_{-1} 为32个零字节
+    Merkle 树按叶子逐层两两合并 sha256(0x01 + 左 + 右)，落单的节点直接上提
+
+head_i 相同即前i+1条记录完全相同，所以两份记录(内存中的对局、导出的报告、另一个进程)
+只需二分比较head就能在O(log n)次比较内找到第一条不一致的记录(first_divergence)。
+Merkle根与记录条数作为记录摘要(summary)；game_summary/report_summary另外加上
+身份分配与玩家状态文本的摘要(state)，导出报告在使用前按摘要校验(verify_report)，
+记录或玩家状态被改动都校验不通过。单条记录可用proof给出O(log n)大小的证明，不需要全部记录即可校验。
+
+新记录只需追加：哈希链和Merkle树都是增量更新，每条记录O(log n)次哈希。
+
+用法:
+    python hashchain.py summary REPORT > S.json      完整报告的摘要
+    python hashchain.py verify REPORT S.json         按摘要校验报告
+    python hashchain.py diff REPORT_A REPORT_B       找出两份报告第一条不一致的记录
+"""
+import hashlib
+import json
+import weakref
+from typing import TYPE_CHECKING, Iterable, List, Optional, Tuple
+
+from forest import Game
+
+if TYPE_CHECKING:
+    from multiprocessing.connection import Connection
+
+_ZERO = bytes(32)
+
+
+def _leaf(record: str) -> bytes:
+    return hashlib.sha256(b"\x00" + record.encode("utf-8")).digest()
+
+
+def _node(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(b"\x01" + left + right).digest()
+
+
+class HashChain:
+    """记录的哈希链与Merkle树"""
+    def __init__(self, records: Iterable[str] = ()):
+        self._heads: List[bytes] = []
+        self._levels: List[List[bytes]] = [[]]
+        self._source = None  # sync的记录来源
+        self.extend(records)
+
+    @property
+    def length(self) -> int:
+        return len(self._heads)
+
+    def append(self, record: str):
+        leaf = _leaf(record)
+        self._heads.append(hashlib.sha256((self._heads[-1] if self._heads else _ZERO) + leaf).digest())
+        levels = self._levels
+        levels[0].append(leaf)
+        k, index = 0, len(levels[0]) - 1
+        # 只有每层最后一个节点受影响
+        while len(levels[k]) > 1:
+            parent = index // 2
+            level = levels[k]
+            right = 2 * parent + 1
+            node = _node(level[right - 1], level[right]) if right < len(level) else level[right - 1]
+            if k + 1 == len(levels):
+                levels.append([])
+            upper = levels[k + 1]
+            if parent < len(upper):
+                upper[parent] = node
+            else:
+                upper.append(node)
+            k, index = k + 1, parent
+
+    def extend(self, records: Iterable[str]):
+        for record in records:
+            self.append(record)
+
+    def sync(self, records) -> "HashChain":
+        """追加records中尚未计算的记录；records被替换或变短时重新计算"""
+        if records is not self._source or len(records) < self.length:
+            self.__init__()
+            self._source = records
+        count = len(records)
+        if count > self.length:
+            self.extend(records[self.length:count])
+        return self
+
+    def head(self, index: int) -> str:
+        """前index+1条记录的链哈希(十六进制)"""
+        return self._heads[index].hex()
+
+    def root(self) -> str:
+        """Merkle根(十六进制)，没有记录时为空串"""
+        return self._levels[-1][0].hex() if self._heads else ""
+
+    def summary(self) -> dict:
+        return {"length": self.length, "head": self.head(-1) if self._heads else "", "root": self.root()}
+
+    def proof(self, index: int) -> List[Tuple[str, bool]]:
+        """第index条记录的Merkle证明：[(兄弟节点, 兄弟是否在左边), ...]"""
+        if not 0 <= index < self.length:
+            raise IndexError(f"没有第{index}条记录")
+        path = []
+        for level in self._levels[:-1]:
+            sibling = index ^ 1
+            if sibling < len(level):
+                path.append((level[sibling].hex(), sibling < index))
+            index //= 2
+        return path
+
+
+def verify_proof(record: str, proof: List[Tuple[str, bool]], root: str) -> bool:
+    """用Merkle证明校验单条记录属于摘要为root的记录"""
+    node = _leaf(record)
+    for sibling, left in proof:
+        sibling = bytes.fromhex(sibling)
+        node = _node(sibling, node) if left else _node(node, sibling)
+    return node.hex() == root
+
+
+def first_divergence(a, b) -> Optional[int]:
+    """
+    两份记录第一条不一致的记录序号(从0开始)，完全一致时返回None
+    a、b只需提供length和head(i)，比较head的次数不超过 log2(n) + 1
+    """
+    n = min(a.length, b.length)
+    if n == 0 or a.head(n - 1) == b.head(n - 1):
+        return None if a.length == b.length else n
+    lo, hi = 0, n - 1  # head(hi)不一致
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if a.head(mid) == b.head(mid):
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+_game_chains: "weakref.WeakKeyDictionary[Game, HashChain]" = weakref.WeakKeyDictionary()
+
+
+def chain_for(game: Game) -> HashChain:
+    """对局记录的哈希链，每次调用只计算新增的记录"""
+    chain = _game_chains.get(game)
+    if chain is None:
+        chain = _game_chains[game] = HashChain()
+    with game._state_lock:
+        return chain.sync(game.records)
+
+
+def state_digest(identities: str, status: str) -> str:
+    """身份分配与玩家状态文本(与完整报告中的两段相同)的摘要"""
+    return hashlib.sha256(f"{identities}\n\x00\n{status}".encode("utf-8")).hexdigest()
+
+
+def game_summary(game: Game) -> dict:
+    """对局的记录摘要加玩家状态摘要，与导出的完整报告的report_summary一致"""
+    with game._locked_all(), game._state_lock:
+        summary = chain_for(game).summary()
+        summary["state"] = state_digest(game._player_block(identity=True), game._player_block())
+    return summary
+
+
+# ---------- 导出报告 ----------
+
+def _section(lines: List[str], title: str) -> List[str]:
+    """报告中某一段的内容行(到空行或文件末尾为止)"""
+    start = lines.index(title) + 1
+    end = start
+    while end < len(lines) and lines[end]:
+        end += 1
+    return lines[start:end]
+
+
+def report_records(text: str) -> List[str]:
+    """从完整报告(render_full_report)中取出操作记录"""
+    return [line.lstrip().split(". ", 1)[1] for line in _section(text.split("\n"), "=== 详细操作记录 ===")]
+
+
+def load_report(path: str) -> HashChain:
+    with open(path, encoding="utf-8") as f:
+        return HashChain(report_records(f.read()))
+
+
+def report_summary(text: str) -> dict:
+    """完整报告的记录摘要加玩家状态摘要"""
+    lines = text.split("\n")
+    summary = HashChain(report_records(text)).summary()
+    summary["state"] = state_digest("\n".join(_section(lines, "=== 身份分配 ===")),
+                                    "\n".join(_section(lines, "=== 最终玩家状态 ===")))
+    return summary
+
+
+def verify_report(text: str, summary: dict) -> bool:
+    """按game_summary/report_summary给出的摘要校验完整报告：记录、身份与玩家状态都须一致"""
+    return report_summary(text) == summary
+
+
+# ---------- 跨进程比较 ----------
+
+def serve_chain(conn: "Connection", chain: HashChain):
+    """应答RemoteChain的查询，直到对方断开"""
+    try:
+        while True:
+            index = json.loads(conn.recv_bytes())
+            reply = chain.length if index is None else chain.head(index)
+            conn.send_bytes(json.dumps(reply).encode("utf-8"))
+    except (OSError, EOFError):
+        pass
+
+
+class RemoteChain:
+    """另一进程中的哈希链，每次查询一次往返，可直接交给first_divergence"""
+    def __init__(self, conn: "Connection"):
+        self.conn = conn
+        self.length = self._ask(None)
+
+    def _ask(self, index: Optional[int]):
+        self.conn.send_bytes(json.dumps(index).encode("utf-8"))
+        return json.loads(self.conn.recv_bytes())
+
+    def head(self, index: int) -> str:
+        return self._ask(index)
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+    parser = argparse.ArgumentParser(description="森林进化论操作记录哈希链")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("summary")
+    p.add_argument("report")
+    p = sub.add_parser("verify")
+    p.add_argument("report")
+    p.add_argument("summary", help="summary子命令输出的摘要文件")
+    p = sub.add_parser("diff")
+    p.add_argument("report_a")
+    p.add_argument("report_b")
+    args = parser.parse_args()
+
+    if args.command == "summary":
+        with open(args.report, encoding="utf-8") as f:
+            print(json.dumps(report_summary(f.read()), ensure_ascii=False))
+    elif args.command == "verify":
+        with open(args.report, encoding="utf-8") as f, open(args.summary, encoding="utf-8") as g:
+            ok = verify_report(f.read(), json.load(g))
+        print("报告完整" if ok else "报告与摘要不一致")
+        sys.exit(0 if ok else 1)
+    else:
+        records = []
+        for path in (args.report_a, args.report_b):
+            with open(path, encoding="utf-8") as f:
+                records.append(report_records(f.read()))
+        index = first_divergence(HashChain(records[0]), HashChain(records[1]))
+        if index is None:
+            print(f"两份记录一致，共{len(records[0])}条")
+            sys.exit(0)
+        print(f"第{index + 1}条记录起不一致:")
+        for path, lines in zip((args.report_a, args.report_b), records):
+            print(f"  {path}: {lines[index] if index < len(lines) else '(无)'}")
+        sys.exit(1)
@@ -0,0 +1,188 @@
+"""
+对局胜负概率表
+
+按_assign_identities使用的牌堆(build_deck)精确枚举：某身份的玩家与一名随机对手
+(在其余身份牌中均匀抽取)交手时，胜/负/平各有多少种情况，克制结果取自_check_restraint
+(restraint_table)。分两个方向：
+  - attack: 我捕食对手
+  - defend: 对手捕食我(Joker的克制关系与方向有关)
+
+还给出排除已公开身份后的条件概率。所有"已公开身份"的组合在建表时一次算好，
+已公开身份用混合进制整数key表示，查询为一次列表下标：
+    table = matchup_table(10)
+    key = table.reveal(0, (CardSuit.HEART, CardRank.Q))   # O(1)追加一个公开身份
+    table.defend((CardSuit.SPADE, CardRank.K), key).p_win
+
+用法: python matchups.py 10 [--revealed 红桃Q 黑桃J]
+"""
+from functools import lru_cache
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+from forest import DEFAULT_JOKER_COUNTS, CardRank, CardSuit, Game, build_deck, restraint_table
+
+Card = Tuple[CardSuit, CardRank]
+
+
+class Matchup(NamedTuple):
+    """从某身份一方看的交手结果计数(对手在剩余身份牌中均匀抽取)"""
+    win: int
+    lose: int
+    tie: int
+
+    @property
+    def total(self) -> int:
+        return self.win + self.lose + self.tie
+
+    @property
+    def p_win(self) -> float:
+        return self.win / self.total if self.total else 0.0
+
+    @property
+    def p_lose(self) -> float:
+        return self.lose / self.total if self.total else 0.0
+
+    @property
+    def p_tie(self) -> float:
+        return self.tie / self.total if self.total else 0.0
+
+
+class MatchupTable:
+    """某人数局全部身份、全部已公开身份组合的胜负计数表"""
+    def __init__(self, player_count: int, joker_count: int):
+        self.player_count = player_count
+        self.joker_count = joker_count
+        self.cards, self.table = restraint_table(player_count, joker_count)
+        self.index = {card: i for i, card in enumerate(self.cards)}
+        deck = build_deck(player_count, joker_count)
+        self.counts = tuple(deck.count(card) for card in self.cards)
+        # 已公开身份的key：第i种身份公开了c张，key加上 c * radix[i]
+        self.radix: List[int] = []
+        states = 1
+        for count in self.counts:
+            self.radix.append(states)
+            states *= count + 1
+        self.states = states
+        self._attack: List[Optional[Matchup]] = []
+        self._defend: List[Optional[Matchup]] = []
+        self._build()
+
+    def _build(self):
+        """按key从小到大建表：每个状态由少公开一张牌的状态减去该牌的贡献得到"""
+        n = len(self.cards)
+        table = self.table
+        attack = self._attack = [None] * (self.states * n)
+        defend = self._defend = [None] * (self.states * n)
+        for me in range(n):
+            # 什么都没公开：对手为除自己这张以外的全部身份牌
+            a, d = {1: 0, -1: 0, 0: 0}, {1: 0, -1: 0, 0: 0}
+            for other, count in enumerate(self.counts):
+                count -= other == me
+                a[table[me][other]] += count
+                d[-table[other][me]] += count  # 对手捕食我的结果取反即为我方视角
+            attack[me] = Matchup(a[1], a[-1], a[0])
+            defend[me] = Matchup(d[1], d[-1], d[0])
+
+        for key in range(1, self.states):
+            revealed = self._digits(key)
+            last = next(i for i, c in enumerate(revealed) if c)
+            parent = (key - self.radix[last]) * n
+            for me in range(n):
+                if revealed[me] >= self.counts[me]:
+                    continue  # 这种身份已全部公开，不可能是我
+                a, d = attack[parent + me], defend[parent + me]
+                hit = table[me][last]
+                attack[key * n + me] = Matchup(a.win - (hit == 1), a.lose - (hit == -1), a.tie - (hit == 0))
+                hit = table[last][me]
+                defend[key * n + me] = Matchup(d.win - (hit == -1), d.lose - (hit == 1), d.tie - (hit == 0))
+
+    def _digits(self, key: int) -> List[int]:
+        digits = []
+        for count in self.counts:
+            digits.append(key % (count + 1))
+            key //= count + 1
+        return digits
+
+    def reveal(self, key: int, card: Card) -> int:
+        """在已公开身份key上再公开一张card，返回新key"""
+        i = self.index.get(card)
+        if i is None:
+            raise ValueError(f"{self.player_count}人局中没有{_card_name(card)}")
+        if key // self.radix[i] % (self.counts[i] + 1) >= self.counts[i]:
+            raise ValueError(f"{self.player_count}人局中{_card_name(card)}已全部公开")
+        return key + self.radix[i]
+
+    def key_of(self, revealed: Iterable[Card] = ()) -> int:
+        """已公开身份(可重复，如两张Joker)对应的key"""
+        key = 0
+        for card in revealed:
+            key = self.reveal(key, card)
+        return key
+
+    def _lookup(self, rows: List[Optional[Matchup]], card: Card, key: int) -> Matchup:
+        result = rows[key * len(self.cards) + self.index[card]]
+        if result is None:
+            raise ValueError(f"{_card_name(card)}已全部公开，不可能是未公开的身份")
+        return result
+
+    def attack(self, card: Card, key: int = 0) -> Matchup:
+        """持card的玩家捕食一名随机对手(排除key中已公开身份)的结果计数"""
+        return self._lookup(self._attack, card, key)
+
+    def defend(self, card: Card, key: int = 0) -> Matchup:
+        """一名随机对手(排除key中已公开身份)捕食持card的玩家的结果计数，win表示card一方获胜"""
+        return self._lookup(self._defend, card, key)
+
+
+def matchup_table(player_count: int, joker_count: Optional[int] = None) -> MatchupTable:
+    """某人数局的胜负概率表(按参数缓存)"""
+    if joker_count is None:
+        joker_count = DEFAULT_JOKER_COUNTS[player_count]
+    return _cached_table(player_count, joker_count)
+
+
+@lru_cache(maxsize=None)
+def _cached_table(player_count: int, joker_count: int) -> MatchupTable:
+    return MatchupTable(player_count, joker_count)
+
+
+def matchup_for(game: Game, player_no: int, revealed: Iterable[int] = ()) -> Tuple[Matchup, Matchup]:
+    """
+    某玩家面对一名随机对手的 (捕食结果, 被捕食结果)
+    revealed为身份已公开的其他玩家编号，这些玩家的身份从对手中排除
+    """
+    table = matchup_table(game.player_count, game.rules.joker_count_for(game.player_count))
+    player = game.get_player(player_no)
+    key = table.key_of((p.suit, p.rank) for p in map(game.get_player, revealed) if p.no != player_no)
+    card = (player.suit, player.rank)
+    return table.attack(card, key), table.defend(card, key)
+
+
+def _card_name(card: Card) -> str:
+    return "Joker" if card[1] == CardRank.JOKER else f"{card[0].value}{card[1].value}"
+
+
+def _parse_card(table: MatchupTable, text: str) -> Card:
+    for card in table.cards:
+        if _card_name(card) == text:
+            return card
+    raise ValueError(f"{table.player_count}人局中没有身份: {text}")
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="森林进化论身份胜负概率表")
+    parser.add_argument("players", type=int)
+    parser.add_argument("--revealed", nargs="*", default=[], help="已公开的身份，如 红桃Q Joker")
+    args = parser.parse_args()
+
+    table = matchup_table(args.players)
+    key = table.key_of(_parse_card(table, text) for text in args.revealed)
+    print(f"{args.players}人局(排除已公开: {' '.join(args.revealed) or '无'})")
+    print("身份       捕食: 胜    负    平  |  被捕食: 胜    负    平")
+    for card in table.cards:
+        try:
+            a, d = table.attack(card, key), table.defend(card, key)
+        except ValueError:
+            continue
+        print(f"{_card_name(card):8s} {a.p_win:6.1%} {a.p_lose:6.1%} {a.p_tie:6.1%} | "
+              f"{d.p_win:6.1%} {d.p_lose:6.1%} {d.p_tie:6.1%}")
@@ -0,0 +1,314 @@
+"""
+热备复制
+
+主机把对局的初始状态(含发牌)和之后的每次操作经本地管道或套接字发送给备机，
+备机用同样的trade/hunt/modify_blood/next_round/同时行动重新执行每个操作，
+核对变化玩家的状态后确认(ack)。主机卡死或断开时备机接管，状态与发牌完全一致。
+
+消息为一行JSON(Connection.send_bytes)：
+    主机 -> 备机
+        {"t": "init", "seq": 0, "state": {...}}                         初始状态
+        {"t": "op", "seq": 5, "e": {"type": "hunt", ...}, "p": [...]}    一次操作及变化玩家的状态
+        {"t": "hb", "seq": 5}                                           心跳
+    备机 -> 主机
+        {"ack": 5, "ok": true}
+
+复制延迟由主机统计：未确认的操作数、最早未确认操作的等待时间、确认往返时间。
+
+用法:
+    python replication.py standby --port 6100     启动备机，主机失联后接管并进入主菜单
+    python replication.py primary --port 6100     启动主持程序并复制到备机
+"""
+import json
+import queue
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+from forest import CardRank, CardSuit, Game, Player, RecordLog, RuleConfig, discard_output
+
+if TYPE_CHECKING:
+    from multiprocessing.connection import Connection
+
+AUTHKEY = b"forest-replication"
+
+
+def _send(conn: "Connection", message: dict):
+    conn.send_bytes(json.dumps(message, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+
+def _recv(conn: "Connection") -> dict:
+    return json.loads(conn.recv_bytes().decode("utf-8"))
+
+
+def game_state(game: Game) -> dict:
+    """完整状态(含身份与记录)，用于初始同步"""
+    return {
+        "player_count": game.player_count,
+        "round": game.round_no,
+        "rules": game.rules.to_dict(),
+        "end_conditions": [game.end_conditions.single_survivor, game.end_conditions.no_restraint,
+                           game.end_conditions.max_rounds],
+        "players": [[p.no, p.suit.name, p.rank.name, p.blood, p.trade, p.is_alive] for p in game.players],
+        "records": list(game.records),
+    }
+
+
+def restore_game(state: dict, output=discard_output) -> Game:
+    """按game_state重建对局，不自动导出"""
+    game = Game(output=output, rules=RuleConfig.from_dict(state["rules"]))
+    game.auto_export = False
+    game.player_count = state["player_count"]
+    game.joker_count = game.rules.joker_count_for(game.player_count)
+    game.round_no = state["round"]
+    end = game.end_conditions
+    end.single_survivor, end.no_restraint, end.max_rounds = state["end_conditions"]
+    game.players = []
+    for no, suit, rank, blood, trade, alive in state["players"]:
+        player = Player(no, blood)
+        player.suit, player.rank = CardSuit[suit], CardRank[rank]
+        player.trade, player.is_alive = trade, alive
+        game.players.append(player)
+    game.records = RecordLog(state["records"])
+    game._init_counters()
+    return game
+
+
+def apply_event(game: Game, event: dict, expected=()) -> bool:
+    """
+    按监听器事件(trade/hunt/modify/round/batch)重新执行一次操作
+    expected为事件中变化玩家的 (编号, 血量, 交易血量, 存活)，给出时一并核对
+    返回: 操作成功且与expected一致
+    """
+    kind = event["type"]
+    if kind == "trade":
+        ok = game.trade(event["p1"], event["p2"], event["k"])
+    elif kind == "hunt":
+        ok = game.hunt(event["p1"], event["p2"], event["k"])
+    elif kind == "modify":
+        ok = game.modify_blood(event["player"], event["k"], event.get("note", ""))
+    elif kind == "round":
+        game.next_round()
+        ok = game.round_no == event["round"]
+    elif kind == "batch":
+        tx = game.transaction()
+        for action, no1, no2, k in event["actions"]:
+            getattr(tx, action)(no1, no2, k)
+        ok = tx.commit()
+    else:
+        ok = False
+    for no, blood, trade, alive in expected:
+        p = game.players[no-1]
+        if (p.blood, p.trade, p.is_alive) != (blood, trade, bool(alive)):
+            ok = False
+    return ok
+
+
+class ReplicationPrimary:
+    """主机端：监听对局事件并异步发送给备机，另一个线程接收确认"""
+    def __init__(self, game: Game, conn: "Connection", heartbeat_interval: float = 0.5):
+        self.game = game
+        self.conn = conn
+        self.heartbeat_interval = heartbeat_interval
+        self.seq = 0
+        self.acked = 0
+        self.failed_acks = 0
+        self.last_ack_latency = 0.0
+        self.max_ack_latency = 0.0
+        self._sent_at: Dict[int, float] = {}
+        self._queue: "queue.Queue[Optional[dict]]" = queue.Queue()
+        self._cond = threading.Condition()
+        self._threads = []
+        self._stopped = False
+
+    def start(self):
+        """发送初始状态并开始复制；之后的每个操作都会被复制"""
+        game = self.game
+        with game._locked_all(), game._state_lock:
+            _send(self.conn, {"t": "init", "seq": 0, "state": game_state(game)})
+            game.listeners.append(self.on_event)
+        for target in (self._send_loop, self._ack_loop):
+            thread = threading.Thread(target=target, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def on_event(self, event: dict):
+        # 在状态锁内调用，序号顺序与记录顺序一致；发送放到发送线程
+        self.seq += 1
+        message = {"t": "op", "seq": self.seq,
+                   "e": {k: v for k, v in event.items() if k != "players"},
+                   "p": event.get("players", [])}
+        with self._cond:
+            self._sent_at[self.seq] = time.monotonic()
+        self._queue.put(message)
+
+    def _send_loop(self):
+        try:
+            while True:
+                try:
+                    message = self._queue.get(timeout=self.heartbeat_interval)
+                except queue.Empty:
+                    _send(self.conn, {"t": "hb", "seq": self.seq})
+                    continue
+                if message is None:
+                    return
+                _send(self.conn, message)
+        except (OSError, EOFError):
+            pass  # 备机断开
+
+    def _ack_loop(self):
+        try:
+            while not self._stopped:
+                if not self.conn.poll(0.1):
+                    continue
+                ack = _recv(self.conn)
+                now = time.monotonic()
+                with self._cond:
+                    sent = self._sent_at.pop(ack["ack"], None)
+                    if sent is not None:
+                        self.last_ack_latency = now - sent
+                        self.max_ack_latency = max(self.max_ack_latency, self.last_ack_latency)
+                    if not ack["ok"]:
+                        self.failed_acks += 1
+                    self.acked = max(self.acked, ack["ack"])
+                    self._cond.notify_all()
+        except (OSError, EOFError):
+            pass
+
+    def stats(self) -> dict:
+        """复制延迟统计"""
+        with self._cond:
+            pending = min(self._sent_at) if self._sent_at else None
+            return {
+                "sent": self.seq,
+                "acked": self.acked,
+                "lag_events": self.seq - self.acked,
+                "lag_seconds": time.monotonic() - self._sent_at[pending] if pending is not None else 0.0,
+                "last_ack_latency": self.last_ack_latency,
+                "max_ack_latency": self.max_ack_latency,
+                "failed_acks": self.failed_acks,
+            }
+
+    def wait_acked(self, timeout: Optional[float] = None) -> bool:
+        """等待目前为止的操作全部被备机确认"""
+        target = self.seq
+        with self._cond:
+            return self._cond.wait_for(lambda: self.acked >= target, timeout)
+
+    def stop(self):
+        """停止复制并关闭连接"""
+        if self._stopped:
+            return
+        self._stopped = True
+        try:
+            self.game.listeners.remove(self.on_event)
+        except ValueError:
+            pass
+        self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self.conn.close()
+
+
+class StandbyReplica:
+    """备机端：重放主机的操作并确认"""
+    def __init__(self, conn: "Connection", heartbeat_timeout: float = 3.0):
+        self.conn = conn
+        self.heartbeat_timeout = heartbeat_timeout
+        self.game: Optional[Game] = None
+        self.applied = 0
+        self.diverged: Optional[str] = None  # 重放结果与主机不一致时的描述
+
+    def apply(self, message: dict) -> bool:
+        """执行一条复制消息，返回结果是否与主机一致"""
+        if message["t"] == "init":
+            self.game = restore_game(message["state"])
+            self.applied = message["seq"]
+            return True
+        event = message["e"]
+        ok = apply_event(self.game, event, message["p"])
+        if not ok and self.diverged is None:
+            self.diverged = f"第{message['seq']}个操作重放结果与主机不一致: {event}"
+        self.applied = message["seq"]
+        return ok
+
+    def serve(self) -> str:
+        """
+        接收并重放，直到主机断开或超过heartbeat_timeout秒没有任何消息
+        返回: "closed" 或 "timeout"
+        """
+        while True:
+            try:
+                if not self.conn.poll(self.heartbeat_timeout):
+                    return "timeout"
+                message = _recv(self.conn)
+            except (OSError, EOFError):
+                return "closed"
+            if message["t"] == "hb":
+                continue
+            ok = self.apply(message)
+            try:
+                _send(self.conn, {"ack": message["seq"], "ok": ok})
+            except (OSError, EOFError):
+                return "closed"
+
+    def promote(self, output=print) -> Game:
+        """接管：停止复制，恢复输出与自动导出，返回对局"""
+        if self.game is None:
+            raise RuntimeError("尚未收到初始状态，无法接管")
+        try:
+            self.conn.close()
+        except OSError:
+            pass
+        self.game.output = output
+        self.game.auto_export = True
+        return self.game
+
+
+def listen_standby(host: str, port: int, heartbeat_timeout: float = 3.0) -> Tuple[StandbyReplica, str]:
+    """在host:port等待主机连接并重放，主机失联后返回 (备机, 原因)"""
+    from multiprocessing.connection import Listener
+    with Listener((host, port), authkey=AUTHKEY) as listener:
+        conn = listener.accept()
+    replica = StandbyReplica(conn, heartbeat_timeout)
+    return replica, replica.serve()
+
+
+def connect_primary(game: Game, host: str, port: int, heartbeat_interval: float = 0.5) -> ReplicationPrimary:
+    """连接备机并开始复制"""
+    from multiprocessing.connection import Client
+    conn = Client((host, port), authkey=AUTHKEY)
+    return ReplicationPrimary(game, conn, heartbeat_interval).start()
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="森林进化论热备复制")
+    parser.add_argument("role", choices=("primary", "standby"))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6100)
+    parser.add_argument("--timeout", type=float, default=3.0, help="备机判定主机失联的秒数")
+    args = parser.parse_args()
+
+    if args.role == "standby":
+        print(f"备机等待主机连接 {args.host}:{args.port}")
+        replica, reason = listen_standby(args.host, args.port, args.timeout)
+        print(f"主机{'断开' if reason == 'closed' else '失联'}，已重放{replica.applied}个操作，接管对局")
+        if replica.diverged:
+            print(f"警告：{replica.diverged}")
+        game = replica.promote()
+        game.view_blood()
+        game.menu()
+    else:
+        game = Game()
+        game.setup_game()
+        primary = connect_primary(game, args.host, args.port)
+        try:
+            game.menu()
+        finally:
+            primary.wait_acked(args.timeout)
+            stats = primary.stats()
+            print(f"复制完成：发送{stats['sent']}个操作，确认{stats['acked']}个，"
+                  f"最大确认延迟{stats['max_ack_latency'] * 1000:.1f}毫秒")
+            primary.stop()
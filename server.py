@@ -0,0 +1,377 @@
+"""
+多桌游戏服务端
+
+在一个进程内托管多张桌子(每桌一个Game)，通过TCP或Unix套接字
+以JSON Lines协议通信：每行一个JSON请求，服务端按行返回JSON响应。
+
+请求示例:
+    {"cmd": "create", "table": "t1", "players": 8, "seed": 1}
+    {"cmd": "trade", "table": "t1", "p1": 1, "p2": 2, "k": 5}
+    {"cmd": "hunt", "table": "t1", "p1": 3, "p2": 4, "k": 8}
+    {"cmd": "modify", "table": "t1", "player": 2, "k": -3, "note": "罚血"}
+    {"cmd": "view", "table": "t1"}
+    {"cmd": "round", "table": "t1"}
+    {"cmd": "export", "table": "t1"}
+    {"cmd": "close", "table": "t1"}
+    {"cmd": "tables"}
+    {"cmd": "watch", "table": "t1"}
+
+响应总是包含 ok 字段；请求带 id 字段时原样带回。
+watch之后该连接会额外收到观战推送行(见spectator.py)，以 t 字段区分。
+"""
+import asyncio
+import json
+import os
+import re
+from typing import Callable, Dict, List, Optional, Set
+
+from forest import Game, discard_output
+from spectator import SpectatorHub, Subscription
+
+TABLE_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+class Table:
+    """一张桌子：游戏实例与其待执行的导出"""
+    def __init__(self, table_id: str, game: Game):
+        self.table_id = table_id
+        self.game = game
+        self.pending_exports: Set[str] = set()  # "data" / "full"
+        self.export_task: Optional[asyncio.Task] = None
+        self.hub: Optional[SpectatorHub] = None  # 有人观战时才创建
+
+
+class GameServer:
+    """异步多桌服务端"""
+    def __init__(self, export_dir: Optional[str] = None, max_tables: int = 1000,
+                 max_concurrent_writes: int = 4, archive=None, output: Callable[[str], None] = print):
+        self.export_dir = export_dir  # None表示不导出文件
+        self.output = output  # 导出失败等服务端消息
+        self.archive = archive  # archive.ReportArchive，给出时完整报告以桌号为名写入压缩归档
+        self.max_tables = max_tables
+        self.tables: Dict[str, Table] = {}
+        self._write_slots = asyncio.Semaphore(max_concurrent_writes)
+        self._servers: List[asyncio.AbstractServer] = []
+        self._connections: Dict[asyncio.Task, asyncio.StreamWriter] = {}
+        self._closed_exports: Set[asyncio.Task] = set()  # 已关闭桌子的最后一次导出
+
+    # ---------- 网络 ----------
+
+    async def start_tcp(self, host: str = "127.0.0.1", port: int = 0) -> asyncio.AbstractServer:
+        """监听TCP端口，port为0时由系统分配"""
+        server = await asyncio.start_server(self._handle_connection, host, port)
+        self._servers.append(server)
+        return server
+
+    async def start_unix(self, path: str) -> asyncio.AbstractServer:
+        """监听Unix套接字"""
+        server = await asyncio.start_unix_server(self._handle_connection, path)
+        self._servers.append(server)
+        return server
+
+    async def stop(self):
+        """停止监听、断开现有连接并等待所有导出写完"""
+        for server in self._servers:
+            server.close()
+        for writer in self._connections.values():
+            writer.close()
+        if self._connections:
+            await asyncio.gather(*self._connections, return_exceptions=True)
+        for server in self._servers:
+            await server.wait_closed()
+        self._servers = []
+        await self.flush_exports()
+        if self.archive is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self.archive.close)
+
+    async def flush_exports(self):
+        """等待所有桌子的导出完成"""
+        tasks = [t.export_task for t in self.tables.values() if t.export_task]
+        tasks.extend(self._closed_exports)
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """逐行处理一个连接；每条响应写出后等待drain，客户端读得慢时自然反压"""
+        task = asyncio.current_task()
+        self._connections[task] = writer
+        watchers: List[asyncio.Task] = []
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:  # 单行超过缓冲上限
+                    writer.write(self._encode({"ok": False, "error": "请求过长"}))
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                response = self.handle_line(line)
+                sub = response.pop("subscription", None)
+                writer.write(self._encode(response))
+                if sub is not None:
+                    watchers.append(asyncio.get_running_loop().create_task(self._stream(sub, writer)))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            for watcher in watchers:
+                watcher.cancel()
+            self._connections.pop(task, None)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    @staticmethod
+    async def _stream(sub: Subscription, writer: asyncio.StreamWriter):
+        """向观战连接推送消息；对方读得慢时消息在订阅中积压，超限后改发快照"""
+        wake = asyncio.Event()
+        sub.notify = wake.set
+        wake.set()
+        try:
+            while True:
+                await wake.wait()
+                wake.clear()
+                messages = sub.drain()
+                if messages:
+                    writer.writelines(messages)
+                    await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            sub.close()
+
+    @staticmethod
+    def _encode(response: dict) -> bytes:
+        return (json.dumps(response, ensure_ascii=False) + "\n").encode("utf-8")
+
+    # ---------- 请求处理 ----------
+
+    def handle_line(self, line: bytes) -> dict:
+        """解析一行请求并处理"""
+        try:
+            request = json.loads(line)
+        except ValueError:
+            return {"ok": False, "error": "无效的JSON"}
+        if not isinstance(request, dict):
+            return {"ok": False, "error": "请求必须是JSON对象"}
+        response = self.handle_request(request)
+        if "id" in request:
+            response["id"] = request["id"]
+        return response
+
+    def handle_request(self, request: dict) -> dict:
+        """处理一个请求；同步执行，单个请求内不会与其他请求交错"""
+        cmd = request.get("cmd")
+        handler = getattr(self, f"_cmd_{cmd}", None) if isinstance(cmd, str) else None
+        if handler is None:
+            return {"ok": False, "error": f"未知命令: {cmd}"}
+        try:
+            return handler(request)
+        except (LookupError, TypeError, ValueError, ArithmeticError) as e:
+            return {"ok": False, "error": f"参数错误: {e}"}
+
+    def _get_table(self, request: dict) -> Table:
+        table_id = request["table"]
+        if table_id not in self.tables:
+            raise KeyError(f"桌子{table_id}不存在")
+        return self.tables[table_id]
+
+    def _run(self, table: Table, action, *args) -> dict:
+        """在桌子上执行一个游戏操作并收集其输出"""
+        messages: List[str] = []
+        table.game.output = messages.append
+        try:
+            ok = action(*args)
+        finally:
+            table.game.output = discard_output
+        return {"ok": bool(ok), "messages": messages}
+
+    def _cmd_create(self, request: dict) -> dict:
+        table_id = request["table"]
+        if not isinstance(table_id, str) or not TABLE_ID_PATTERN.match(table_id):
+            return {"ok": False, "error": "桌号只能包含字母、数字、下划线和短横线"}
+        if table_id in self.tables:
+            return {"ok": False, "error": f"桌子{table_id}已存在"}
+        if len(self.tables) >= self.max_tables:
+            return {"ok": False, "error": "桌子数量已达上限"}
+        game = Game(output=discard_output, seed=request.get("seed"))
+        game.auto_export = False  # 导出由服务端在线程池中执行
+        if self.export_dir is not None:
+            game.export_prefix = os.path.join(self.export_dir, f"{table_id}_")
+        game.archive = self.archive
+        game.setup_game(int(request["players"]))
+        self.tables[table_id] = Table(table_id, game)
+        return {"ok": True, "players": [str(p) for p in game.players]}
+
+    def _cmd_trade(self, request: dict) -> dict:
+        table = self._get_table(request)
+        response = self._run(table, table.game.trade,
+                             int(request["p1"]), int(request["p2"]), int(request["k"]))
+        if response["ok"]:
+            self._schedule_export(table, "data")
+        return response
+
+    def _cmd_hunt(self, request: dict) -> dict:
+        table = self._get_table(request)
+        response = self._run(table, table.game.hunt,
+                             int(request["p1"]), int(request["p2"]), int(request["k"]))
+        if response["ok"]:
+            self._schedule_export(table, "full")
+        return response
+
+    def _cmd_modify(self, request: dict) -> dict:
+        table = self._get_table(request)
+        response = self._run(table, table.game.modify_blood,
+                             int(request["player"]), int(request["k"]), str(request.get("note", "")))
+        if response["ok"]:
+            self._schedule_export(table, "data")
+        return response
+
+    def _cmd_round(self, request: dict) -> dict:
+        table = self._get_table(request)
+        self._run(table, table.game.next_round)
+        return {"ok": True, "round": table.game.round_no}
+
+    def _cmd_view(self, request: dict) -> dict:
+        table = self._get_table(request)
+        return {
+            "ok": True,
+            "players": [p.get_info() for p in table.game.players],
+            "game_over": table.game.check_game_over(),
+        }
+
+    def _cmd_export(self, request: dict) -> dict:
+        table = self._get_table(request)
+        self._schedule_export(table, "data")
+        return {"ok": True}
+
+    def _cmd_close(self, request: dict) -> dict:
+        table = self._get_table(request)
+        del self.tables[table.table_id]
+        if table.hub is not None:
+            table.hub.detach()
+            table.hub = None
+        self._schedule_export(table, "full")
+        if table.export_task is not None:
+            self._closed_exports.add(table.export_task)
+            table.export_task.add_done_callback(self._closed_exports.discard)
+        return {"ok": True, "players": [p.get_info() for p in table.game.players]}
+
+    def _cmd_watch(self, request: dict) -> dict:
+        table = self._get_table(request)
+        if table.hub is None:
+            table.hub = SpectatorHub(table.game)
+        # 订阅对象由连接处理协程取走并启动推送
+        return {"ok": True, "subscription": table.hub.subscribe()}
+
+    def _cmd_tables(self, request: dict) -> dict:
+        return {"ok": True, "tables": sorted(self.tables)}
+
+    # ---------- 导出 ----------
+
+    def _schedule_export(self, table: Table, kind: str):
+        """登记一次导出；导出进行中时合并后续请求，每桌同一时刻最多一个导出任务"""
+        if self.export_dir is None and (kind != "full" or self.archive is None):
+            return
+        table.pending_exports.add(kind)
+        if table.export_task is None or table.export_task.done():
+            table.export_task = asyncio.get_running_loop().create_task(self._export_loop(table))
+
+    async def _export_loop(self, table: Table):
+        loop = asyncio.get_running_loop()
+        game = table.game
+        while table.pending_exports:
+            kinds = table.pending_exports
+            table.pending_exports = set()
+            for kind in sorted(kinds):
+                # 文本在事件循环线程中生成(与游戏状态一致)，文件写入放到线程池
+                # 单次导出失败只报告，不影响该桌之后的导出
+                try:
+                    if kind == "full":
+                        filename, text = game.full_report_filename(), game.render_full_report()
+                    else:
+                        filename, text = game.data_report_filename(), game.render_data_report()
+                    async with self._write_slots:
+                        if kind == "full" and game.archive is not None:
+                            # 桌子关闭或对局结束后结束当前帧，报告立即可读
+                            ended = (self.tables.get(table.table_id) is not table
+                                     or game.check_game_over() is not None)
+                            await loop.run_in_executor(None, self._archive_report, game.archive,
+                                                       table.table_id, text, ended)
+                        else:
+                            await loop.run_in_executor(None, Game.write_report, filename, text)
+                except Exception as e:
+                    self.output(f"桌子{table.table_id}导出失败: {e}")
+
+    @staticmethod
+    def _archive_report(archive, name: str, text: str, ended: bool):
+        """归档中的报告只以桌号命名，同一桌的后续报告覆盖之前的"""
+        archive.add(name, text)
+        if ended:
+            archive.flush()
+
+
+class GameClient:
+    """JSON Lines协议客户端，主要用于测试与脚本"""
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def connect_tcp(cls, host: str, port: int) -> "GameClient":
+        reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    @classmethod
+    async def connect_unix(cls, path: str) -> "GameClient":
+        reader, writer = await asyncio.open_unix_connection(path)
+        return cls(reader, writer)
+
+    async def request(self, **request) -> dict:
+        """发送一个请求并等待响应"""
+        self.writer.write((json.dumps(request, ensure_ascii=False) + "\n").encode("utf-8"))
+        await self.writer.drain()
+        return json.loads(await self.reader.readline())
+
+    async def pipeline(self, requests: List[dict]) -> List[dict]:
+        """连续发送多个请求后再依次读取响应"""
+        self.writer.writelines((json.dumps(r, ensure_ascii=False) + "\n").encode("utf-8") for r in requests)
+        await self.writer.drain()
+        return [json.loads(await self.reader.readline()) for _ in requests]
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+async def serve(host: str = "127.0.0.1", port: int = 7788, unix_path: Optional[str] = None,
+                export_dir: Optional[str] = None):
+    """启动服务端并一直运行"""
+    server = GameServer(export_dir=export_dir)
+    if unix_path:
+        listener = await server.start_unix(unix_path)
+    else:
+        listener = await server.start_tcp(host, port)
+    print(f"服务端已启动: {unix_path or listener.sockets[0].getsockname()}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="森林进化论多桌服务端")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7788)
+    parser.add_argument("--unix", help="Unix套接字路径，指定后不监听TCP")
+    parser.add_argument("--export-dir", help="导出目录，不指定则不导出文件")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.unix, args.export_dir))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,226 @@
+"""
+残局有限步求解
+
+在只剩少数玩家时，对交易/捕食的行动空间做带置换表的max^n搜索：
+存活玩家按座位顺序轮流行动，每人每次可以捕食、交易或放弃，
+每名玩家都只追求自己在horizon步之后的血量(死亡记为0)。
+
+求得的是受限博弈树上的精确值，不是整局的博弈值：
+  - 只向前看horizon步(每名存活玩家行动一次算一步，不是一回合)，之后的局面按当前血量计值
+  - 捕食与交易的血量只取amounts中的值。规则对捕食血量没有上限，击杀奖励随血量增长，
+    全部行动空间上的博弈值并不存在，所以必须限定血量集合
+耗时随horizon指数增长：默认amounts下5人残局horizon=5约4秒，horizon=6约90秒，
+实际能精确覆盖的大约是一轮行动。
+
+置换表使用规范化后的局面作为键：
+  - 死亡玩家不再参与，直接丢弃
+  - 从当前行动者开始按座位顺序轮转，座位编号本身不进入键
+  - 对身份牌做保持克制关系不变的重标号(点数轮换、花色轮换)，取字典序最小者
+剪枝：打平的捕食与放弃等价、结果局面相同的行动只展开一次。
+"""
+import itertools
+from typing import Dict, List, Optional, Tuple
+
+from forest import DEFAULT_JOKER_COUNTS, CardRank, CardSuit, Game, RuleConfig, restraint_table
+
+Entry = Tuple[int, int, int, int]  # (座位编号, 身份牌序号, 血量, 交易血量)
+Move = Tuple[str, int, int]  # ("hunt"/"trade"/"pass", 目标座位编号, 血量)
+
+RANK_CYCLE = (CardRank.K, CardRank.Q, CardRank.J)
+
+
+def _card_automorphisms(cards, table) -> List[Tuple[int, ...]]:
+    """身份牌的重标号中保持克制结果表不变的那些(由点数轮换与花色轮换生成)"""
+    suits = [s for s in (CardSuit.SPADE, CardSuit.HEART, CardSuit.CLUB, CardSuit.DIAMOND)
+             if any(c[0] == s for c in cards)]
+    index = {card: i for i, card in enumerate(cards)}
+    result = []
+    for rank_shift, suit_shift in itertools.product(range(3), range(len(suits))):
+        mapping = []
+        for suit, rank in cards:
+            if suit == CardSuit.JOKER:
+                mapping.append(index[(suit, rank)])
+                continue
+            new_rank = RANK_CYCLE[(RANK_CYCLE.index(rank) + rank_shift) % 3]
+            new_suit = suits[(suits.index(suit) + suit_shift) % len(suits)]
+            mapping.append(index[(new_suit, new_rank)])
+        n = len(cards)
+        if all(table[mapping[i]][mapping[j]] == table[i][j] for i in range(n) for j in range(n)):
+            result.append(tuple(mapping))
+    return result
+
+
+class EndgameSolver:
+    """
+    残局有限步求解器，同一求解器的置换表可在多次查询间复用
+    amounts: 捕食与交易可选的血量，结果只在这些血量构成的行动空间上精确
+    """
+    def __init__(self, player_count: int, rules: Optional[RuleConfig] = None,
+                 amounts: Tuple[int, ...] = (1, 3, 5, 10), include_trades: bool = True):
+        self.rules = rules or RuleConfig()
+        self.player_count = player_count
+        joker_count = self.rules.joker_count_for(player_count) if rules else DEFAULT_JOKER_COUNTS[player_count]
+        self.cards, self.table = restraint_table(player_count, joker_count)
+        self.card_index = {card: i for i, card in enumerate(self.cards)}
+        self.automorphisms = _card_automorphisms(self.cards, self.table)
+        self.amounts = tuple(sorted(set(amounts)))
+        self.include_trades = include_trades
+        self.transpositions: Dict[tuple, Tuple[Tuple[int, ...], Optional[Tuple[str, int, int]]]] = {}
+        self.nodes = 0
+
+    # ---------- 对外接口 ----------
+
+    def solve(self, game: Game, mover_no: int, horizon: int) -> Tuple[Dict[int, int], Optional[Move]]:
+        """
+        从mover_no行动开始向前搜索horizon步(行动血量限于amounts)
+        返回: ({座位编号: horizon步后的血量}, mover的最优行动)
+        """
+        alive = [p for p in game.players if p.is_alive]
+        entries = [(p.no, self.card_index[(p.suit, p.rank)], p.blood, p.trade) for p in alive]
+        seats = [e[0] for e in entries]
+        if mover_no not in seats:
+            raise ValueError(f"玩家{mover_no}已死亡或不存在")
+        start = seats.index(mover_no)
+        rotated = entries[start:] + entries[:start]
+
+        values, move = self._search(rotated, horizon)
+        result = {p.no: 0 for p in game.players}
+        for entry, value in zip(rotated, values):
+            result[entry[0]] = value
+        best = None
+        if move is not None:
+            kind, offset, k = move
+            best = (kind, rotated[offset][0] if kind != "pass" else mover_no, k)
+        return result, best
+
+    # ---------- 搜索 ----------
+
+    def _key(self, entries: List[Entry], depth: int) -> tuple:
+        body = [(card, blood, trade) for _, card, blood, trade in entries]
+        return (depth, min(tuple((sigma[card], blood, trade) for card, blood, trade in body)
+                           for sigma in self.automorphisms))
+
+    def _decided(self, entries: List[Entry]) -> bool:
+        if len(entries) <= 1:
+            return True
+        table = self.table
+        for i, a in enumerate(entries):
+            for b in entries[i+1:]:
+                if table[a[1]][b[1]] or table[b[1]][a[1]]:
+                    return False
+        return True
+
+    def _children(self, entries: List[Entry]):
+        """
+        生成 (行动, 子局面, 死亡者位置)；子局面已轮转到下一行动者，
+        行动与死亡者位置都用相对entries的位置表示，无人死亡时死亡者位置为-1
+        """
+        bonus = self.rules.kill_bonus
+        cap = self.rules.trade_cap
+        mover = entries[0]
+        # 放弃：轮到下一人
+        yield ("pass", 0, 0), entries[1:] + entries[:1], -1
+        for j in range(1, len(entries)):
+            target = entries[j]
+            result = self.table[mover[1]][target[1]]
+            if result != 0:
+                for k in self.amounts:
+                    child = list(entries)
+                    if result == 1:
+                        if target[2] <= k:
+                            child[0] = (mover[0], mover[1], mover[2] + k + bonus, mover[3])
+                            del child[j]
+                            yield ("hunt", j, k), child[1:] + child[:1], j
+                        else:
+                            child[0] = (mover[0], mover[1], mover[2] + k, mover[3])
+                            child[j] = (target[0], target[1], target[2] - k, target[3])
+                            yield ("hunt", j, k), child[1:] + child[:1], -1
+                    elif mover[2] <= k:
+                        child[j] = (target[0], target[1], target[2] + k + bonus, target[3])
+                        yield ("hunt", j, k), child[1:], 0  # 行动者死亡，下一人已在首位
+                    else:
+                        child[0] = (mover[0], mover[1], mover[2] - k, mover[3])
+                        child[j] = (target[0], target[1], target[2] + k, target[3])
+                        yield ("hunt", j, k), child[1:] + child[:1], -1
+            if self.include_trades:
+                for k in self.amounts:
+                    if target[3] + k > cap or mover[2] < k:
+                        continue
+                    child = list(entries)
+                    child[0] = (mover[0], mover[1], mover[2] - k, mover[3] - k)
+                    child[j] = (target[0], target[1], target[2] + k, target[3] + k)
+                    yield ("trade", j, k), child[1:] + child[:1], -1
+
+    def _last_move(self, entries: List[Entry]) -> Tuple[Tuple[int, ...], Optional[Tuple[str, int, int]]]:
+        """
+        最后一步只影响当前局面，行动者直接选让自己血量最高的行动；
+        比较顺序与_children相同，结果与完整展开一致
+        """
+        bonus = self.rules.kill_bonus
+        cap = self.rules.trade_cap
+        mover = entries[0]
+        best_gain, best_j, best_k, best_kind = 0, 0, 0, "pass"
+        for j in range(1, len(entries)):
+            target = entries[j]
+            result = self.table[mover[1]][target[1]]
+            if result != 0:
+                for k in self.amounts:
+                    if result == 1:
+                        gain = k + bonus if target[2] <= k else k
+                    else:
+                        gain = -mover[2] if mover[2] <= k else -k
+                    if gain > best_gain:
+                        best_gain, best_j, best_k, best_kind = gain, j, k, "hunt"
+            if self.include_trades:
+                for k in self.amounts:
+                    if target[3] + k <= cap and mover[2] >= k and -k > best_gain:
+                        best_gain, best_j, best_k, best_kind = -k, j, k, "trade"
+
+        values = [e[2] for e in entries]
+        if best_kind != "pass":
+            target = entries[best_j]
+            result = self.table[mover[1]][target[1]] if best_kind == "hunt" else 0
+            if best_kind == "trade":
+                values[best_j] += best_k
+            elif result == 1:
+                values[best_j] = 0 if target[2] <= best_k else target[2] - best_k
+            elif mover[2] <= best_k:
+                values[best_j] += best_k + bonus
+            else:
+                values[best_j] += best_k
+            values[0] += best_gain
+        return tuple(values), (best_kind, best_j, best_k)
+
+    def _search(self, entries: List[Entry], depth: int) -> Tuple[Tuple[int, ...], Optional[Tuple[str, int, int]]]:
+        """返回与entries顺序对应的博弈值，以及首位行动者的最优行动"""
+        self.nodes += 1
+        if depth == 0 or self._decided(entries):
+            return tuple(e[2] for e in entries), None
+        if depth == 1:
+            return self._last_move(entries)
+        key = self._key(entries, depth)
+        cached = self.transpositions.get(key)
+        if cached is not None:
+            return cached
+
+        best_values: Optional[Tuple[int, ...]] = None
+        best_move = None
+        seen = set()
+        for move, child, dead in self._children(entries):
+            child_key = tuple(child)
+            if child_key in seen:
+                continue  # 结果局面相同的行动只展开一次
+            seen.add(child_key)
+            child_values, _ = self._search(child, depth - 1)
+            # 把子局面的博弈值换回当前局面的顺序
+            if dead == 0:
+                values = (0,) + child_values
+            else:
+                values = child_values[-1:] + child_values[:-1]
+                if dead > 0:
+                    values = values[:dead] + (0,) + values[dead:]
+            if best_values is None or values[0] > best_values[0]:
+                best_values, best_move = values, move
+
+        self.transpositions[key] = (best_values, best_move)
+        return best_values, best_move
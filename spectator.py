@@ -0,0 +1,132 @@
+"""
+观战状态推送
+
+SpectatorHub挂在Game的监听器上，每次交易/捕食/修改血量后生成一条
+只包含变化玩家的增量消息，每隔若干条增量再生成一次完整快照。
+每条消息只编码一次，同一个bytes对象分发给所有订阅者。
+
+消息为一行JSON:
+    增量: {"seq": 5, "t": "d", "e": "hunt", "r": 1, "p": [[3, 28, 0, 1], [4, 12, 0, 1]]}
+    快照: {"seq": 5, "t": "s", "n": 8, "r": 1, "p": [[1, 20, 0, 1], ...]}
+p中每项为 [编号, 血量, 交易血量, 是否存活]。
+"""
+import json
+from collections import deque
+from typing import Callable, Deque, List, Optional
+
+from forest import Game
+
+
+def _encode(message: dict) -> bytes:
+    return (json.dumps(message, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def _rows(players) -> List[list]:
+    return [[no, blood, trade, int(alive)] for no, blood, trade, alive in players]
+
+
+class Subscription:
+    """一个订阅者的消息缓冲；积压超过上限时丢弃增量，下次读取改发最新快照"""
+    def __init__(self, hub: "SpectatorHub", max_pending: int,
+                 notify: Optional[Callable[[], None]] = None):
+        self.hub = hub
+        self.notify = notify  # 有新消息时调用，例如唤醒发送协程
+        self.pending: Deque[bytes] = deque()
+        self.max_pending = max_pending
+        self.lagged = False
+
+    def push(self, data: bytes):
+        if self.lagged:
+            return  # 已落后，等待重新同步
+        if len(self.pending) >= self.max_pending:
+            self.pending.clear()
+            self.lagged = True
+        else:
+            self.pending.append(data)
+        if self.notify is not None:
+            self.notify()
+
+    def drain(self) -> List[bytes]:
+        """取出所有待读消息；落后时返回一条最新快照"""
+        if self.lagged:
+            self.lagged = False
+            return [self.hub.snapshot_bytes()]
+        messages = list(self.pending)
+        self.pending.clear()
+        return messages
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+
+class SpectatorHub:
+    """观战推送中心"""
+    def __init__(self, game: Game, snapshot_interval: int = 50, max_pending: int = 1000):
+        self.game = game
+        self.snapshot_interval = snapshot_interval
+        self.max_pending = max_pending
+        self.subscribers: List[Subscription] = []
+        self.seq = 0
+        self._since_snapshot = 0
+        self._snapshot: Optional[bytes] = None
+        game.listeners.append(self.on_event)
+
+    def detach(self):
+        """从游戏上移除"""
+        self.game.listeners.remove(self.on_event)
+
+    def subscribe(self, notify: Optional[Callable[[], None]] = None) -> Subscription:
+        """新增订阅者，首条消息总是当前快照"""
+        sub = Subscription(self, self.max_pending, notify)
+        self.subscribers.append(sub)
+        sub.push(self.snapshot_bytes())
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        if sub in self.subscribers:
+            self.subscribers.remove(sub)
+
+    def snapshot_bytes(self) -> bytes:
+        """最新完整快照，状态未变时复用已编码的结果"""
+        if self._snapshot is None:
+            state = self.game.snapshot()
+            self._snapshot = _encode({
+                "seq": self.seq, "t": "s", "n": state["player_count"],
+                "r": state["round"], "p": _rows(state["players"]),
+            })
+        return self._snapshot
+
+    def on_event(self, event: dict):
+        """游戏监听器：编码一次增量并分发"""
+        self.seq += 1
+        self._snapshot = None
+        data = _encode({
+            "seq": self.seq, "t": "d", "e": event["type"],
+            "r": self.game.round_no, "p": _rows(event["players"]),
+        })
+        self._broadcast(data)
+        self._since_snapshot += 1
+        if self._since_snapshot >= self.snapshot_interval:
+            self._since_snapshot = 0
+            self._broadcast(self.snapshot_bytes())
+
+    def _broadcast(self, data: bytes):
+        for sub in self.subscribers:
+            sub.push(data)
+
+
+class SpectatorView:
+    """订阅端的状态重建，按快照与增量维护各玩家的公开状态"""
+    def __init__(self):
+        self.seq = 0
+        self.round = 0
+        self.players = {}
+
+    def apply(self, data: bytes):
+        message = json.loads(data)
+        if message["t"] == "s":
+            self.players = {}
+        self.seq = message["seq"]
+        self.round = message["r"]
+        for no, blood, trade, alive in message["p"]:
+            self.players[no] = (blood, trade, bool(alive))
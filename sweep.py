@@ -0,0 +1,191 @@
+"""
+规则变体参数扫描
+
+对一组规则参数(RuleConfig)与人数、种子的组合批量模拟对局，
+结果按 (规则哈希, 人数, 种子, 步数上限) 缓存在sqlite中，重复或扩展扫描时
+只计算缺失的格子。
+
+    configs = grid(kill_bonus=[2, 3, 4], trade_cap=[8, 10])
+    results = run_sweep(configs, [8, 12], range(200), cache_path="sweep.db")
+    print(summarize(results))
+"""
+import itertools
+import json
+import random
+import sqlite3
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from forest import Game, RuleConfig, discard_output
+
+# 模拟策略的版本号，策略变化后旧缓存自动失效
+SIMULATION_VERSION = 2
+
+
+def identity_name(player) -> str:
+    """玩家身份名称，例如 黑桃K / Joker"""
+    return str(player).split(": ", 1)[1]
+
+
+def simulate_game(rules: RuleConfig, player_count: int, seed: int, max_steps: int = 500) -> dict:
+    """
+    用随机策略模拟一局
+    每步随机选两名存活玩家交易或捕食，存活人数那么多步为一回合，
+    直到分出结果或达到步数上限。
+    """
+    game = Game(output=discard_output, seed=seed, rules=rules)
+    game.auto_export = False
+    game.end_conditions.no_restraint = True
+    game.setup_game(player_count)
+    rng = random.Random(seed * 7919 + 17)
+
+    steps = 0
+    reason = game.check_game_over()
+    while reason is None and steps < max_steps:
+        alive = [p.no for p in game.players if p.is_alive]
+        for _ in range(len(alive)):
+            alive = [p.no for p in game.players if p.is_alive]
+            if len(alive) < 2:
+                break
+            p1, p2 = rng.sample(alive, 2)
+            if rng.random() < 0.3:
+                game.trade(p1, p2, rng.randint(1, 5))
+            else:
+                game.hunt(p1, p2, rng.randint(1, 10))
+            steps += 1
+            reason = game.check_game_over()
+            if reason is not None:
+                break
+        game.next_round()
+
+    survivors = [identity_name(p) for p in game.players if p.is_alive]
+    return {
+        "steps": steps,
+        "rounds": game.round_no,
+        "finished": reason is not None,
+        "survivors": survivors,
+        "winner": survivors[0] if len(survivors) == 1 else None,
+        "blood": [[identity_name(p), p.blood] for p in game.players],
+    }
+
+
+def _simulate_cell(args: Tuple[dict, int, int, int]) -> dict:
+    rules_dict, player_count, seed, max_steps = args
+    return simulate_game(RuleConfig.from_dict(rules_dict), player_count, seed, max_steps)
+
+
+def grid(**axes: Sequence) -> List[RuleConfig]:
+    """按各参数取值的笛卡尔积生成规则列表，未给出的参数取默认值"""
+    names = sorted(axes)
+    return [RuleConfig(**dict(zip(names, values)))
+            for values in itertools.product(*(axes[name] for name in names))]
+
+
+class SweepCache:
+    """sqlite结果缓存，步数上限不同的结果分开存放"""
+    # 表结构变化时换用新表名，旧文件中的旧表不再读取
+    TABLE = "results_v2"
+
+    def __init__(self, path: str = ":memory:"):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.TABLE} ("
+            " config_hash TEXT, player_count INTEGER, seed INTEGER, max_steps INTEGER, version INTEGER,"
+            " result TEXT, PRIMARY KEY (config_hash, player_count, seed, max_steps, version))"
+        )
+        self.conn.commit()
+
+    def get_many(self, config_hash: str, player_count: int, seeds: Iterable[int],
+                 max_steps: int) -> Dict[int, dict]:
+        """查询已缓存的种子结果"""
+        wanted = set(seeds)
+        rows = self.conn.execute(
+            f"SELECT seed, result FROM {self.TABLE}"
+            " WHERE config_hash=? AND player_count=? AND max_steps=? AND version=?",
+            (config_hash, player_count, max_steps, SIMULATION_VERSION),
+        )
+        return {seed: json.loads(result) for seed, result in rows if seed in wanted}
+
+    def put_many(self, config_hash: str, player_count: int, max_steps: int, results: Dict[int, dict]):
+        self.conn.executemany(
+            f"INSERT OR REPLACE INTO {self.TABLE} VALUES (?, ?, ?, ?, ?, ?)",
+            [(config_hash, player_count, seed, max_steps, SIMULATION_VERSION,
+              json.dumps(result, ensure_ascii=False))
+             for seed, result in results.items()],
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+def run_sweep(configs: Sequence[RuleConfig], player_counts: Sequence[int], seeds: Iterable[int],
+              cache_path: str = ":memory:", workers: Optional[int] = None,
+              max_steps: int = 500) -> List[dict]:
+    """
+    扫描全部 (规则, 人数, 种子) 组合
+    workers为1时在本进程内计算，否则使用进程池
+    返回: 每个格子一条 {"rules", "config_hash", "player_count", "seed", "result"}
+    """
+    seeds = list(seeds)
+    cache = SweepCache(cache_path)
+    try:
+        cells: List[dict] = []
+        missing: List[Tuple[dict, int, int, int]] = []
+        for rules in configs:
+            config_hash = rules.config_hash()
+            for player_count in player_counts:
+                cached = cache.get_many(config_hash, player_count, seeds, max_steps)
+                for seed in seeds:
+                    cells.append({"rules": rules, "config_hash": config_hash,
+                                  "player_count": player_count, "seed": seed,
+                                  "result": cached.get(seed)})
+                    if seed not in cached:
+                        missing.append((rules.to_dict(), player_count, seed, max_steps))
+
+        if missing:
+            if workers == 1:
+                computed = [_simulate_cell(args) for args in missing]
+            else:
+                from concurrent.futures import ProcessPoolExecutor
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    chunksize = max(1, len(missing) // ((workers or 4) * 8))
+                    computed = list(pool.map(_simulate_cell, missing, chunksize=chunksize))
+
+            fresh: Dict[Tuple[str, int], Dict[int, dict]] = {}
+            for (rules_dict, player_count, seed, _), result in zip(missing, computed):
+                key = (RuleConfig.from_dict(rules_dict).config_hash(), player_count)
+                fresh.setdefault(key, {})[seed] = result
+            for (config_hash, player_count), results in fresh.items():
+                cache.put_many(config_hash, player_count, max_steps, results)
+            for cell in cells:
+                if cell["result"] is None:
+                    cell["result"] = fresh[(cell["config_hash"], cell["player_count"])][cell["seed"]]
+        return cells
+    finally:
+        cache.close()
+
+
+def summarize(cells: List[dict]) -> List[dict]:
+    """按 (规则, 人数) 汇总：完局率、平均步数、各身份胜率"""
+    groups: Dict[Tuple[str, int], List[dict]] = {}
+    rules_by_hash: Dict[str, RuleConfig] = {}
+    for cell in cells:
+        groups.setdefault((cell["config_hash"], cell["player_count"]), []).append(cell["result"])
+        rules_by_hash[cell["config_hash"]] = cell["rules"]
+
+    summary = []
+    for (config_hash, player_count), results in groups.items():
+        wins: Dict[str, int] = {}
+        for result in results:
+            if result["winner"]:
+                wins[result["winner"]] = wins.get(result["winner"], 0) + 1
+        games = len(results)
+        summary.append({
+            "rules": rules_by_hash[config_hash].to_dict(),
+            "player_count": player_count,
+            "games": games,
+            "finished_rate": sum(r["finished"] for r in results) / games,
+            "mean_steps": sum(r["steps"] for r in results) / games,
+            "win_rate": {name: count / games for name, count in sorted(wins.items())},
+        })
+    return summary
@@ -0,0 +1,67 @@
+"""
+自适应提前停止模拟测试
+"""
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from forest import RuleConfig
+from adaptive import compare, estimate, finished_rate, mean_steps, run_adaptive, survival
+from sweep import run_sweep
+
+
+class TestAdaptive(unittest.TestCase):
+    """自适应模拟测试"""
+
+    def test_stops_when_difference_is_clear(self):
+        """7人局黑桃与红桃存活率差异明显，第一批后即判定有差异"""
+        result = run_adaptive(RuleConfig(), 7, [compare(survival("黑桃K"), survival("红桃K"), 0.01)],
+                              max_games=5000, first_batch=200, workers=1)
+        query = result["queries"][0]
+        self.assertEqual(query["decision"], "different")
+        self.assertGreater(query["low"], 0)
+        self.assertEqual(result["games"], 200)
+        self.assertEqual(result["saved"], 4800)
+
+    def test_stops_at_target_width(self):
+        """区间宽度达到目标即停止，估计值与固定局数模拟相同种子的结果一致"""
+        queries = [estimate(finished_rate(), 0.15), estimate(mean_steps(), 30)]
+        result = run_adaptive(RuleConfig(), 6, queries, max_games=2000, first_batch=50, growth=2, workers=1)
+        for query in result["queries"]:
+            self.assertEqual(query["decision"], "precise")
+        self.assertLess(result["games"], 2000)
+        self.assertGreater(result["batches"], 1)
+        cells = run_sweep([RuleConfig()], [6], range(result["games"]), workers=1)
+        steps = [cell["result"]["steps"] for cell in cells]
+        self.assertAlmostEqual(result["queries"][1]["mean"], sum(steps) / len(steps))
+
+    def test_undecided_at_max_games(self):
+        """达不到目标精度时用完max_games"""
+        result = run_adaptive(RuleConfig(), 6, [estimate(survival("黑桃Q"), 0.001)],
+                              max_games=150, first_batch=100, workers=1)
+        self.assertEqual(result["games"], 150)
+        self.assertEqual(result["saved"], 0)
+        self.assertEqual(result["batches"], 2)
+        self.assertEqual(result["queries"][0]["decision"], "undecided")
+
+    def test_rejects_shrinking_batches(self):
+        """批次大小不能为0或逐批缩小"""
+        with self.assertRaises(ValueError):
+            run_adaptive(RuleConfig(), 6, [estimate(finished_rate(), 0.1)], first_batch=0, workers=1)
+        with self.assertRaises(ValueError):
+            run_adaptive(RuleConfig(), 6, [estimate(finished_rate(), 0.1)], growth=0.5, workers=1)
+
+    def test_later_looks_are_stricter(self):
+        """后面的查看使用更宽的置信区间"""
+        first = run_adaptive(RuleConfig(), 6, [estimate(survival("黑桃Q"), 0.001)],
+                             max_games=100, first_batch=100, workers=1)["queries"][0]
+        later = run_adaptive(RuleConfig(), 6, [estimate(survival("黑桃Q"), 0.001)],
+                             max_games=100, first_batch=25, growth=1, workers=1)["queries"][0]
+        self.assertAlmostEqual(first["mean"], later["mean"])
+        self.assertGreater(later["high"] - later["low"], first["high"] - first["low"])
+
+
+if __name__ == '__main__':
+    unittest.main()
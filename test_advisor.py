@@ -0,0 +1,77 @@
+"""
+捕食建议测试
+"""
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from forest import Game, Player, CardRank, CardSuit
+from advisor import HuntAdvisor, RestraintGraph, uniform_beliefs
+
+
+class TestHuntAdvisor(unittest.TestCase):
+    """捕食建议器测试"""
+
+    def setUp(self):
+        self.game = Game(output=lambda message: None)
+        self.game.auto_export = False
+        self.game.player_count = 6
+        cards = [(CardSuit.SPADE, CardRank.K), (CardSuit.HEART, CardRank.Q),
+                 (CardSuit.SPADE, CardRank.J), (CardSuit.HEART, CardRank.K),
+                 (CardSuit.SPADE, CardRank.Q), (CardSuit.HEART, CardRank.J)]
+        self.game.players = [Player(i+1) for i in range(6)]
+        for player, (suit, rank) in zip(self.game.players, cards):
+            player.suit, player.rank = suit, rank
+        self.advisor = HuntAdvisor()
+
+    def test_known_identities(self):
+        """测试已知身份时优先击杀被克制且血量低的玩家"""
+        self.game.players[1].blood = 6  # 红桃Q，被黑桃K克制
+        ranked = self.advisor.rank_targets(self.game, 1)
+        best = ranked[0]
+        self.assertEqual(best.target, 2)
+        self.assertEqual(best.p_win, 1.0)
+        self.assertEqual(best.amount, 20)  # 血量上限内越多越好
+        self.assertEqual(best.expected_gain, 23)
+
+        # 被克制的目标期望收益为负
+        by_target = {o.target: o for o in ranked}
+        self.assertLess(by_target[3].expected_gain, 0)  # 黑桃J克制K
+
+        # 与实际捕食结果一致
+        self.game.hunt(1, 2, best.amount)
+        self.assertEqual(self.game.players[0].blood, 20 + best.expected_gain)
+
+    def test_uniform_beliefs(self):
+        """测试均匀推测下的胜负概率"""
+        beliefs = uniform_beliefs(self.game, 1, revealed={3: (CardSuit.SPADE, CardRank.J)})
+        self.assertEqual(beliefs[3], {(CardSuit.SPADE, CardRank.J): 1.0})
+        self.assertAlmostEqual(sum(beliefs[2].values()), 1.0)
+
+        options = {o.target: o for o in self.advisor.rank_targets(self.game, 1, beliefs, max_amount=5)}
+        # 黑桃K面对其余4张未知牌(红桃K/Q/J, 黑桃Q)：克制红桃K、红桃Q、黑桃Q，被红桃J克制
+        self.assertAlmostEqual(options[2].p_win, 0.75)
+        self.assertAlmostEqual(options[2].p_lose, 0.25)
+        self.assertEqual(options[3].p_lose, 1.0)
+
+    def test_memoization(self):
+        """测试同一局面重复查询命中缓存，局面变化后重新计算"""
+        first = self.advisor.evaluate(self.game, 1)
+        self.assertIs(self.advisor.evaluate(self.game, 1), first)
+        self.assertEqual((self.advisor.hits, self.advisor.misses), (1, 1))
+
+        self.game.modify_blood(2, -3)
+        self.advisor.evaluate(self.game, 1)
+        self.assertEqual(self.advisor.misses, 2)
+
+    def test_graph_is_shared(self):
+        """测试同人数局共享克制关系图"""
+        other = Game()
+        other.player_count = 6
+        self.assertIs(RestraintGraph.for_game(self.game), RestraintGraph.for_game(other))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
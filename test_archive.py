@@ -0,0 +1,109 @@
+"""
+报告压缩归档测试
+"""
+import io
+import os
+import random
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from archive import ReportArchive, archive_files
+from forest import Game
+
+
+def play_report(seed):
+    """随机打一局并生成完整报告"""
+    game = Game(output=lambda message: None, seed=seed)
+    game.auto_export = False
+    game.setup_game(10)
+    rng = random.Random(seed)
+    for _ in range(150):
+        alive = [p.no for p in game.players if p.is_alive]
+        if len(alive) < 2:
+            break
+        p1, p2 = rng.sample(alive, 2)
+        if rng.random() < 0.7:
+            game.hunt(p1, p2, rng.randint(1, 8))
+        else:
+            game.trade(p1, p2, rng.randint(1, 4))
+    return game.render_full_report()
+
+
+class TestReportArchive(unittest.TestCase):
+    """报告压缩归档测试"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_roundtrip_and_ratio(self):
+        """测试两种格式都能取出任意单份报告，压缩率在10倍以上"""
+        reports = {f"game{i}_full.txt": play_report(i) for i in range(30)}
+        raw = sum(len(text.encode("utf-8")) for text in reports.values())
+        for fmt in ("xz", "gz"):
+            with self.subTest(fmt=fmt):
+                with ReportArchive(self.dir, prefix=fmt, fmt=fmt) as archive:
+                    for name, text in reports.items():
+                        archive.add(name, text)
+                    bundle = archive.bundle_path(1)
+                self.assertEqual(archive.extract("game17_full.txt").decode("utf-8"), reports["game17_full.txt"])
+                out = io.BytesIO()
+                archive.extract("game0_full.txt", out)
+                self.assertEqual(out.getvalue().decode("utf-8"), reports["game0_full.txt"])
+                if fmt == "xz":
+                    self.assertGreaterEqual(raw / os.path.getsize(bundle), 10)
+
+    def test_frames_and_rotation(self):
+        """测试按帧切分与按大小轮换，重新打开时从新压缩包开始"""
+        texts = [play_report(i) for i in range(12)]
+        archive = ReportArchive(self.dir, fmt="gz", frame_bytes=30000, bundle_bytes=8000)
+        for i, text in enumerate(texts[:11]):
+            archive.add(f"r{i}", text)
+        self.assertNotIn("r10", archive.names())  # 当前帧尚未结束
+        archive.add("r11", texts[11])
+        archive.close()
+        self.assertEqual(archive.names(), [f"r{i}" for i in range(12)])
+        entries = archive.entries()
+        self.assertGreater(len({e["bundle"] for e in entries}), 1)
+        self.assertGreater(len({(e["bundle"], e["frame"]) for e in entries}), len({e["bundle"] for e in entries}))
+        for i in (0, 5, 11):
+            self.assertEqual(archive.extract(f"r{i}").decode("utf-8"), texts[i])
+
+        last = max(e["bundle"] for e in entries)
+        with ReportArchive(self.dir, fmt="gz") as reopened:
+            self.assertEqual(reopened.add("r0", "新的r0"), reopened.bundle_path(last + 1))
+        self.assertEqual(archive.extract("r0").decode("utf-8"), "新的r0")
+        with self.assertRaises(KeyError):
+            archive.extract("missing")
+
+    def test_game_archive_mode(self):
+        """测试归档模式下完整报告写入压缩包而不是txt文件，已有txt可批量归档"""
+        archive = ReportArchive(os.path.join(self.dir, "archive"))
+        game = Game(seed=3)
+        game.export_prefix = os.path.join(self.dir, "")
+        game.archive = archive
+        with patch('sys.stdout', new=io.StringIO()) as fake_out:
+            game.setup_game(6)
+            game.export_full_report()
+            game.archive = None
+            game.export_full_report()
+        self.assertIn("完整报告已归档到", fake_out.getvalue())
+        txt = [os.path.join(self.dir, name) for name in os.listdir(self.dir) if name.endswith(".txt")]
+        self.assertEqual(len(txt), 1)
+        self.assertEqual(archive_files(txt, archive, remove=True), 1)
+        archive.close()
+        self.assertFalse(os.path.exists(txt[0]))
+        names = archive.names()
+        self.assertEqual(len(names), 2)
+        self.assertIn("=== 身份分配 ===", archive.extract(names[0]).decode("utf-8"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+"""
+命令行入口测试
+"""
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import cli
+
+SCRIPT = """# 注释
+trade 1 2 3
+hunt 1 2 5
+modify 3 -4 罚血
+round
+hunt 9 1 1
+bogus
+"""
+
+
+class TestCli(unittest.TestCase):
+    """命令行入口测试"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.events = os.path.join(self.tmp.name, "events.jsonl")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def run_cli(self, argv, stdin=""):
+        with patch('sys.stdin', new=io.StringIO(stdin)), \
+             patch('sys.stdout', new=io.StringIO()) as fake_out:
+            code = cli.main(argv)
+        return code, fake_out.getvalue()
+
+    def test_batch_replay_analyze(self):
+        """测试batch写出的事件日志可以重放与统计"""
+        code, out = self.run_cli(["batch", "--players", "8", "--seed", "3", "--no-export",
+                                  "--events", self.events, "--strict"], SCRIPT)
+        self.assertEqual(code, 1)
+        self.assertIn("第7行命令格式错误", out)
+        self.assertIn("共2条命令失败", out)
+        with open(self.events, encoding="utf-8") as f:
+            self.assertEqual(sum(json.loads(line)["line"] == "event" for line in f), 4)
+
+        code, out = self.run_cli(["replay", self.events, "--seed", "3"])
+        self.assertEqual(code, 0)
+        self.assertIn("重放4个事件", out)
+        code, out = self.run_cli(["replay", self.events, "--seed", "4"])
+        self.assertEqual(code, 1)
+        self.assertIn("不一致", out)
+
+        code, out = self.run_cli(["analyze", self.events, "--seed", "3", "--advise", "1"])
+        self.assertEqual(code, 0)
+        self.assertIn("  hunt: 1", out)
+        self.assertIn("玩家1的捕食建议", out)
+
+        # 不给出或给错种子时不给出建议
+        with patch('sys.stderr', new=io.StringIO()), self.assertRaises(SystemExit):
+            self.run_cli(["analyze", self.events, "--advise", "1"])
+        code, out = self.run_cli(["analyze", self.events, "--seed", "4", "--advise", "1"])
+        self.assertEqual(code, 1)
+        self.assertIn("无法给出捕食建议", out)
+        self.assertNotIn("玩家1的捕食建议", out)
+
+    def test_simulate(self):
+        """测试模拟子命令输出汇总"""
+        code, out = self.run_cli(["simulate", "--players", "6", "--seeds", "2", "--workers", "1"])
+        self.assertEqual(code, 0)
+        self.assertEqual(json.loads(out)["games"], 2)
+
+    def test_lazy_imports(self):
+        """测试play/batch不加载较重的模块"""
+        code = (
+            "import io, sys; sys.stdin = io.StringIO('trade 1 2 1\\n');"
+            "import cli; cli.main(['batch', '--players', '6', '--no-export']);"
+            "print([m for m in ('multiprocessing', 'sqlite3', 'asyncio', 'concurrent.futures', 'numpy')"
+            " if m in sys.modules])"
+        )
+        result = subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(os.path.abspath(cli.__file__)),
+                                capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip().splitlines()[-1], "[]")
+
+    def test_startup_budget(self):
+        """测试各子命令冷启动在预算内(测试环境放宽3倍)"""
+        timings = cli.measure_startup(repeat=1)
+        self.assertEqual(set(timings), set(cli.STARTUP_BUDGETS))
+        for name, seconds in timings.items():
+            self.assertLess(seconds, cli.STARTUP_BUDGETS[name] * 3, name)
+
+
+if __name__ == '__main__':
+    unittest.main()
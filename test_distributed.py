@@ -0,0 +1,128 @@
+"""
+分布式模拟测试
+"""
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import unittest
+from unittest.mock import patch
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import distributed
+from distributed import (Coordinator, _recv_frame, _run_local, decode_result, encode_result, frame,
+                         run_distributed, run_worker)
+from forest import RuleConfig
+from sweep import run_sweep, summarize
+
+
+class TestDistributed(unittest.TestCase):
+    """分布式模拟测试"""
+
+    def expected(self, configs, player_counts, seeds):
+        return summarize(run_sweep(configs, player_counts, seeds, workers=1, max_steps=200))
+
+    def test_result_encoding(self):
+        """测试二进制结果编码往返"""
+        data = encode_result(7, 25, 24, 3100, {"黑桃K": 10, "Joker": 3})
+        self.assertEqual(len(data), 22 + 2 * 5)
+        self.assertEqual(decode_result(data), (7, 25, 24, 3100, {"Joker": 3, "黑桃K": 10}))
+
+    def test_local_worker_processes(self):
+        """测试多个本机工作进程的汇总与单进程扫描一致"""
+        configs = [RuleConfig(), RuleConfig(kill_bonus=5)]
+        rows = run_distributed(configs, [6, 9], range(40), workers=3, chunk_size=7, max_steps=200, timeout=60)
+        self.assertEqual(rows, self.expected(configs, [6, 9], range(40)))
+
+    def test_seed_list(self):
+        """测试不连续的种子列表只模拟给出的种子"""
+        coordinator = Coordinator([RuleConfig()], [6], [50, 0, 3, 4, 5], chunk_size=2)
+        self.assertEqual([(c.start, c.stop) for c in coordinator.chunks], [(0, 1), (3, 5), (5, 6), (50, 51)])
+        self.assertEqual(Coordinator([RuleConfig()], [6], []).summary()[0]["games"], 0)
+        rows = run_distributed([RuleConfig()], [6], [0, 50], workers=1, max_steps=200, timeout=60)
+        self.assertEqual(rows[0]["games"], 2)
+        self.assertEqual(rows, self.expected([RuleConfig()], [6], [0, 50]))
+
+    def test_killed_worker_respawned(self):
+        """测试工作进程被杀后任务块重新排队并补启进程，结果不受影响"""
+        launched = []
+        launch = distributed.launch_local_workers
+
+        def tracking(count, host, port):
+            processes = launch(count, host, port)
+            launched.extend(processes)
+            return processes
+
+        async def main():
+            coordinator = Coordinator([RuleConfig()], [8], range(60), chunk_size=2, max_steps=200)
+            with patch.object(distributed, "launch_local_workers", tracking):
+                run = asyncio.ensure_future(_run_local(coordinator, 2, 60))
+                while not any(chunk.holders for chunk in coordinator.chunks):
+                    await asyncio.sleep(0.01)
+                launched[0].kill()
+                rows = await run
+            return coordinator, rows
+
+        coordinator, rows = asyncio.run(main())
+        self.assertEqual(coordinator.respawned, 1)
+        self.assertEqual(len(launched), 3)
+        self.assertEqual(rows, self.expected([RuleConfig()], [8], range(60)))
+
+    def test_all_workers_dead(self):
+        """测试工作进程总是退出时报错而不是一直等待"""
+        def dying(count, host, port):
+            return [subprocess.Popen([sys.executable, "-c", "pass"]) for _ in range(count)]
+
+        async def main():
+            coordinator = Coordinator([RuleConfig()], [6], range(10))
+            with patch.object(distributed, "launch_local_workers", dying):
+                await _run_local(coordinator, 2, None)
+
+        with self.assertRaises(RuntimeError):
+            asyncio.run(main())
+
+    def run_with_faulty_worker(self, faulty, steal_after=None):
+        """先让一个异常的工作进程领走任务，再用正常的工作进程完成全部任务"""
+        async def main():
+            coordinator = Coordinator([RuleConfig()], [8], range(30), chunk_size=10, max_steps=200,
+                                      steal_after=steal_after)
+            port = await coordinator.start()
+            conn = await asyncio.to_thread(faulty, port)
+            await asyncio.to_thread(run_worker, "127.0.0.1", port)
+            await coordinator.wait(10)
+            conn.close()
+            await coordinator.stop()
+            return coordinator
+        return asyncio.run(main())
+
+    @staticmethod
+    def take_job(port):
+        sock = socket.create_connection(("127.0.0.1", port))
+        sock.sendall(frame(b"G"))
+        kind, payload = _recv_frame(sock)
+        assert kind == b"J" and json.loads(payload)["id"] == 0
+        return sock
+
+    def test_lost_chunk_reissued(self):
+        """测试工作进程断开后其任务块重新排队"""
+        def faulty(port):
+            sock = self.take_job(port)
+            sock.close()
+            return sock
+        coordinator = self.run_with_faulty_worker(faulty)
+        self.assertEqual(coordinator.reissued, 1)
+        self.assertEqual(coordinator.summary(), self.expected([RuleConfig()], [8], range(30)))
+
+    def test_straggler_stolen(self):
+        """测试卡住的工作进程手上的任务块被空闲进程窃取"""
+        coordinator = self.run_with_faulty_worker(self.take_job, steal_after=0.0)
+        self.assertEqual(coordinator.duplicates, 1)
+        self.assertEqual(coordinator.reissued, 0)
+        self.assertEqual(coordinator.summary(), self.expected([RuleConfig()], [8], range(30)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+"""
+结构化事件导出测试
+"""
+import csv
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from event_writer import CSV_COLUMNS, EventWriter
+from forest import Game, CardRank, CardSuit
+
+
+class TestEventWriter(unittest.TestCase):
+    """结构化事件导出测试"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.game = Game(seed=2)
+        self.game.auto_export = False
+        with patch('sys.stdout', new=io.StringIO()):
+            self.game.setup_game(6)
+        self.game.players[0].rank, self.game.players[0].suit = CardRank.K, CardSuit.SPADE
+        self.game.players[1].rank, self.game.players[1].suit = CardRank.Q, CardSuit.SPADE
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def play(self):
+        with patch('sys.stdout', new=io.StringIO()):
+            self.game.trade(1, 2, 3)
+            self.game.next_round()
+            self.game.hunt(1, 2, 5)
+            self.game.modify_blood(3, -2, "罚血")
+            self.game.transaction().trade(4, 5, 1).commit()
+
+    def test_jsonl(self):
+        """测试JSON Lines逐行追加，快照按间隔写入"""
+        path = os.path.join(self.tmp.name, "events.jsonl")
+        writer = EventWriter(path, snapshot_interval=3)
+        writer.attach(self.game)
+        self.play()
+        writer.close()
+        self.assertEqual(self.game.listeners, [])
+        with open(path, encoding="utf-8") as f:
+            lines = [json.loads(line) for line in f]
+        self.assertEqual([line["seq"] for line in lines], list(range(1, 9)))
+        self.assertEqual([line.get("type", line["line"]) for line in lines],
+                         ["snapshot", "trade", "round", "hunt", "snapshot", "modify", "batch", "snapshot"])
+        hunt = lines[3]
+        self.assertEqual((hunt["round"], hunt["result"], hunt["players"]), (1, 1, [[1, 22, -3, 1], [2, 18, 3, 1]]))
+        self.assertEqual(lines[5]["note"], "罚血")
+        self.assertEqual(lines[6]["actions"], [["trade", 4, 5, 1]])
+        self.assertEqual(lines[-1]["players"][2], [3, 18, 0, 1])
+
+        # 再次打开时追加，不改写已有内容，seq接着编号
+        with EventWriter(path) as writer:
+            self.assertEqual(writer.seq, 8)
+            writer.attach(self.game)
+        with open(path, encoding="utf-8") as f:
+            lines = [json.loads(line) for line in f]
+        self.assertEqual([line["seq"] for line in lines], list(range(1, 11)))
+
+        # 最后一行没写完(进程中断)时按前一行继续
+        with open(path, "a", encoding="utf-8") as f:
+            f.write('{"seq":11,"ti')
+        with EventWriter(path) as writer:
+            self.assertEqual(writer.seq, 10)
+            writer.attach(self.game)
+        with open(path, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        self.assertEqual(lines[10], '{"seq":11,"ti')
+        self.assertEqual(json.loads(lines[11])["seq"], 11)
+
+    def test_csv(self):
+        """测试CSV格式每个事件一行"""
+        path = os.path.join(self.tmp.name, "events.csv")
+        with EventWriter(path, fmt="csv", snapshot_interval=0) as writer:
+            writer.attach(self.game)
+            self.play()
+        with open(path, encoding="utf-8", newline="") as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual(list(rows[0]), list(CSV_COLUMNS))
+        self.assertEqual(len(rows), 7)
+        self.assertEqual(rows[1]["players"], "1:17:-3:1;2:23:3:1")
+        self.assertEqual((rows[4]["type"], rows[4]["p1"], rows[4]["k"]), ("modify", "3", "-2"))
+        self.assertEqual(rows[5]["actions"], "trade:4:5:1")
+
+        with EventWriter(path, fmt="csv") as writer:
+            writer.attach(self.game)
+        with open(path, encoding="utf-8", newline="") as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual([row["seq"] for row in rows], [str(i) for i in range(1, 10)])
+        with EventWriter(os.path.join(self.tmp.name, "new.csv"), fmt="csv") as writer:
+            self.assertEqual(writer.seq, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
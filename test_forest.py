@@ -3,6 +3,8 @@ import sys
 import os
 from unittest.mock import patch, MagicMock
 import io
+import random
+import threading
 
 # 添加父目录到路径，以便导入forest模块
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -27,6 +29,7 @@ class TestForestGame(unittest.TestCase):
     def setUp(self):
         """每个测试前的准备工作"""
         self.game = Game()
+        self.game.auto_export = False
         # 手动设置游戏参数，避免需要输入
         self.game.player_count = 12
         self.game.joker_count = 0
@@ -416,6 +419,7 @@ class TestComprehensiveScenarios(unittest.TestCase):
     def test_full_game_flow(self):
         """测试完整游戏流程"""
         game = Game()
+        game.auto_export = False
         game.player_count = 8
         game.players = [Player(i+1) for i in range(8)]
         game._assign_identities()
@@ -451,6 +455,355 @@ class TestComprehensiveScenarios(unittest.TestCase):
         self.assertTrue(any("捕食" in record for record in game.records))
 
 
+class TestGameOver(unittest.TestCase):
+    """游戏结束判定测试"""
+    
+    def setUp(self):
+        self.game = Game()
+        self.game.auto_export = False
+        self.game.player_count = 6
+        self.game.players = [Player(i+1) for i in range(3)]
+        cards = [(CardSuit.SPADE, CardRank.K), (CardSuit.HEART, CardRank.Q), (CardSuit.SPADE, CardRank.J)]
+        for player, (suit, rank) in zip(self.game.players, cards):
+            player.suit = suit
+            player.rank = rank
+    
+    def test_single_survivor(self):
+        """测试仅剩一名存活玩家时结束"""
+        self.assertIsNone(self.game.check_game_over())
+        self.assertEqual(self.game.alive_count, 3)
+        
+        with patch('sys.stdout', new=io.StringIO()):
+            self.game.modify_blood(2, -20)
+            self.assertIsNone(self.game.check_game_over())
+            self.game.hunt(3, 1, 20)  # J克制K，玩家1死亡
+        
+        self.assertEqual(self.game.alive_count, 1)
+        self.assertEqual(self.game.check_game_over(), "仅剩一名存活玩家")
+    
+    def test_no_restraint(self):
+        """测试存活玩家之间互不克制时结束"""
+        self.game.end_conditions.no_restraint = True
+        # 6人局中黑桃K与红桃K互相克制，改为12人局的黑桃K与梅花K打平
+        self.game.player_count = 12
+        self.game.players[1].suit = CardSuit.CLUB
+        self.game.players[1].rank = CardRank.K
+        self.assertIsNone(self.game.check_game_over())
+        
+        with patch('sys.stdout', new=io.StringIO()):
+            self.game.modify_blood(3, -20)
+        
+        self.assertEqual(self.game.check_game_over(), "存活玩家之间互不克制")
+    
+    def test_max_rounds(self):
+        """测试回合上限"""
+        self.game.end_conditions.max_rounds = 2
+        with patch('sys.stdout', new=io.StringIO()):
+            self.game.next_round()
+            self.assertIsNone(self.game.check_game_over())
+            self.game.next_round()
+        
+        self.assertEqual(self.game.check_game_over(), "已达到回合上限2")
+        self.assertIn("第2回合开始", self.game.records)
+
+
+class TestTransaction(unittest.TestCase):
+    """同时行动事务测试"""
+    
+    def setUp(self):
+        self.game = Game()
+        self.game.player_count = 6
+        self.game.players = [Player(i+1) for i in range(4)]
+        cards = [(CardSuit.SPADE, CardRank.K), (CardSuit.HEART, CardRank.Q),
+                 (CardSuit.SPADE, CardRank.J), (CardSuit.HEART, CardRank.J)]
+        for player, (suit, rank) in zip(self.game.players, cards):
+            player.suit = suit
+            player.rank = rank
+    
+    def test_commit_batch(self):
+        """测试整批提交：先交易后捕食，一段记录、一次导出"""
+        tx = self.game.transaction()
+        tx.hunt(1, 2, 22)  # 声明在前，但在交易之后结算
+        tx.trade(3, 2, 5)
+        
+        with patch.object(self.game, 'export_full_report') as full, \
+             patch.object(self.game, 'export_data') as data, \
+             patch('sys.stdout', new=io.StringIO()):
+            self.assertTrue(tx.commit())
+        
+        full.assert_called_once()
+        data.assert_not_called()
+        self.assertEqual(self.game.records, [
+            "同时行动 - 共2项",
+            "交易 - 玩家3 -> 玩家2: 5点血",
+            "捕食 - 玩家1捕食玩家2成功: 22点血",
+        ])
+        self.assertEqual(self.game.players[0].blood, 42)
+        self.assertEqual(self.game.players[1].blood, 3)
+        self.assertEqual(self.game.players[2].trade, -5)
+    
+    def test_reject_whole_batch(self):
+        """测试任一操作不合法时整批撤销"""
+        tx = self.game.transaction()
+        tx.trade(1, 2, 6).trade(3, 2, 5)  # 玩家2交易血量将达到11
+        tx.hunt(1, 3, 5)
+        
+        with patch('sys.stdout', new=io.StringIO()) as fake_out:
+            self.assertFalse(tx.commit())
+            self.assertIn("第2项：玩家2的交易血量将超过10", fake_out.getvalue())
+        
+        self.assertEqual(self.game.records, [])
+        self.assertEqual([p.blood for p in self.game.players], [20, 20, 20, 20])
+        self.assertEqual([p.trade for p in self.game.players], [0, 0, 0, 0])
+    
+    def test_dead_player_within_batch(self):
+        """测试批内先被击杀的玩家不能再参与后续操作"""
+        tx = self.game.transaction()
+        tx.hunt(3, 1, 20)  # J克制K，玩家1死亡
+        tx.hunt(1, 2, 5)
+        
+        with patch('sys.stdout', new=io.StringIO()) as fake_out:
+            self.assertFalse(tx.commit())
+            self.assertIn("第2项：有玩家已死亡", fake_out.getvalue())
+        self.assertTrue(self.game.players[0].is_alive)
+    
+    def test_kill_updates_game_over_counters(self):
+        """测试批内击杀会更新结束判定计数器"""
+        self.game.check_game_over()
+        tx = self.game.transaction().hunt(3, 1, 20).hunt(4, 3, 1)
+        
+        with patch.object(self.game, 'export_full_report'), patch('sys.stdout', new=io.StringIO()):
+            self.assertTrue(tx.commit())
+        
+        self.assertEqual(self.game.alive_count, 3)
+        self.assertEqual(self.game.players[2].blood, 44)  # 20+23+1(黑桃J克制红桃J)
+
+
+class TestThreadSafety(unittest.TestCase):
+    """线程安全模式压力测试"""
+    
+    def make_game(self, player_count):
+        game = Game(output=lambda message: None, seed=7, thread_safe=True)
+        game.auto_export = False
+        game.setup_game(player_count)
+        return game
+    
+    def run_threads(self, worker, count=8):
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    
+    def test_concurrent_trades_conserve_blood(self):
+        """测试并发交易：总血量守恒、交易血量之和为0且不超过上限"""
+        game = self.make_game(12)
+        successes = []
+        
+        def worker(seed):
+            rng = random.Random(seed)
+            count = 0
+            for _ in range(2000):
+                p1, p2 = rng.sample(range(1, 13), 2)
+                if game.trade(p1, p2, rng.randint(1, 4)):
+                    count += 1
+                if game.trade(p2, p1, rng.randint(1, 4)):
+                    count += 1
+            successes.append(count)
+        
+        self.run_threads(worker)
+        
+        self.assertEqual(sum(p.blood for p in game.players), 12 * 20)
+        self.assertEqual(sum(p.trade for p in game.players), 0)
+        self.assertTrue(all(p.trade <= game.trade_cap for p in game.players))
+        self.assertEqual(len(game.records), 2 + 12 + sum(successes))
+    
+    def test_concurrent_mixed_actions_keep_invariants(self):
+        """测试并发交易、捕食与修改血量后状态与计数器一致"""
+        game = self.make_game(13)
+        events = []
+        game.listeners.append(events.append)
+        
+        def worker(seed):
+            rng = random.Random(seed)
+            for _ in range(1000):
+                p1, p2 = rng.sample(range(1, 14), 2)
+                action = rng.randrange(3)
+                if action == 0:
+                    game.trade(p1, p2, rng.randint(1, 5))
+                elif action == 1:
+                    game.hunt(p1, p2, rng.randint(1, 5))
+                else:
+                    game.modify_blood(p1, rng.randint(-3, 3))
+        
+        self.run_threads(worker)
+        
+        alive = [p for p in game.players if p.is_alive]
+        self.assertTrue(all(p.blood >= 0 for p in game.players))
+        self.assertTrue(all(p.blood == 0 for p in game.players if not p.is_alive))
+        self.assertEqual(sum(p.trade for p in game.players), 0)
+        self.assertEqual(game.alive_count, len(alive))
+        self.assertEqual(len(game.records), 2 + 13 + len(events))
+    
+    def test_disjoint_players_do_not_block(self):
+        """测试不相交的玩家之间不会互相阻塞"""
+        game = self.make_game(6)
+        done = threading.Event()
+        
+        def worker():
+            game.trade(3, 4, 1)
+            done.set()
+        
+        with game._locked(1, 2):
+            threading.Thread(target=worker).start()
+            self.assertTrue(done.wait(5), "玩家3、4的交易不应等待玩家1、2的锁")
+        
+        blocked = threading.Event()
+        
+        def conflicting():
+            game.trade(2, 5, 1)
+            blocked.set()
+        
+        with game._locked(1, 2):
+            threading.Thread(target=conflicting).start()
+            self.assertFalse(blocked.wait(0.2), "涉及玩家2的交易应等待")
+        self.assertTrue(blocked.wait(5))
+
+
+
+class TestMemoryLayout(unittest.TestCase):
+    """紧凑存储测试"""
+    
+    def test_record_log(self):
+        """测试模板记录与文本记录的读取、切片和比较"""
+        from forest import RecordLog, RECORD_TRADE, RECORD_ROUND
+        log = RecordLog()
+        log.append((RECORD_TRADE, 1, 2, 3))
+        log.append("游戏初始化")
+        log.append((RECORD_ROUND, 2))
+        self.assertEqual(len(log), 3)
+        self.assertEqual(log[0], "交易 - 玩家1 -> 玩家2: 3点血")
+        self.assertEqual(log[-1], "第2回合开始")
+        self.assertEqual(log[1:], ["游戏初始化", "第2回合开始"])
+        self.assertEqual(log, ["交易 - 玩家1 -> 玩家2: 3点血", "游戏初始化", "第2回合开始"])
+        self.assertIn("游戏初始化", log)
+        with self.assertRaises(IndexError):
+            log[3]
+        log.clear()
+        self.assertEqual(log, [])
+
+    def test_record_log_large_amount(self):
+        """测试超出int范围的血量按文本记录，之后的记录与导出不受影响"""
+        game = Game(output=lambda message: None, seed=1)
+        game.auto_export = False
+        game.setup_game(6)
+        self.assertTrue(game.modify_blood(1, 3_000_000_000))
+        self.assertEqual(game.records[-1], "修改血量 - 玩家1 增加3000000000点血")
+        game.trade(2, 3, 1)
+        self.assertEqual(game.records[-1], "交易 - 玩家2 -> 玩家3: 1点血")
+        self.assertIn("3000000000点血", game.render_full_report())
+        self.assertEqual(len(list(game.records)), len(game.records))
+
+    def test_records_replaced_or_unpackable(self):
+        """测试记录被替换为列表、参数为小数时仍按文本保存，导出不受影响"""
+        from forest import RecordLog
+        game = Game(output=lambda message: None, seed=1)
+        game.auto_export = False
+        game.setup_game(6)
+        game.records = []
+        self.assertIsInstance(game.records, RecordLog)
+        self.assertTrue(game.trade(1, 2, 3))
+        self.assertTrue(game.trade(1, 2, 1.5))
+        self.assertEqual(game.records, ["交易 - 玩家1 -> 玩家2: 3点血", "交易 - 玩家1 -> 玩家2: 1.5点血"])
+        self.assertEqual(game.players[0].blood, 15.5)
+        self.assertIn("  2. 交易 - 玩家1 -> 玩家2: 1.5点血", game.render_full_report())
+
+    def test_records_match_text(self):
+        """测试对局记录与原先的文本一致"""
+        game = Game(output=lambda message: None, seed=1)
+        game.auto_export = False
+        game.setup_game(6)
+        game.players[0].rank, game.players[0].suit = CardRank.K, CardSuit.SPADE
+        game.players[1].rank, game.players[1].suit = CardRank.Q, CardSuit.SPADE
+        game.hunt(1, 2, 20)
+        game.modify_blood(3, -4, "违规")
+        game.modify_blood(3, 2)
+        self.assertEqual(game.records[1], "玩家数量: 6")
+        self.assertEqual(game.records[-3:], [
+            "捕食 - 玩家1捕食玩家2成功，玩家2死亡，玩家1获得23点血",
+            "修改血量 - 玩家3 减少4点血 (违规)",
+            "修改血量 - 玩家3 增加2点血",
+        ])
+    
+    def test_shared_tables(self):
+        """测试玩家无实例字典，默认规则共享只读Joker表"""
+        from forest import RuleConfig
+        self.assertFalse(hasattr(Player(1), "__dict__"))
+        self.assertIs(RuleConfig().joker_counts, RuleConfig().joker_counts)
+        with self.assertRaises(TypeError):
+            RuleConfig().joker_counts[6] = 1
+        self.assertEqual(RuleConfig(joker_counts={6: 1}).joker_count_for(6), 1)
+
+
+
+class TestRenderCache(unittest.TestCase):
+    """显示文本缓存测试"""
+    
+    def setUp(self):
+        self.game = Game(output=lambda message: None, seed=4)
+        self.game.auto_export = False
+        self.game.setup_game(6)
+    
+    def test_player_text_invalidation(self):
+        """测试只有字段变化时才重新生成玩家文本"""
+        player = self.game.players[0]
+        info = player.get_info()
+        self.assertIs(player.get_info(), info)
+        player.blood += 1
+        self.assertNotEqual(player.get_info(), info)
+        self.assertIn(f"血量: {player.blood}", player.get_info())
+        name = str(player)
+        player.trade = 3
+        self.assertIs(str(player), name)
+        player.rank, player.suit = CardRank.JOKER, CardSuit.JOKER
+        self.assertEqual(str(player), "玩家1: Joker")
+        player.is_alive = False
+        self.assertTrue(player.get_info().endswith("状态: 死亡"))
+    
+    def test_blocks_reused_and_incremental(self):
+        """测试查看与导出复用同一玩家文本块，记录块随记录变化"""
+        game = self.game
+        status = game._player_block()
+        game.render_data_report()
+        self.assertIs(game._player_block(), status)
+        game.trade(1, 2, 3)
+        self.assertIsNot(game._player_block(), status)
+        
+        full = game.render_full_report()
+        self.assertIn(f"{len(game.records):3d}. 交易 - 玩家1 -> 玩家2: 3点血", full)
+        game.next_round()
+        full = game.render_full_report()
+        self.assertTrue(full.split("=== 最终玩家状态 ===")[0].endswith(f"{len(game.records):3d}. 第1回合开始\n\n"))
+        data = game.render_data_report()
+        self.assertEqual(data.split("=== 操作记录 ===\n")[1].split("\n\n")[0], "\n".join(game.records))
+        
+        game.records = []  # 替换记录后缓存失效
+        self.assertIn("=== 操作记录 ===\n\n=== 当前玩家状态 ===", game.render_data_report())
+
+    def test_record_text_not_retained(self):
+        """测试导出后不常驻记录全文，清空后重新增长到同样条数也不会读到旧文本"""
+        game = self.game
+        game.trade(1, 2, 3)
+        count = len(game.records)
+        game.render_data_report()
+        game.render_full_report()
+        self.assertEqual(set(game._block_cache), {"identity", "status"})
+        game.records.clear()
+        game.records.extend(f"记录{i}" for i in range(count))
+        self.assertIn(f"{count:3d}. 记录{count - 1}", game.render_full_report())
+        self.assertIn("=== 操作记录 ===\n记录0\n", game.render_data_report())
+
+
 if __name__ == '__main__':
     # 运行所有测试
     unittest.main(verbosity=2)
@@ -0,0 +1,59 @@
+"""
+随机压力测试的测试
+"""
+import os
+import random
+import sys
+import unittest
+from unittest.mock import patch
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from forest import Game
+from fuzz import fuzz, generate_ops, run_ops, shrink
+
+
+class TestFuzz(unittest.TestCase):
+    """随机压力测试"""
+
+    def test_clean_run(self):
+        """测试当前实现在随机操作下不违反不变量"""
+        report = fuzz(20000, seed=1)
+        self.assertEqual(report["ops"], 20000)
+        self.assertIsNone(report["failure"])
+
+    def test_invalid_ops_generated(self):
+        """测试生成的操作包含越界编号与非正数血量"""
+        ops = generate_ops(random.Random(0), 8, 5000)
+        numbers = [no for op in ops if op[0] != "round" for no in op[1:3 if op[0] != "modify" else 2]]
+        self.assertTrue(any(no <= 0 for no in numbers))
+        self.assertTrue(any(no > 8 for no in numbers))
+        self.assertTrue(any(op[-1] <= 0 for op in ops if op[0] in ("trade", "hunt")))
+
+    def test_negative_index_detected_and_shrunk(self):
+        """测试把编号0映射到最后一名玩家的旧行为能被发现并收缩到单步复现"""
+        def old_get_player(game, no):
+            return game.players[no-1]
+
+        with patch.object(Game, "get_player", old_get_player):
+            report = fuzz(20000, seed=1)
+        failure = report["failure"]
+        self.assertIsNotNone(failure)
+        self.assertEqual(len(failure["ops"]), 1)
+        op = failure["ops"][0]
+        self.assertTrue(any(no <= 0 for no in op[1:3 if op[0] != "modify" else 2]))
+
+    def test_shrink(self):
+        """测试收缩得到最小失败序列"""
+        ops = list(range(100))
+        minimal = shrink(ops, lambda c: 17 in c and 42 in c)
+        self.assertEqual(minimal, [17, 42])
+
+    def test_invalid_ops_rejected(self):
+        """测试对自己操作与编号0的操作被拒绝且不违反不变量"""
+        ops = [("modify", 1, 5), ("trade", 1, 1, 3), ("hunt", 0, 2, 3)]
+        self.assertIsNone(run_ops(ops, 8, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+"""
+黄金轨迹回归测试
+"""
+import copy
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from forest import DEFAULT_JOKER_COUNTS
+from golden import FEATURES, build_trace, check, generate, load_baseline, load_traces, replay_trace
+
+# 相对提交的计时基准允许的变慢倍数，机器明显更慢时可用环境变量放宽
+MAX_SLOWDOWN = float(os.environ.get("GOLDEN_MAX_SLOWDOWN", "3"))
+
+
+class TestGoldenTraces(unittest.TestCase):
+    """黄金轨迹回放与计时测试"""
+
+    def setUp(self):
+        self.traces = load_traces()
+
+    def test_corpus_replays_exactly(self):
+        """仓库中的全部黄金轨迹回放结果一致，耗时不超过提交的基准的允许倍数"""
+        baseline = load_baseline()
+        self.assertEqual(set(baseline), set(self.traces))
+        failures, timings = check(baseline=baseline, max_slowdown=MAX_SLOWDOWN, repeat=3)
+        self.assertEqual(failures, {})
+        self.assertEqual(set(timings), set(self.traces))
+
+    def test_corpus_coverage(self):
+        """每个人数局都有轨迹，Joker打平等情形都被覆盖"""
+        counts = {trace["player_count"] for trace in self.traces.values()}
+        self.assertEqual(counts, set(DEFAULT_JOKER_COUNTS))
+        covered = set()
+        for trace in self.traces.values():
+            covered.update(trace["features"])
+            for feature in ("kill", "trade_cap_reject", "modify_death"):
+                self.assertIn(feature, trace["features"])
+        self.assertEqual(covered, set(FEATURES))
+
+    def test_generation_is_deterministic(self):
+        """同一人数和种子重新生成的轨迹与仓库中一致"""
+        self.assertEqual(build_trace(8, 1), self.traces["trace_08_1"])
+
+    def test_detects_divergence(self):
+        """篡改预期结果后回放报告不一致"""
+        trace = copy.deepcopy(self.traces["trace_10_1"])
+        trace["expected"]["records"][5] += "!"
+        trace["expected"]["players"][0][2] += 1
+        problems, seconds = replay_trace(trace)
+        self.assertEqual(len(problems), 2)
+        self.assertIn("第7条记录不一致", problems[1])
+        self.assertGreater(seconds, 0)
+
+    def test_speed_regression_against_baseline(self):
+        """耗时超过基准允许倍数时报告"""
+        with tempfile.TemporaryDirectory() as tmp:
+            generate(tmp, seeds=(1,))
+            baseline = {name: 1e-9 for name in load_traces(tmp)}
+            failures, timings = check(tmp, baseline, max_slowdown=2.0, repeat=1)
+            self.assertEqual(set(failures), set(baseline))
+            self.assertIn("超过基准", failures["trace_06_1"][0])
+            failures, _ = check(tmp, {name: 10.0 for name in timings}, repeat=1)
+            self.assertEqual(failures, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+"""
+操作记录哈希链测试
+"""
+import os
+import sys
+import threading
+import unittest
+from multiprocessing import Pipe
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from forest import Game
+from hashchain import (HashChain, RemoteChain, chain_for, first_divergence, game_summary, report_records,
+                       report_summary, serve_chain, verify_proof, verify_report)
+from replication import game_state, restore_game
+
+
+class CountingChain:
+    """记录head查询次数"""
+    def __init__(self, chain):
+        self.chain = chain
+        self.length = chain.length
+        self.queries = 0
+
+    def head(self, index):
+        self.queries += 1
+        return self.chain.head(index)
+
+
+class TestHashChain(unittest.TestCase):
+    """哈希链测试"""
+
+    def setUp(self):
+        self.game = Game(output=lambda message: None, seed=5)
+        self.game.auto_export = False
+        self.game.setup_game(9)
+        for i in range(60):
+            self.game.trade(i % 9 + 1, (i + 4) % 9 + 1, 1)
+            self.game.hunt((i + 2) % 9 + 1, i % 9 + 1, 1)
+
+    def test_first_divergence_in_log_comparisons(self):
+        """两份记录从某条起不同，O(log n)次比较找到该条"""
+        records = list(self.game.records)
+        for index in (0, 1, 37, len(records) - 1):
+            with self.subTest(index=index):
+                changed = records[:index] + [records[index] + "!"] + records[index + 1:]
+                a, b = CountingChain(HashChain(records)), CountingChain(HashChain(changed))
+                self.assertEqual(first_divergence(a, b), index)
+                self.assertLessEqual(a.queries, len(records).bit_length() + 1)
+        self.assertIsNone(first_divergence(HashChain(records), HashChain(records)))
+        self.assertEqual(first_divergence(HashChain(records), HashChain(records[:50])), 50)
+        self.assertEqual(first_divergence(HashChain(), HashChain(records)), 0)
+
+    def test_incremental_game_chain(self):
+        """对局哈希链只计算新增记录，与一次性计算结果相同"""
+        chain = chain_for(self.game)
+        self.assertIs(chain_for(self.game), chain)
+        self.game.modify_blood(1, -1, "测试")
+        self.assertEqual(chain_for(self.game).length, len(self.game.records))
+        self.assertEqual(chain.summary(), HashChain(self.game.records).summary())
+
+    def test_replica_diverges_after_extra_action(self):
+        """热备副本与主机的记录比较"""
+        replica = restore_game(game_state(self.game))
+        self.assertIsNone(first_divergence(chain_for(self.game), chain_for(replica)))
+        replica.modify_blood(2, -1)
+        self.game.modify_blood(2, 1)
+        self.assertEqual(first_divergence(chain_for(self.game), chain_for(replica)), len(self.game.records) - 1)
+
+    def test_merkle_proof(self):
+        """单条记录的Merkle证明"""
+        chain = chain_for(self.game)
+        root = chain.root()
+        for index in (0, 5, chain.length - 1):
+            record = self.game.records[index]
+            self.assertTrue(verify_proof(record, chain.proof(index), root))
+            self.assertFalse(verify_proof(record + " ", chain.proof(index), root))
+        with self.assertRaises(IndexError):
+            chain.proof(chain.length)
+
+    def test_verify_report(self):
+        """导出的完整报告按摘要校验"""
+        text = self.game.render_full_report()
+        self.assertEqual(report_records(text), list(self.game.records))
+        summary = game_summary(self.game)
+        self.assertEqual(report_summary(text), summary)
+        self.assertTrue(verify_report(text, summary))
+        record = self.game.records[11]  # 交易 - 玩家1 -> 玩家5: 1点血
+        self.assertFalse(verify_report(text.replace(record, record.replace("1", "2"), 1), summary))
+        # 玩家状态或身份被改动
+        status = text.index("=== 最终玩家状态 ===")
+        p1 = self.game.players[0]
+        edited = text[:status] + text[status:].replace(f"血量: {p1.blood} ", "血量: 99 ", 1)
+        self.assertNotEqual(edited, text)
+        self.assertFalse(verify_report(edited, summary))
+        name = str(p1).split(": ", 1)[1]
+        self.assertFalse(verify_report(text.replace(f"玩家1: {name}\n", "玩家1: Joker\n", 1), summary))
+
+    def test_remote_chain(self):
+        """跨进程比较：每次查询一次往返"""
+        local, remote = Pipe()
+        other = list(self.game.records)
+        other[80] = "篡改"
+        thread = threading.Thread(target=serve_chain, args=(remote, HashChain(other)), daemon=True)
+        thread.start()
+        self.assertEqual(first_divergence(chain_for(self.game), RemoteChain(local)), 80)
+        local.close()
+        thread.join(1)
+        self.assertFalse(thread.is_alive())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+"""
+胜负概率表测试
+"""
+import os
+import sys
+import unittest
+from itertools import permutations
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from forest import DEFAULT_JOKER_COUNTS, CardRank, CardSuit, Game, Player, build_deck
+from matchups import matchup_for, matchup_table
+
+
+def brute_force(player_count, card, revealed=()):
+    """逐个排列发牌，统计持card的1号玩家与2号玩家交手的结果(3号起依次为已公开身份)"""
+    game = Game(output=lambda message: None)
+    game.player_count = player_count
+    me, other = Player(1), Player(2)
+    attack, defend = [0, 0, 0], [0, 0, 0]
+    seen = set()
+    for deal in permutations(build_deck(player_count, DEFAULT_JOKER_COUNTS[player_count])):
+        if deal in seen:
+            continue
+        seen.add(deal)
+        if deal[0] != card or tuple(deal[2:2+len(revealed)]) != tuple(revealed):
+            continue
+        me.suit, me.rank = deal[0]
+        other.suit, other.rank = deal[1]
+        attack[{1: 0, -1: 1, 0: 2}[game._check_restraint(me, other)]] += 1
+        defend[{-1: 0, 1: 1, 0: 2}[game._check_restraint(other, me)]] += 1
+    return attack, defend
+
+
+class TestMatchupTable(unittest.TestCase):
+    """胜负概率表测试"""
+
+    def assertMatchesBruteForce(self, player_count, revealed=()):
+        table = matchup_table(player_count)
+        key = table.key_of(revealed)
+        for card in table.cards:
+            if revealed.count(card) >= table.counts[table.index[card]]:
+                continue
+            with self.subTest(player_count=player_count, card=card, revealed=revealed):
+                attack, defend = brute_force(player_count, card, revealed)
+                total = sum(attack)
+                a, d = table.attack(card, key), table.defend(card, key)
+                self.assertEqual([a.p_win, a.p_lose, a.p_tie], [x / total for x in attack])
+                self.assertEqual([d.p_win, d.p_lose, d.p_tie], [x / total for x in defend])
+
+    def test_matches_enumeration(self):
+        """与逐个排列发牌统计的结果完全一致(含Joker之间打平)"""
+        self.assertMatchesBruteForce(6)
+        self.assertMatchesBruteForce(8)
+
+    def test_conditional_matches_enumeration(self):
+        """排除已公开身份后的条件概率与枚举一致"""
+        joker = (CardSuit.JOKER, CardRank.JOKER)
+        self.assertMatchesBruteForce(6, ((CardSuit.HEART, CardRank.Q),))
+        self.assertMatchesBruteForce(8, (joker,))
+        self.assertMatchesBruteForce(8, (joker, (CardSuit.SPADE, CardRank.K)))
+
+    def test_reveal_is_order_independent(self):
+        """公开顺序不影响key，全部公开后不能再公开"""
+        table = matchup_table(13)
+        cards = list(table.cards)
+        self.assertEqual(table.key_of(cards), table.key_of(reversed(cards)))
+        self.assertEqual(table.key_of(cards), table.states - 1)
+        with self.assertRaises(ValueError):
+            table.reveal(table.key_of(cards), cards[0])
+        with self.assertRaises(ValueError):
+            table.attack(cards[0], table.key_of([cards[0]]))
+        with self.assertRaises(ValueError):
+            matchup_table(6).key_of([(CardSuit.CLUB, CardRank.K)])
+
+    def test_cached_per_player_count(self):
+        """同一人数局只建一次表"""
+        self.assertIs(matchup_table(10), matchup_table(10, DEFAULT_JOKER_COUNTS[10]))
+        self.assertIsNot(matchup_table(10), matchup_table(10, 2))
+
+    def test_matchup_for_game(self):
+        """按对局中玩家的身份查询，排除已公开玩家"""
+        game = Game(output=lambda message: None, seed=3)
+        game.auto_export = False
+        game.setup_game(10)
+        table = matchup_table(10)
+        card = (game.players[0].suit, game.players[0].rank)
+        attack, defend = matchup_for(game, 1)
+        self.assertEqual(attack, table.attack(card))
+        self.assertEqual(attack.total, 9)
+        attack, defend = matchup_for(game, 1, [1, 2, 3])
+        self.assertEqual(attack.total, 7)
+        key = table.key_of((p.suit, p.rank) for p in game.players[1:3])
+        self.assertEqual(defend, table.defend(card, key))
+
+
+if __name__ == '__main__':
+    unittest.main()
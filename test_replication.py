@@ -0,0 +1,139 @@
+"""
+热备复制测试
+"""
+import multiprocessing
+import os
+import random
+import sys
+import threading
+import unittest
+from multiprocessing import Pipe
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from forest import Game
+from replication import ReplicationPrimary, StandbyReplica, _send, game_state
+
+
+def make_game(seed=5, players=10):
+    game = Game(output=lambda message: None, seed=seed)
+    game.auto_export = False
+    game.setup_game(players)
+    return game
+
+
+def play(game, steps=200, seed=0):
+    rng = random.Random(seed)
+    for _ in range(steps):
+        alive = [p.no for p in game.players if p.is_alive]
+        if len(alive) < 3:
+            break
+        p1, p2, p3 = rng.sample(alive, 3)
+        roll = rng.random()
+        if roll < 0.3:
+            game.trade(p1, p2, rng.randint(1, 3))
+        elif roll < 0.7:
+            game.hunt(p1, p2, rng.randint(1, 5))
+        elif roll < 0.85:
+            game.modify_blood(p1, rng.randint(-3, 3) or 1, "调整")
+        elif roll < 0.95:
+            game.transaction().trade(p1, p2, 1).hunt(p3, p1, 2).commit()
+        else:
+            game.next_round()
+
+
+def _standby_process(conn, result_conn, primary_end):
+    """子进程中的备机：主机断开后接管，把状态发回"""
+    primary_end.close()  # fork继承的主机端，不关闭则收不到断开
+    replica = StandbyReplica(conn, heartbeat_timeout=5)
+    reason = replica.serve()
+    game = replica.promote(output=lambda message: None)
+    result_conn.send((reason, replica.applied, replica.diverged, game_state(game)))
+
+
+class TestReplication(unittest.TestCase):
+    """热备复制测试"""
+
+    def start_pair(self, game, **kwargs):
+        primary_conn, standby_conn = Pipe()
+        replica = StandbyReplica(standby_conn, **kwargs)
+        result = {}
+        thread = threading.Thread(target=lambda: result.setdefault("reason", replica.serve()))
+        thread.start()
+        primary = ReplicationPrimary(game, primary_conn, heartbeat_interval=0.05).start()
+        return primary, replica, thread, result
+
+    def test_replay_and_failover(self):
+        """测试备机重放全部操作，接管后状态、发牌和记录完全一致"""
+        game = make_game()
+        primary, replica, thread, result = self.start_pair(game)
+        play(game)
+        self.assertTrue(primary.wait_acked(10))
+        stats = primary.stats()
+        self.assertEqual((stats["lag_events"], stats["lag_seconds"], stats["failed_acks"]), (0, 0.0, 0))
+        self.assertEqual(stats["sent"], stats["acked"])
+        self.assertGreater(stats["max_ack_latency"], 0)
+
+        primary.stop()
+        thread.join(5)
+        self.assertEqual(result["reason"], "closed")
+        self.assertIsNone(replica.diverged)
+        promoted = replica.promote(output=lambda message: None)
+        self.assertEqual(game_state(promoted), game_state(game))
+        self.assertEqual(promoted.alive_count, game.alive_count)
+        self.assertTrue(promoted.auto_export)
+
+    def test_heartbeat_timeout(self):
+        """测试主机卡死(既无操作也无心跳)时备机超时返回"""
+        primary_conn, standby_conn = Pipe()
+        _send(primary_conn, {"t": "init", "seq": 0, "state": game_state(make_game())})
+        replica = StandbyReplica(standby_conn, heartbeat_timeout=0.2)
+        self.assertEqual(replica.serve(), "timeout")
+        self.assertEqual(replica.promote(output=lambda message: None).player_count, 10)
+
+    def test_heartbeat_keeps_standby(self):
+        """测试空闲时心跳维持连接"""
+        game = make_game()
+        primary, replica, thread, result = self.start_pair(game, heartbeat_timeout=0.3)
+        thread.join(0.8)
+        self.assertTrue(thread.is_alive())
+        game.hunt(1, 2, 1)
+        self.assertTrue(primary.wait_acked(5))
+        primary.stop()
+        thread.join(5)
+        self.assertEqual(result["reason"], "closed")
+
+    def test_divergence_reported(self):
+        """测试重放结果与主机不一致时确认失败"""
+        game = make_game()
+        primary, replica, thread, result = self.start_pair(game)
+        self.assertTrue(primary.wait_acked(5))
+        replica.game.players[0].blood = 1  # 人为制造不一致
+        game.modify_blood(1, 1)
+        self.assertTrue(primary.wait_acked(5))
+        self.assertEqual(primary.stats()["failed_acks"], 1)
+        primary.stop()
+        thread.join(5)
+        self.assertIn("不一致", replica.diverged)
+
+    def test_separate_process(self):
+        """测试复制到另一个进程"""
+        primary_conn, standby_conn = Pipe()
+        result_parent, result_child = Pipe()
+        process = multiprocessing.Process(target=_standby_process, args=(standby_conn, result_child, primary_conn))
+        process.start()
+        standby_conn.close()
+        game = make_game(seed=9, players=12)
+        primary = ReplicationPrimary(game, primary_conn).start()
+        play(game, seed=3)
+        self.assertTrue(primary.wait_acked(10))
+        primary.stop()
+        self.assertTrue(result_parent.poll(10))
+        reason, applied, diverged, state = result_parent.recv()
+        process.join(5)
+        self.assertEqual((reason, applied, diverged), ("closed", primary.seq, None))
+        self.assertEqual(state, game_state(game))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -168,6 +168,7 @@ class TestHuntSpecificCases(unittest.TestCase):
     def test_heart_k_hunt_spade_q(self):
         """专门测试：红桃K捕食黑桃Q"""
         game = Game()
+        game.auto_export = False
         game.player_count = 12
         
         # 创建玩家
@@ -0,0 +1,192 @@
+"""
+多桌服务端测试
+"""
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from archive import ReportArchive
+from forest import Game
+from server import GameServer, GameClient
+
+
+class TestGameServer(unittest.IsolatedAsyncioTestCase):
+    """通过本地客户端测试服务端"""
+
+    async def asyncSetUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.messages = []
+        self.server = GameServer(export_dir=self.tmpdir.name, output=self.messages.append)
+        listener = await self.server.start_tcp("127.0.0.1", 0)
+        self.port = listener.sockets[0].getsockname()[1]
+        self.client = await GameClient.connect_tcp("127.0.0.1", self.port)
+
+    async def asyncTearDown(self):
+        await self.client.close()
+        await self.server.stop()
+        self.tmpdir.cleanup()
+
+    async def test_create_and_trade(self):
+        """测试开桌与交易"""
+        response = await self.client.request(cmd="create", table="t1", players=8, seed=1, id=7)
+        self.assertTrue(response["ok"])
+        self.assertEqual(response["id"], 7)
+        self.assertEqual(len(response["players"]), 8)
+
+        response = await self.client.request(cmd="trade", table="t1", p1=1, p2=2, k=5)
+        self.assertTrue(response["ok"])
+        self.assertIn("交易成功！交易 - 玩家1 -> 玩家2: 5点血", response["messages"])
+
+        response = await self.client.request(cmd="trade", table="t1", p1=1, p2=2, k=6)
+        self.assertFalse(response["ok"])
+        self.assertIn("交易失败：玩家2的交易血量将超过10！", response["messages"])
+
+        await self.server.flush_exports()
+        exported = os.listdir(self.tmpdir.name)
+        self.assertTrue(any(name.startswith("t1_") for name in exported))
+
+    async def test_table_isolation(self):
+        """测试各桌状态互不影响"""
+        await self.client.pipeline([
+            {"cmd": "create", "table": "a", "players": 6, "seed": 1},
+            {"cmd": "create", "table": "b", "players": 6, "seed": 1},
+        ])
+        await self.client.request(cmd="modify", table="a", player=1, k=-25)
+
+        view_a = await self.client.request(cmd="view", table="a")
+        view_b = await self.client.request(cmd="view", table="b")
+        self.assertIn("状态: 死亡", view_a["players"][0])
+        self.assertIn("状态: 存活", view_b["players"][0])
+
+        response = await self.client.request(cmd="tables")
+        self.assertEqual(response["tables"], ["a", "b"])
+
+    async def test_invalid_requests(self):
+        """测试错误请求不会影响连接"""
+        self.assertFalse((await self.client.request(cmd="trade", table="missing", p1=1, p2=2, k=1))["ok"])
+        self.assertFalse((await self.client.request(cmd="create", table="../x", players=6))["ok"])
+        self.assertFalse((await self.client.request(cmd="create", table="x", players=3))["ok"])
+        self.assertFalse((await self.client.request(cmd="nope"))["ok"])
+        # 数值无法转换(溢出)与超大血量
+        self.assertTrue((await self.client.request(cmd="create", table="big", players=6, seed=1))["ok"])
+        response = await self.client.request(cmd="modify", table="big", player=1, k=float("inf"))
+        self.assertFalse(response["ok"])
+        self.assertIn("参数错误", response["error"])
+        self.assertTrue((await self.client.request(cmd="modify", table="big", player=1, k=3_000_000_000))["ok"])
+        self.assertTrue((await self.client.request(cmd="export", table="big"))["ok"])
+        self.assertTrue((await self.client.request(cmd="tables"))["ok"])
+
+    async def test_many_tables_pipelined(self):
+        """测试大量桌子与流水线请求"""
+        requests = [{"cmd": "create", "table": f"t{i}", "players": 12, "seed": i} for i in range(200)]
+        for i in range(200):
+            requests.append({"cmd": "modify", "table": f"t{i}", "player": 1, "k": 1})
+        responses = await self.client.pipeline(requests)
+        self.assertTrue(all(r["ok"] for r in responses))
+
+        await self.server.flush_exports()
+        self.assertEqual(len(os.listdir(self.tmpdir.name)), 200)
+
+    async def test_watch_stream(self):
+        """测试观战连接收到快照与增量推送"""
+        await self.client.request(cmd="create", table="w", players=6, seed=3)
+        watcher = await GameClient.connect_tcp("127.0.0.1", self.port)
+        try:
+            self.assertTrue((await watcher.request(cmd="watch", table="w"))["ok"])
+            snapshot = json.loads(await watcher.reader.readline())
+            self.assertEqual(snapshot["t"], "s")
+
+            await self.client.request(cmd="modify", table="w", player=2, k=4)
+            delta = json.loads(await watcher.reader.readline())
+            self.assertEqual(delta["p"], [[2, 24, 0, 1]])
+        finally:
+            await watcher.close()
+
+    async def test_export_failure_reported(self):
+        """测试写入失败只报告，该桌与其他桌之后的导出照常进行"""
+        write_report = Game.write_report
+
+        def failing(filename, text):
+            if os.path.basename(filename).startswith("bad_"):
+                raise OSError("磁盘已满")
+            write_report(filename, text)
+
+        with patch("server.Game.write_report", side_effect=failing):
+            await self.client.pipeline([
+                {"cmd": "create", "table": "bad", "players": 6, "seed": 1},
+                {"cmd": "create", "table": "good", "players": 6, "seed": 1},
+                {"cmd": "modify", "table": "bad", "player": 1, "k": 1},
+                {"cmd": "modify", "table": "good", "player": 1, "k": 1},
+            ])
+            await self.server.flush_exports()
+            self.assertTrue((await self.client.request(cmd="close", table="bad"))["ok"])
+            await self.server.stop()
+        self.assertEqual(len(self.messages), 2)
+        self.assertTrue(all("桌子bad导出失败: 磁盘已满" in m for m in self.messages))
+        self.assertTrue(any(name.startswith("good_") for name in os.listdir(self.tmpdir.name)))
+
+    async def test_close_detaches_spectators(self):
+        """测试关桌后观战推送从游戏上移除"""
+        await self.client.request(cmd="create", table="c", players=6, seed=3)
+        game = self.server.tables["c"].game
+        watcher = await GameClient.connect_tcp("127.0.0.1", self.port)
+        try:
+            self.assertTrue((await watcher.request(cmd="watch", table="c"))["ok"])
+            self.assertEqual(len(game.listeners), 1)
+            self.assertTrue((await self.client.request(cmd="close", table="c"))["ok"])
+            self.assertEqual(game.listeners, [])
+        finally:
+            await watcher.close()
+
+    async def archive_server(self, name, export_dir=None):
+        archive = ReportArchive(os.path.join(self.tmpdir.name, name))
+        server = GameServer(export_dir=export_dir, archive=archive, output=self.messages.append)
+        listener = await server.start_tcp("127.0.0.1", 0)
+        client = await GameClient.connect_tcp("127.0.0.1", listener.sockets[0].getsockname()[1])
+        return archive, server, client
+
+    async def test_archive_flushed_when_table_closes(self):
+        """测试归档按桌号命名，关桌后报告不等轮换即可读取"""
+        for export_dir in (None, self.tmpdir.name):
+            with self.subTest(export_dir=export_dir):
+                archive, server, client = await self.archive_server(f"archive_{export_dir is None}", export_dir)
+                await client.request(cmd="create", table="a1", players=6, seed=1)
+                await client.request(cmd="hunt", table="a1", p1=1, p2=2, k=1)
+                await server.flush_exports()
+                self.assertEqual(archive.names(), [])  # 对局未结束，报告还在当前帧中
+                await client.request(cmd="close", table="a1")
+                await server.flush_exports()
+                self.assertEqual(archive.names(), ["a1", "a1"])
+                self.assertIn("=== 身份分配 ===", archive.extract("a1").decode("utf-8"))
+                await client.close()
+                await server.stop()
+
+    async def test_archive_closed_on_stop(self):
+        """测试服务端停止时关闭归档，未结束的对局报告也不会丢失"""
+        archive, server, client = await self.archive_server("archive")
+        await client.request(cmd="create", table="s", players=6, seed=2)
+        await client.request(cmd="hunt", table="s", p1=3, p2=4, k=1)
+        await client.close()
+        await server.stop()
+        self.assertIsNone(archive._bundle)
+        self.assertEqual(ReportArchive(archive.directory).names(), ["s"])
+
+    async def test_unix_socket(self):
+        """测试Unix套接字监听"""
+        path = os.path.join(self.tmpdir.name, "forest.sock")
+        await self.server.start_unix(path)
+        client = await GameClient.connect_unix(path)
+        try:
+            response = await client.request(cmd="create", table="u", players=7)
+            self.assertTrue(response["ok"])
+        finally:
+            await client.close()
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,107 @@
+"""
+残局求解测试
+"""
+import copy
+import os
+import sys
+import time
+import unittest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from forest import Game
+from solver import EndgameSolver
+
+
+def make_endgame(player_count, alive, seed):
+    game = Game(output=lambda message: None, seed=seed)
+    game.auto_export = False
+    game.setup_game(player_count)
+    for player in game.players[alive:]:
+        player.blood = 0
+        player.is_alive = False
+    return game
+
+
+def clone(game):
+    child = Game(output=lambda message: None)
+    child.auto_export = False
+    child.player_count = game.player_count
+    child.players = copy.deepcopy(game.players)
+    return child
+
+
+def reference_search(game, mover_no, depth, amounts):
+    """直接调用Game.hunt/trade的朴素max^n搜索，作为对照"""
+    alive = [p.no for p in game.players if p.is_alive]
+    decided = len(alive) <= 1 or all(
+        game._check_restraint(game.players[a-1], game.players[b-1]) == 0
+        for a in alive for b in alive if a != b)
+    if depth == 0 or decided:
+        return {p.no: p.blood if p.is_alive else 0 for p in game.players}, None
+
+    start = alive.index(mover_no)
+    targets = alive[start+1:] + alive[:start]
+    moves = [("pass", mover_no, 0)]
+    for target in targets:
+        if game._check_restraint(game.players[mover_no-1], game.players[target-1]) != 0:
+            moves.extend(("hunt", target, k) for k in amounts)
+        moves.extend(("trade", target, k) for k in amounts)
+
+    best, best_move, seen = None, None, set()
+    for kind, target, k in moves:
+        child = clone(game)
+        if kind == "hunt":
+            child.hunt(mover_no, target, k)
+        elif kind == "trade" and not child.trade(mover_no, target, k):
+            continue
+        state = tuple((p.blood, p.trade, p.is_alive) for p in child.players)
+        if state in seen:
+            continue
+        seen.add(state)
+        # 下一名行动者：座位顺序上mover之后第一名存活玩家
+        seats = [(mover_no + i - 1) % len(game.players) + 1 for i in range(1, len(game.players) + 1)]
+        next_no = next((no for no in seats if child.players[no-1].is_alive), None)
+        values, _ = reference_search(child, next_no, depth - 1, amounts)
+        if best is None or values[mover_no] > best[mover_no]:
+            best, best_move = values, (kind, target, k)
+    return best, best_move
+
+
+class TestEndgameSolver(unittest.TestCase):
+    """残局求解器测试"""
+
+    def test_matches_reference_search(self):
+        """测试与直接调用Game的朴素搜索结果一致"""
+        for seed in range(4):
+            with self.subTest(seed=seed):
+                game = make_endgame(8, 3, seed)
+                game.players[0].blood = 4
+                solver = EndgameSolver(8, amounts=(1, 5))
+                values, move = solver.solve(game, 1, 3)
+                expected_values, expected_move = reference_search(game, 1, 3, (1, 5))
+                self.assertEqual(values, expected_values)
+                self.assertEqual(move, expected_move)
+
+    def test_transposition_reuse(self):
+        """测试同一求解器再次查询等价局面时直接命中置换表"""
+        game = make_endgame(12, 4, 1)
+        solver = EndgameSolver(12)
+        first = solver.solve(game, 1, 4)
+        nodes = solver.nodes
+        self.assertEqual(solver.solve(game, 1, 4), first)
+        self.assertEqual(solver.nodes, nodes + 1)
+
+    def test_five_player_endgame_is_fast(self):
+        """测试5人残局可以在数秒内求解"""
+        game = make_endgame(13, 5, 2)
+        solver = EndgameSolver(13)
+        start = time.perf_counter()
+        values, move = solver.solve(game, 1, 4)
+        self.assertLess(time.perf_counter() - start, 5.0)
+        self.assertIsNotNone(move)
+        self.assertEqual(set(values), {p.no for p in game.players})
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
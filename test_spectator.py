@@ -0,0 +1,86 @@
+"""
+观战推送测试
+"""
+import io
+import json
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from forest import Game, Player, CardRank, CardSuit
+from spectator import SpectatorHub, SpectatorView
+
+
+class TestSpectatorHub(unittest.TestCase):
+    """观战推送中心测试"""
+
+    def setUp(self):
+        self.game = Game()
+        self.game.auto_export = False
+        self.game.player_count = 6
+        self.game.players = [Player(i+1) for i in range(4)]
+        cards = [(CardSuit.SPADE, CardRank.K), (CardSuit.HEART, CardRank.Q),
+                 (CardSuit.SPADE, CardRank.J), (CardSuit.HEART, CardRank.K)]
+        for player, (suit, rank) in zip(self.game.players, cards):
+            player.suit = suit
+            player.rank = rank
+        self.hub = SpectatorHub(self.game, snapshot_interval=3, max_pending=5)
+
+    def test_delta_contains_changed_players_only(self):
+        """测试增量只包含变化的玩家"""
+        sub = self.hub.subscribe()
+        with patch('sys.stdout', new=io.StringIO()):
+            self.game.trade(1, 2, 5)
+        snapshot, delta = [json.loads(m) for m in sub.drain()]
+        self.assertEqual(snapshot["t"], "s")
+        self.assertEqual(len(snapshot["p"]), 4)
+        self.assertEqual(delta, {"seq": 1, "t": "d", "e": "trade", "r": 0,
+                                 "p": [[1, 15, -5, 1], [2, 25, 5, 1]]})
+
+    def test_fanout_shares_encoded_bytes(self):
+        """测试同一条增量只编码一次"""
+        subs = [self.hub.subscribe() for _ in range(3)]
+        for sub in subs:
+            sub.drain()
+        with patch('sys.stdout', new=io.StringIO()):
+            self.game.hunt(1, 2, 5)
+        messages = [sub.drain()[0] for sub in subs]
+        self.assertIs(messages[0], messages[1])
+        self.assertIs(messages[1], messages[2])
+
+    def test_late_joiner_and_periodic_snapshot(self):
+        """测试迟到订阅者从快照开始，并定期收到快照"""
+        early = self.hub.subscribe()
+        view = SpectatorView()
+        with patch('sys.stdout', new=io.StringIO()):
+            self.game.modify_blood(1, -5)
+            late = self.hub.subscribe()
+            self.game.modify_blood(2, 3)
+            self.game.modify_blood(3, -20)
+        for data in late.drain():
+            view.apply(data)
+        self.assertEqual(view.players[1], (15, 0, True))
+        self.assertEqual(view.players[3], (0, 0, False))
+        self.assertEqual(view.seq, 3)
+
+        kinds = [json.loads(m)["t"] for m in early.drain()]
+        self.assertEqual(kinds, ["s", "d", "d", "d", "s"])
+
+    def test_lagging_subscriber_resyncs(self):
+        """测试积压超限的订阅者改收最新快照"""
+        sub = self.hub.subscribe()
+        with patch('sys.stdout', new=io.StringIO()):
+            for _ in range(10):
+                self.game.modify_blood(4, 1)
+        messages = sub.drain()
+        self.assertEqual(len(messages), 1)
+        view = SpectatorView()
+        view.apply(messages[0])
+        self.assertEqual(view.players[4], (30, 0, True))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,120 @@
+"""
+规则参数与参数扫描测试
+"""
+import io
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import sweep
+from forest import Game, Player, RuleConfig, CardRank, CardSuit
+from sweep import grid, run_sweep, simulate_game, summarize
+
+
+class TestRuleConfig(unittest.TestCase):
+    """规则参数测试"""
+
+    def make_game(self, rules):
+        game = Game(rules=rules)
+        game.auto_export = False
+        game.player_count = 6
+        game.players = [Player(1), Player(2)]
+        game.players[0].rank, game.players[0].suit = CardRank.K, CardSuit.SPADE
+        game.players[1].rank, game.players[1].suit = CardRank.Q, CardSuit.HEART
+        return game
+
+    def test_kill_bonus_and_trade_cap(self):
+        """测试击杀奖励与交易上限可配置"""
+        game = self.make_game(RuleConfig(kill_bonus=5, trade_cap=4))
+        with patch('sys.stdout', new=io.StringIO()) as fake_out:
+            self.assertFalse(game.trade(1, 2, 5))
+            self.assertIn("交易血量将超过4", fake_out.getvalue())
+            game.hunt(1, 2, 20)
+        self.assertEqual(game.players[0].blood, 45)  # 20+20+5
+
+    def test_start_blood_and_joker_counts(self):
+        """测试初始血量与Joker数量可配置"""
+        game = Game(output=lambda message: None, seed=1,
+                    rules=RuleConfig(start_blood=30, joker_counts={6: 2}))
+        game.setup_game(6)
+        self.assertTrue(all(p.blood == 30 for p in game.players))
+        self.assertIn("初始血量30", game.records[-1])
+        self.assertEqual(game.joker_count, 2)
+        # 牌堆多于人数时只发出前6张
+        jokers = sum(1 for p in game.players if p.rank == CardRank.JOKER)
+        self.assertLessEqual(jokers, 2)
+
+        # 多Joker局Joker之间打平
+        joker1, joker2 = Player(1), Player(2)
+        for p in (joker1, joker2):
+            p.rank, p.suit = CardRank.JOKER, CardSuit.JOKER
+        self.assertEqual(game._check_restraint(joker1, joker2), 0)
+
+    def test_config_hash(self):
+        """测试规则哈希稳定且区分不同参数"""
+        self.assertEqual(RuleConfig().config_hash(), RuleConfig(kill_bonus=3).config_hash())
+        self.assertNotEqual(RuleConfig().config_hash(), RuleConfig(kill_bonus=4).config_hash())
+        self.assertEqual(RuleConfig.from_dict(RuleConfig(trade_cap=7).to_dict()), RuleConfig(trade_cap=7))
+
+
+class TestSweep(unittest.TestCase):
+    """参数扫描测试"""
+
+    def test_simulation_is_deterministic(self):
+        """测试同一种子模拟结果相同"""
+        self.assertEqual(simulate_game(RuleConfig(), 8, 42), simulate_game(RuleConfig(), 8, 42))
+
+    def test_cache_reuses_finished_cells(self):
+        """测试扩展扫描只计算缺失的格子"""
+        configs = grid(kill_bonus=[2, 3])
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "sweep.db")
+            first = run_sweep(configs, [8], range(5), cache_path=path, workers=1)
+            self.assertEqual(len(first), 10)
+
+            calls = []
+            original = sweep._simulate_cell
+
+            def counting(args):
+                calls.append(args)
+                return original(args)
+
+            with patch.object(sweep, "_simulate_cell", counting):
+                second = run_sweep(configs, [8], range(8), cache_path=path, workers=1)
+
+        self.assertEqual(len(calls), 6)  # 2种规则 x 3个新种子
+        self.assertEqual([c["result"] for c in second[:5]], [c["result"] for c in first[:5]])
+
+        summary = summarize(second)
+        self.assertEqual(len(summary), 2)
+        self.assertEqual(summary[0]["games"], 8)
+
+    def test_cache_keyed_by_max_steps(self):
+        """测试步数上限不同的扫描不共用缓存结果"""
+        configs = [RuleConfig()]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "sweep.db")
+            short = run_sweep(configs, [12], range(3), cache_path=path, workers=1, max_steps=5)
+            full = run_sweep(configs, [12], range(3), cache_path=path, workers=1, max_steps=500)
+            again = run_sweep(configs, [12], range(3), cache_path=path, workers=1, max_steps=5)
+        self.assertEqual([c["result"] for c in short],
+                         [simulate_game(RuleConfig(), 12, seed, 5) for seed in range(3)])
+        self.assertEqual([c["result"] for c in full],
+                         [simulate_game(RuleConfig(), 12, seed, 500) for seed in range(3)])
+        self.assertNotEqual([c["result"] for c in short], [c["result"] for c in full])
+        self.assertEqual([c["result"] for c in again], [c["result"] for c in short])
+
+    def test_process_pool(self):
+        """测试进程池结果与本进程一致"""
+        configs = grid(trade_cap=[10])
+        serial = run_sweep(configs, [6], range(4), workers=1)
+        parallel = run_sweep(configs, [6], range(4), workers=2)
+        self.assertEqual([c["result"] for c in serial], [c["result"] for c in parallel])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,89 @@
+"""
+血量时间序列测试
+"""
+import io
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from forest import Game, CardRank, CardSuit
+from timeseries import BLOCK_ROWS, BloodSeries
+
+
+class TestBloodSeries(unittest.TestCase):
+    """血量时间序列测试"""
+
+    def make_game(self):
+        game = Game(seed=1)
+        game.auto_export = False
+        with patch('sys.stdout', new=io.StringIO()):
+            game.setup_game(6)
+        game.players[0].rank, game.players[0].suit = CardRank.K, CardSuit.SPADE
+        game.players[1].rank, game.players[1].suit = CardRank.Q, CardSuit.SPADE
+        return game
+
+    def test_capture_from_game(self):
+        """测试每次操作后记录全部玩家"""
+        game = self.make_game()
+        series = BloodSeries()
+        series.attach(game)
+        with patch('sys.stdout', new=io.StringIO()):
+            game.trade(1, 2, 3)
+            game.next_round()
+            game.hunt(1, 2, 5)
+            self.assertFalse(game.hunt(1, 1, 5))
+        self.assertEqual(len(series), 3 * 6)
+        self.assertEqual(series.steps(1, 2)[:2], [(1, 1, 17, -3), (1, 2, 23, 3)])
+        steps, blood, trade = series.player_series(2)
+        self.assertEqual(list(steps), [0, 1, 2])
+        self.assertEqual(list(blood), [20, 23, 18])
+        self.assertEqual(list(trade), [0, 3, 3])
+        steps, blood, _ = series.player_series(1, start_step=2)
+        self.assertEqual((list(steps), list(blood)), ([2], [22]))
+
+    def test_large_blood(self):
+        """测试超出int32范围的血量照常记录，不影响游戏操作"""
+        game = self.make_game()
+        series = BloodSeries()
+        series.attach(game)
+        with patch('sys.stdout', new=io.StringIO()):
+            self.assertTrue(game.modify_blood(3, 3_000_000_000))
+        self.assertEqual(list(series.player_series(3)[1]), [20, 3_000_000_020])
+
+    def test_slicing_across_blocks(self):
+        """测试跨块的列读取与按步数切片"""
+        series = BloodSeries(block_rows=4)
+        for step in range(10):
+            series.record(step, [(1, step, 0), (2, -step, step)])
+        self.assertEqual(list(series.column("blood", 3, 11)),
+                         [-1, 2, -2, 3, -3, 4, -4, 5])
+        self.assertEqual(series.step_bounds(3, 6), (6, 12))
+        self.assertEqual(series.steps(9), [(9, 1, 9, 0), (9, 2, -9, 9)])
+        self.assertEqual(list(series.player_series(2, 4, 7)[2]), [4, 5, 6])
+
+    def test_mmap_persistence(self):
+        """测试映射到文件后可重新打开继续追加"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "blood.fbs")
+            rows = BLOCK_ROWS + 10
+            with BloodSeries(path) as series:
+                for i in range(rows):
+                    series.append(i // 2, i % 2 + 1, i, -i)
+            with BloodSeries(path) as series:
+                self.assertEqual(len(series), rows)
+                series.append(rows, 1, 7, 7)
+            with BloodSeries(path, readonly=True) as series:
+                self.assertEqual(len(series), rows + 1)
+                self.assertEqual(series.row(BLOCK_ROWS + 1), (BLOCK_ROWS // 2, 2, BLOCK_ROWS + 1, -BLOCK_ROWS - 1))
+                self.assertEqual(series.row(rows), (rows, 1, 7, 7))
+                self.assertEqual(list(series.player_series(1, rows)[1]), [7])
+                with self.assertRaises(ValueError):
+                    series.append(0, 1, 0, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+"""
+克制规则穷举校验测试
+"""
+import os
+import sys
+import time
+import unittest
+from unittest.mock import patch
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from forest import Game, CardRank, CardSuit, restraint_table
+from verify_rules import verify_all, verify_configuration
+
+
+class TestVerifyRules(unittest.TestCase):
+    """规则校验器测试"""
+
+    def test_current_rules_have_no_violations(self):
+        """测试当前规则实现与声明式规则完全一致，且校验足够快"""
+        restraint_table.cache_clear()
+        start = time.perf_counter()
+        violations = verify_all()
+        elapsed = time.perf_counter() - start
+        self.assertEqual(violations, [])
+        self.assertLess(elapsed, 1.0)
+
+    def test_detects_broken_rule(self):
+        """测试能发现被破坏的规则"""
+        original = Game._check_restraint
+
+        def broken(game, player1, player2):
+            # 故意让12人局黑桃与梅花不再打平
+            if game.player_count == 12 and player1.rank == player2.rank and \
+               (player1.suit, player2.suit) == (CardSuit.SPADE, CardSuit.CLUB):
+                return 1
+            return original(game, player1, player2)
+
+        restraint_table.cache_clear()
+        try:
+            with patch.object(Game, "_check_restraint", broken):
+                violations = verify_configuration(12, 0)
+        finally:
+            restraint_table.cache_clear()
+
+        self.assertTrue(any("黑桃K捕食梅花K" in v for v in violations))
+        self.assertTrue(any("反对称" in v for v in violations))
+        self.assertTrue(any("应打平" in v for v in violations))
+
+    def test_restraint_table_matches_check_restraint(self):
+        """测试预计算表与_check_restraint一致"""
+        cards, table = restraint_table(13)
+        self.assertEqual(len(cards), 13)
+        k = cards.index((CardSuit.SPADE, CardRank.K))
+        q = cards.index((CardSuit.HEART, CardRank.Q))
+        self.assertEqual(table[k][q], 1)
+        self.assertEqual(table[q][k], -1)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
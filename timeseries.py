@@ -0,0 +1,254 @@
+"""
+血量时间序列
+
+每次交易/捕食/修改血量之后记录全部玩家的 (步数, 编号, 血量, 交易血量)，
+按列存放在定长的int64块中，用于赛后画图与平衡性分析，不必再从records文本反推。
+
+  - 追加为O(1)：写入当前块的下一行，块满再分配新块
+  - 指定文件路径时块直接映射到文件(mmap)，长时间对局内存占用有界，可随时重新打开继续追加
+  - 步数单调不减，按步数区间切片用二分查找；按玩家切片用每名玩家的行号索引
+
+文件格式：第一页为文件头(魔数、每块行数、总行数)，之后每块依次为step/player/blood/trade四列，
+文件头与各列的整数都是本机字节序，列为int64，修改血量给出的超大血量也能存下。
+
+    series = BloodSeries("blood.fbs")
+    series.attach(game)
+    ...
+    steps, blood, trade = series.player_series(3)
+"""
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+from forest import Game
+
+MAGIC = b"FBS2"
+HEADER = struct.Struct("=4sIQ")
+COLUMNS = ("step", "player", "blood", "trade")
+TYPECODE = "q"
+ROW_BYTES = len(COLUMNS) * 8
+HEADER_SIZE = mmap.ALLOCATIONGRANULARITY
+# 每块字节数需是映射粒度的整数倍
+BLOCK_ROWS = max(4096, mmap.ALLOCATIONGRANULARITY // ROW_BYTES)
+
+Row = Tuple[int, int, int, int]
+
+
+class _StepColumn:
+    """把分块的step列包装成可二分查找的序列"""
+    def __init__(self, series: "BloodSeries"):
+        self.series = series
+
+    def __len__(self) -> int:
+        return self.series.rows
+
+    def __getitem__(self, i: int) -> int:
+        block_rows = self.series.block_rows
+        return self.series._blocks[i // block_rows][0][i % block_rows]
+
+
+class BloodSeries:
+    """列式血量时间序列；path为None时只在内存中"""
+    def __init__(self, path: Optional[str] = None, block_rows: int = BLOCK_ROWS, readonly: bool = False):
+        self.path = path
+        self.readonly = readonly
+        self.rows = 0
+        self._buffers: list = []  # 每块的底层缓冲(bytearray或mmap)
+        self._blocks: List[List[memoryview]] = []  # 每块四列
+        self._views: List[memoryview] = []
+        self._player_rows: Optional[Dict[int, array]] = None
+        self._state: Dict[int, Tuple[int, int]] = {}  # 监听模式下各玩家最新的 (血量, 交易血量)
+        self._file = None
+        self._header = None
+
+        if path is None:
+            self.block_rows = block_rows
+            return
+        if (block_rows * ROW_BYTES) % mmap.ALLOCATIONGRANULARITY:
+            raise ValueError(f"每块行数需使块大小为{mmap.ALLOCATIONGRANULARITY}字节的整数倍")
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        if not exists and readonly:
+            raise FileNotFoundError(path)
+        self._file = open(path, "rb" if readonly else ("r+b" if exists else "w+b"))
+        access = mmap.ACCESS_READ if readonly else mmap.ACCESS_WRITE
+        if exists:
+            magic, block_rows, rows = HEADER.unpack(self._file.read(HEADER.size))
+            if magic != MAGIC:
+                self._file.close()
+                raise ValueError(f"{path}不是血量时间序列文件")
+        else:
+            rows = 0
+            self._file.truncate(HEADER_SIZE)
+        self.block_rows = block_rows
+        self._header = mmap.mmap(self._file.fileno(), HEADER_SIZE, access=access)
+        if not exists:
+            self._header[:HEADER.size] = HEADER.pack(MAGIC, block_rows, 0)
+        for _ in range(-(-rows // block_rows)):
+            self._map_block(access)
+        self.rows = rows
+
+    # ---------- 存储 ----------
+
+    @property
+    def block_bytes(self) -> int:
+        return self.block_rows * ROW_BYTES
+
+    def _add_block(self, buffer):
+        view = memoryview(buffer).cast(TYPECODE)
+        n = self.block_rows
+        self._buffers.append(buffer)
+        self._views.append(view)
+        self._blocks.append([view[i*n:(i+1)*n] for i in range(4)])
+
+    def _map_block(self, access=mmap.ACCESS_WRITE):
+        offset = HEADER_SIZE + len(self._blocks) * self.block_bytes
+        if access == mmap.ACCESS_WRITE and os.fstat(self._file.fileno()).st_size < offset + self.block_bytes:
+            self._file.truncate(offset + self.block_bytes)
+        self._add_block(mmap.mmap(self._file.fileno(), self.block_bytes, access=access, offset=offset))
+
+    def append(self, step: int, player: int, blood: int, trade: int):
+        """追加一行"""
+        if self.readonly:
+            raise ValueError("只读打开的时间序列不能追加")
+        block, offset = divmod(self.rows, self.block_rows)
+        if block == len(self._blocks):
+            if self._file is None:
+                self._add_block(bytearray(self.block_bytes))
+            else:
+                self._map_block()
+        columns = self._blocks[block]
+        columns[0][offset] = step
+        columns[1][offset] = player
+        columns[2][offset] = blood
+        columns[3][offset] = trade
+        self.rows += 1
+        if self._header is not None:
+            HEADER.pack_into(self._header, 0, MAGIC, self.block_rows, self.rows)
+        if self._player_rows is not None:
+            self._player_rows.setdefault(player, array("I")).append(self.rows - 1)
+
+    def flush(self):
+        """把映射内容刷到磁盘"""
+        if self._header is not None and not self.readonly:
+            self._header.flush()
+            for buffer in self._buffers:
+                buffer.flush()
+
+    def close(self):
+        self.flush()
+        for columns in self._blocks:
+            for column in columns:
+                column.release()
+        for view in self._views:
+            view.release()
+        if self._file is not None:
+            for buffer in self._buffers:
+                buffer.close()
+            self._header.close()
+            self._file.close()
+            self._file = None
+        self._blocks, self._views, self._buffers = [], [], []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---------- 查询 ----------
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def row(self, i: int) -> Row:
+        if not 0 <= i < self.rows:
+            raise IndexError(i)
+        block, offset = divmod(i, self.block_rows)
+        return tuple(column[offset] for column in self._blocks[block])
+
+    def column(self, name: str, start: int = 0, stop: Optional[int] = None) -> array:
+        """取出某一列第start到stop行(不含)的副本"""
+        index = COLUMNS.index(name)
+        stop = self.rows if stop is None else min(stop, self.rows)
+        result = array(TYPECODE)
+        n = self.block_rows
+        i = start
+        while i < stop:
+            block, offset = divmod(i, n)
+            end = min(n, offset + stop - i)
+            result.frombytes(self._blocks[block][index][offset:end].tobytes())
+            i += end - offset
+        return result
+
+    @property
+    def last_step(self) -> int:
+        return self.row(self.rows - 1)[0] if self.rows else -1
+
+    def step_bounds(self, start_step: int, stop_step: Optional[int] = None) -> Tuple[int, int]:
+        """步数在[start_step, stop_step)内的行号范围"""
+        steps = _StepColumn(self)
+        lo = bisect_left(steps, start_step)
+        hi = self.rows if stop_step is None else bisect_left(steps, stop_step, lo)
+        return lo, hi
+
+    def steps(self, start_step: int, stop_step: Optional[int] = None) -> List[Row]:
+        """步数在[start_step, stop_step)内的全部行"""
+        lo, hi = self.step_bounds(start_step, stop_step)
+        columns = [self.column(name, lo, hi) for name in COLUMNS]
+        return list(zip(*columns))
+
+    def player_series(self, no: int, start_step: int = 0,
+                      stop_step: Optional[int] = None) -> Tuple[array, array, array]:
+        """某名玩家在步数区间内的 (步数, 血量, 交易血量) 三列"""
+        if self._player_rows is None:
+            index: Dict[int, array] = {}
+            for i, player in enumerate(self.column("player")):
+                index.setdefault(player, array("I")).append(i)
+            self._player_rows = index
+        lo, hi = self.step_bounds(start_step, stop_step)
+        rows = self._player_rows.get(no, array("I"))
+        rows = rows[bisect_left(rows, lo):bisect_left(rows, hi)]
+        n = self.block_rows
+        result = (array(TYPECODE), array(TYPECODE), array(TYPECODE))
+        for i in rows:
+            columns = self._blocks[i // n]
+            offset = i % n
+            result[0].append(columns[0][offset])
+            result[1].append(columns[2][offset])
+            result[2].append(columns[3][offset])
+        return result
+
+    # ---------- 采集 ----------
+
+    def record(self, step: int, players):
+        """以 (编号, 血量, 交易血量, ...) 序列记录一步的全部玩家"""
+        for p in players:
+            self.append(step, p[0], p[1], p[2])
+
+    def attach(self, game: Game):
+        """
+        挂到游戏的监听器上：先记录当前状态，之后每次交易/捕食/修改血量/同时行动
+        都记录一步。只用事件中的变化玩家更新状态，不在监听器里读其他玩家。
+        """
+        snapshot = game.snapshot()["players"]
+        self._state = {no: (blood, trade) for no, blood, trade, _ in snapshot}
+        if snapshot:
+            self.record(self.last_step + 1, snapshot)
+        game.listeners.append(self.on_event)
+
+    def detach(self, game: Game):
+        game.listeners.remove(self.on_event)
+
+    def on_event(self, event: dict):
+        changed = event.get("players")
+        if not changed:
+            return  # 回合开始等不改变血量的事件
+        for no, blood, trade, _ in changed:
+            self._state[no] = (blood, trade)
+        step = self.last_step + 1
+        for no in sorted(self._state):
+            blood, trade = self._state[no]
+            self.append(step, no, blood, trade)
@@ -0,0 +1,152 @@
+"""
+克制规则一致性校验
+
+穷举每个人数局(及每种Joker数量)的所有有序身份牌对，把_check_restraint的结果
+与下面的声明式规则对照，并检查反对称性、循环结构与Joker语义。
+结果表由restraint_table预先计算并缓存，全部检查远小于一秒。
+
+用法: python verify_rules.py    (有违规时以非零状态退出)
+"""
+import sys
+from typing import Dict, List, Optional, Tuple
+
+from forest import (CardRank, CardSuit, DEFAULT_JOKER_COUNTS, SUITS_BY_PLAYER_COUNT,
+                    build_deck, restraint_table)
+
+Card = Tuple[CardSuit, CardRank]
+JOKER: Card = (CardSuit.JOKER, CardRank.JOKER)
+
+# ---------- 声明式规则 ----------
+
+# 点数循环克制：K>Q>J>K
+RANK_BEATS = {(CardRank.K, CardRank.Q), (CardRank.Q, CardRank.J), (CardRank.J, CardRank.K)}
+
+# 点数相同时的花色循环克制与打平，按本局花色数区分
+SUIT_BEATS: Dict[int, set] = {
+    4: {(CardSuit.SPADE, CardSuit.HEART), (CardSuit.HEART, CardSuit.CLUB),
+        (CardSuit.CLUB, CardSuit.DIAMOND), (CardSuit.DIAMOND, CardSuit.SPADE)},
+    3: {(CardSuit.SPADE, CardSuit.HEART), (CardSuit.HEART, CardSuit.CLUB),
+        (CardSuit.CLUB, CardSuit.SPADE)},
+    2: {(CardSuit.SPADE, CardSuit.HEART)},
+}
+SUIT_TIES: Dict[int, set] = {
+    4: {frozenset((CardSuit.SPADE, CardSuit.CLUB)), frozenset((CardSuit.HEART, CardSuit.DIAMOND))},
+    3: set(),
+    2: set(),
+}
+
+# Joker语义：Joker捕食任意牌成功，任意牌捕食Joker也成功(捕食方胜)；
+# 有多个Joker时Joker之间打平。这是规则本身的不对称，不算违规。
+
+
+def expected_outcome(suit_count: int, joker_count: int, a: Card, b: Card) -> int:
+    """按声明式规则给出a捕食b的结果"""
+    if a == JOKER and b == JOKER:
+        return 0 if joker_count > 1 else 1
+    if a == JOKER or b == JOKER:
+        return 1
+    (suit_a, rank_a), (suit_b, rank_b) = a, b
+    if (rank_a, rank_b) in RANK_BEATS:
+        return 1
+    if (rank_b, rank_a) in RANK_BEATS:
+        return -1
+    if (suit_a, suit_b) in SUIT_BEATS[suit_count]:
+        return 1
+    if (suit_b, suit_a) in SUIT_BEATS[suit_count]:
+        return -1
+    return 0
+
+
+def _name(card: Card) -> str:
+    suit, rank = card
+    return "Joker" if card == JOKER else f"{suit.value}{rank.value}"
+
+
+def _cycle_length(edges: set, start) -> Optional[int]:
+    """从start沿唯一出边走回start的步数；出边不唯一或走不回时返回None"""
+    successors: Dict = {}
+    for x, y in edges:
+        if x in successors:
+            return None
+        successors[x] = y
+    node, steps = start, 0
+    while True:
+        node = successors.get(node)
+        steps += 1
+        if node is None or steps > len(successors):
+            return None
+        if node == start:
+            return steps
+
+
+def verify_configuration(player_count: int, joker_count: int) -> List[str]:
+    """校验一个人数局/Joker数量组合，返回违规描述"""
+    prefix = f"{player_count}人局(Joker×{joker_count})"
+    violations: List[str] = []
+    suits = SUITS_BY_PLAYER_COUNT[player_count]
+    suit_count = len(suits)
+    cards, table = restraint_table(player_count, joker_count)
+    index = {card: i for i, card in enumerate(cards)}
+
+    deck = build_deck(player_count, joker_count)
+    if len(deck) != suit_count * 3 + joker_count:
+        violations.append(f"{prefix}: 牌堆数量{len(deck)}不符")
+
+    for i, a in enumerate(cards):
+        for j, b in enumerate(cards):
+            actual = table[i][j]
+            expected = expected_outcome(suit_count, joker_count, a, b)
+            if i == j and a != JOKER:
+                expected = 0  # 同一张牌
+            if actual != expected:
+                violations.append(f"{prefix}: {_name(a)}捕食{_name(b)} 结果{actual}，规则应为{expected}")
+            # 非Joker牌之间必须反对称
+            if a != JOKER and b != JOKER and actual != -table[j][i]:
+                violations.append(f"{prefix}: {_name(a)}与{_name(b)} 不满足反对称")
+
+    # 点数克制在每个花色内构成K>Q>J>K的三元环
+    for suit in suits:
+        edges = {(a[1], b[1]) for a in cards for b in cards
+                 if a[0] == suit and b[0] == suit and table[index[a]][index[b]] == 1}
+        if _cycle_length(edges, CardRank.K) != 3:
+            violations.append(f"{prefix}: {suit.value}内点数克制不构成三元环")
+
+    # 点数相同时花色克制构成循环(2种花色时为单向克制)，打平的花色对不在环上
+    for rank in (CardRank.K, CardRank.Q, CardRank.J):
+        edges = {(a[0], b[0]) for a in cards for b in cards
+                 if a[1] == rank and b[1] == rank and table[index[a]][index[b]] == 1}
+        if suit_count == 2:
+            if edges != SUIT_BEATS[2]:
+                violations.append(f"{prefix}: {rank.value}的花色克制应为黑桃>红桃")
+        elif _cycle_length(edges, CardSuit.SPADE) != suit_count:
+            violations.append(f"{prefix}: {rank.value}的花色克制不构成{suit_count}元环")
+        for tie in SUIT_TIES[suit_count]:
+            x, y = tuple(tie)
+            if table[index[(x, rank)]][index[(y, rank)]] != 0 or table[index[(y, rank)]][index[(x, rank)]] != 0:
+                violations.append(f"{prefix}: {x.value}{rank.value}与{y.value}{rank.value}应打平")
+
+    # Joker：与任意牌双向都是捕食方胜
+    if JOKER in index:
+        j = index[JOKER]
+        for i, card in enumerate(cards):
+            if card != JOKER and (table[j][i] != 1 or table[i][j] != 1):
+                violations.append(f"{prefix}: Joker与{_name(card)}的结果应双向为1")
+    return violations
+
+
+def verify_all(joker_variants: Tuple[int, ...] = (0, 1, 2)) -> List[str]:
+    """校验全部人数局的标准配置以及每种Joker数量变体"""
+    violations: List[str] = []
+    for player_count in sorted(SUITS_BY_PLAYER_COUNT):
+        joker_counts = sorted({DEFAULT_JOKER_COUNTS[player_count], *joker_variants})
+        for joker_count in joker_counts:
+            violations.extend(verify_configuration(player_count, joker_count))
+    return violations
+
+
+if __name__ == "__main__":
+    problems = verify_all()
+    for problem in problems:
+        print(problem)
+    print(f"校验完成：{len(problems)}处违规")
+    sys.exit(1 if problems else 0)